@@ -1,8 +1,10 @@
-import random, uuid, pickle
+import argparse, random, uuid, pickle
 from dataclasses import dataclass, field
 
 import human_vs_human, bot
-from board import Board, WHITE, DiceCup, Move
+from evaluator import HEURISTIC, Evaluator, load_evaluator
+from board import Board, WHITE, BLACK, DiceCup, Move, Player
+from records import GameRecord, RecordWriter
 from show import show
 
 class UserRegistrationError(Exception):
@@ -46,24 +48,33 @@ class Game:
        s'inicialitza amb els valors predeterminats d'una nova partida, 
        incloent una llavor aleatòria.
        """
-    id = str(uuid.uuid4())[:8] # Identifiacdon únic per la partida
     user1: User # Jugador WHITE
     user2: User # Jugador BLACK
-    seed: int = random.randint(1, 999_999_999) # Llavor de la partida que gestiona els daus
-    cup: DiceCup =  DiceCup(seed)
-    board: Board = Board(DiceCup(seed).roll()) # Estat actual del tauler
+    seed: int = field(default_factory=lambda: random.randint(1, 999_999_999)) # Llavor de la partida que gestiona els daus
     list_moves: list[Move] = field(default_factory=list) # Llista de tots els moviments que s'han fet
     end: bool = False # "True" si la partida està acabada, "False" alternament
-        
-    def apply_move(self, move: Move) -> None:
+    id: str = field(init=False, default_factory=lambda: str(uuid.uuid4())[:8]) # Identificador únic per la partida
+    cup: DiceCup = field(init=False) # Gobelet de la partida, amb la llavor 'seed'
+    board: Board = field(init=False) # Estat actual del tauler
+
+    def __post_init__(self) -> None:
+        # Cada partida té el seu gobelet, i la primera tirada en surt, de manera que es pot reproduir (veure 'record')
+        self.cup = DiceCup(self.seed)
+        self.board = Board(self.cup.roll())
+
+    def apply_move(self, move: Move, player: Player = WHITE) -> None:
         """
-        Aplica un moviment donat al tauler, tot actualitzant-lo i afeigint aquest 
-        moviment a la llista de moviments.
+        Aplica un moviment donat de 'player' (des del seu punt de vista) al tauler, tot
+        actualitzant-lo i afeigint aquest moviment a la llista de moviments.
         """
-        self.board = self.board.play(move)
+        self.board = self.board.play(move, player)
         self.board = self.board.next(self.cup.roll())
         self.list_moves.append(move)
 
+    def record(self) -> GameRecord:
+        """Retorna la partida en el format compacte de 'records.py' (la llavor, els jugadors i els moviments)."""
+        return GameRecord.from_moves(self.seed, self.user1.id, self.user2.id, self.list_moves)
+
 class Arena:
     """
     Gestiona l'arena on es juguen les partides, els usuaris registrats, connectats i
@@ -72,10 +83,12 @@ class Arena:
     _reg_users: dict[str, User] # Llista de tots els usuaris registrats. Clau: user.id()
     _con_users: dict[str, User] # Llista de tots els usuaris connectats. Clau: user.id()
     _current_games: dict[str, Game] # Llista de totes les partides que s'estan jugant actualment. Clau: game.id()
+    _records_path: str | None = None # Fitxer on s'afegeix cada partida acabada (veure 'records.py')
     
     def __init__(self, current_games: dict[str, Game] | None = None,
                 reg_users: dict[str, User] | None = None,
-                con_users: dict[str, User] | None = None) -> None:
+                con_users: dict[str, User] | None = None,
+                records_path: str | None = None) -> None:
         
         """Constructor del programa."""
         # La configuració "default" crea a aquest usuari com el bot
@@ -83,6 +96,14 @@ class Arena:
         self._reg_users = reg_users if reg_users is not None else {bot.id: bot}
         self._con_users = con_users if con_users is not None else {bot.id: bot}
         self._current_games = current_games if current_games else {}
+        self._records_path = records_path
+
+    def set_records_path(self, records_path: str | None) -> None:
+        """
+        Canvia el fitxer on s'afegeix cada partida acabada (None deixa de guardar-les). Cal per les
+        arenes carregades d'un fitxer, que conserven el que tenien en guardar-se (o cap, si són anteriors).
+        """
+        self._records_path = records_path
     
     def register(self, user: User) -> None:
         """Registra un nou usuari, tot donant-li un identificador únic."""
@@ -179,9 +200,10 @@ class Arena:
         user2.add_new_game(game)
         return game
     
-    def play(self, game: Game) -> None: # pragma: no cover (no fa falta fer tests per comprobar que funciona)
+    def play(self, game: Game, deadline_ms: float | None = None, evaluator: Evaluator = HEURISTIC) -> None: # pragma: no cover (no fa falta fer tests per comprobar que funciona)
         """Realitza una partida entre dos usuaris, si l'usuari BLACK és
-        el bot, juga el bot al torn de BLACK"""
+        el bot, juga el bot al torn de BLACK (amb 'deadline_ms' mil·lisegons per pensar, si es dona,
+        i l'avaluació 'evaluator')"""
 
         show(game.board)
         # Es juga fins que hi hagi un guanyador
@@ -191,30 +213,28 @@ class Arena:
             game.apply_move(move)
             show(game.board)
             if not game.board.over():          
-                game.board = game.board.flip()
                 if game.user2.id == "JPetit":
                     print(f"JPetit: \033[3mTinc els daus: {game.board.dice().die1, game.board.dice().die2} deixa'm pensar...\033[0m")
-                    move = bot.bot(game.board)
+                    move = bot.bot(game.board, deadline_ms=deadline_ms, evaluator=evaluator, player=BLACK)
                     if move.jumps:
                         print(f"JPetit: \033[3mCrec que mouré {[(23 - jump.point + 1, jump.pips) for jump in move.jumps]}\033[0m")
                     else:
                         print("JPetit: \033[3mPasso el meu torn, no puc moure fitxes\033[0m (JPetit is sad :c)")
                 else:
                     print("Torn del negre!")
-                    move = human_vs_human.read_move(game.board)
-                game.apply_move(move)
-                game.board = game.board.flip()
+                    move = human_vs_human.read_move(game.board, BLACK)
+                game.apply_move(move, BLACK)
                 show(game.board)
         
-        # Un cop finalitza la partida es dona al guanyador
-        winner = "W" if game.board.winner() == WHITE else "B"
+        # Un cop finalitza la partida es dona al guanyador (el tauler sempre està orientat pel blanc)
+        winner = "W" if game.board.off(WHITE) == 15 else "B"
         print(f"Guanyador: {winner}")
         print(f"Moviments realitzats en aquesta partida: {game.list_moves}")
-        self.end_game(game.id, game.board.winner() == WHITE)
+        self.end_game(game.id, winner == "W")
 
     def end_game(self, game_id: str, white_wins: bool) -> None:
         """Fa acabar la partida, contabilitzant la corresponent victòria 
-        i derrota al blanc o al negre."""
+        i derrota al blanc o al negre. Si l'arena té un fitxer de partides, s'hi afegeix."""
         if game_id not in self._current_games:
             raise LookupError("Aquest partida no es troba en curs!")
         
@@ -226,6 +246,9 @@ class Arena:
             user1.num_games_won += 1
         else:
             user2.num_games_won += 1
+        if self._records_path is not None:
+            with RecordWriter(self._records_path) as writer:
+                writer.write(current_game.record())
             
 
     def get_user_games(self, user: User) -> list[Game]:
@@ -250,8 +273,9 @@ class Arena:
         """Retorna la classificació dels usuaris, ordenats per percentatge de partides guanyades."""
         return sorted(self._reg_users.values(), key=lambda x: x.winrate(), reverse=True)
 
-def main(arena: Arena) -> None: # pragma: no cover (no fa falta comprobar amb tests si funciona, té més sentit provar-ho)
-    """Funció principial que permet navegar ente les diferents opcions de l'arena"""
+def main(arena: Arena, deadline_ms: float | None = None, evaluator: Evaluator = HEURISTIC) -> None: # pragma: no cover (no fa falta comprobar amb tests si funciona, té més sentit provar-ho)
+    """Funció principial que permet navegar ente les diferents opcions de l'arena.
+    El bot (JPetit) juga amb 'deadline_ms' mil·lisegons per moviment (si es dona) i l'avaluació 'evaluator'."""
     
     logged_in, logged_id = False, None
     while True:
@@ -354,7 +378,7 @@ def main(arena: Arena) -> None: # pragma: no cover (no fa falta comprobar amb te
                         user2 = arena.get_user_by_id(user_id2)
                         game = arena.start_new_game(user1, user2)
                         print(f"\nPartida creada correctament amb ID: {game.id}\n") 
-                        arena.play(game)
+                        arena.play(game, deadline_ms, evaluator)
                     except GameError as e:
                         print(f"\nError: {e}")
 
@@ -414,12 +438,17 @@ def main(arena: Arena) -> None: # pragma: no cover (no fa falta comprobar amb te
         pickle.dump(arena, file)
 
 if __name__ == "__main__": # pragma: no cover (no fa falta fer tests en aquesta part)
+    parser = argparse.ArgumentParser(description="Servidor de Backgammon")
+    parser.add_argument("--deadline-ms", type=float, default=None, help="Mil·lisegons del bot per decidir cada moviment")
+    parser.add_argument("--evaluator", default="heuristic", help="'heuristic' o un fitxer .npz de pesos de la xarxa neuronal")
+    args = parser.parse_args()
     try:
         with open("arena-data.dat", "rb") as file:
             arena = pickle.load(file)
+            arena.set_records_path("arena-games.bin")
             print("Dades de l'arena carregades correctament")
     except FileNotFoundError:
-        arena = Arena()
+        arena = Arena(records_path="arena-games.bin")
         print("Nova arena creada correctament")
     
-    main(arena)
\ No newline at end of file
+    main(arena, args.deadline_ms, load_evaluator(args.evaluator))
\ No newline at end of file
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import argparse, os, struct, time
+from math import comb
+from typing import Callable
+import numpy as np
+from board import ROLLS, Board, Dice, Move, successor_layouts
+
+
+BEAROFF_CHECKERS = 15 # Fitxes màximes al home
+BEAROFF_POSITIONS = comb(BEAROFF_CHECKERS + 6, 6) # Distribucions de 0 a 15 fitxes a les 6 caselles del home (54.264)
+BEAROFF_FORMAT = 1 # Versió del format del fitxer de la base de dades
+BEAROFF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "bearoff.bin")
+
+# Capçalera: identificador, versió del format i nombre de posicions. Després, un float32 per posició.
+_HEADER = struct.Struct("<4sBI")
+_MAGIC = b"BGBO"
+
+# _BINOMIAL[n][k] = C(n, k), per calcular l'índex de cada posició
+_BINOMIAL = np.array([[comb(n, k) for k in range(7)] for n in range(BEAROFF_CHECKERS + 6)], dtype=np.int64)
+
+
+def indices(homes: np.ndarray) -> np.ndarray:
+    """
+    Retorna l'índex a la base de dades de N posicions, donades com una matriu (N, 6) amb el nombre de
+    fitxes a les caselles 18..23. Cada posició es veu com les 15 fitxes repartides en 7 grups (les 6
+    caselles i les que no hi són), i l'índex és el de les 6 separacions entre grups, com a combinació
+    de 6 de les 21 posicions possibles (sistema combinatori de numeració).
+    """
+    separators = np.cumsum(homes, axis=1, dtype=np.int64) + np.arange(6)
+    return _BINOMIAL[separators, np.arange(1, 7)].sum(axis=1)
+
+
+def positions(max_checkers: int = BEAROFF_CHECKERS) -> list[tuple[int, ...]]:
+    """Retorna totes les distribucions de fins a 'max_checkers' fitxes a les caselles 18..23."""
+    result: list[tuple[int, ...]] = []
+
+    def distribute(prefix: tuple[int, ...], left: int) -> None:
+        if len(prefix) == 6:
+            result.append(prefix)
+            return
+        for count in range(left + 1):
+            distribute(prefix + (count,), left - count)
+
+    distribute((), max_checkers)
+    return result
+
+
+def is_bearoff(board: Board) -> bool:
+    """
+    Retorna "True" si totes les fitxes del jugador que li toca moure són al home (o salvades) i ja
+    no hi ha contacte (veure 'Board.is_race').
+    """
+    return board.is_race() and max(board.cells()[:18]) < 1
+
+
+def generate(max_checkers: int = BEAROFF_CHECKERS, progress: Callable[[int, int], None] | None = None) -> np.ndarray:
+    """
+    Calcula el nombre esperat de tirades per salvar totes les fitxes de cada posició de la base de
+    dades, amb les regles de 'Board' i jugant sempre per minimitzar-lo. Només es calculen les
+    posicions de fins a 'max_checkers' fitxes (la resta queden a NaN). Si es dona, es crida
+    'progress' amb les posicions calculades i el total cada 1.000 posicions.
+    """
+    table = np.full(BEAROFF_POSITIONS, np.nan)
+    # Cada moviment redueix els punts que falten, així que els successors d'una posició ja estan calculats
+    homes = sorted(positions(max_checkers), key=lambda home: sum(count * (6 - i) for i, count in enumerate(home)))
+    for done, home in enumerate(homes):
+        index = int(indices(np.array([home]))[0])
+        if not sum(home):
+            table[index] = 0.0
+            continue
+        board = Board(Dice(1, 1), cells=[0] * 18 + list(home))
+        expected = 1.0
+        for dice, probability in ROLLS:
+            layouts = successor_layouts(board.next(dice))
+            expected += probability * table[indices(layouts[:, 18:24])].min()
+        table[index] = expected
+        if progress is not None and (done + 1) % 1000 == 0:
+            progress(done + 1, len(homes))
+    return table
+
+
+def save(path: str, table: np.ndarray) -> None:
+    """Guarda la base de dades en un fitxer binari (4 bytes per posició)."""
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, BEAROFF_FORMAT, len(table)))
+        file.write(table.astype("<f4").tobytes())
+
+
+class BearoffDatabase:
+    """
+    Base de dades de "bear off" d'un sol jugador: el nombre esperat de tirades per salvar totes les
+    fitxes de cada distribució al home. El fitxer es mapa a memòria, de manera que carregar-la és
+    immediat i tots els processos que la fan servir en comparteixen les pàgines.
+    """
+
+    _rolls: np.ndarray # Nombre esperat de tirades de cada posició (veure 'indices')
+
+    def __init__(self, path: str) -> None:
+        """Mapa a memòria la base de dades guardada amb 'save'. Llença ValueError si el fitxer no ho és."""
+        with open(path, "rb") as file:
+            header = file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path} no és una base de dades de bear off")
+        magic, bearoff_format, count = _HEADER.unpack(header)
+        if magic != _MAGIC or bearoff_format != BEAROFF_FORMAT or count != BEAROFF_POSITIONS or \
+                os.path.getsize(path) != _HEADER.size + 4 * count:
+            raise ValueError(f"{path} no és una base de dades de bear off del format {BEAROFF_FORMAT}")
+        self._rolls = np.memmap(path, dtype="<f4", mode="r", offset=_HEADER.size, shape=(count,))
+
+    def __len__(self) -> int:
+        return len(self._rolls)
+
+    def expected_rolls(self, board: Board) -> float:
+        """Retorna el nombre esperat de tirades que necessita el jugador que li toca moure per salvar totes les fitxes."""
+        # Les fitxes del rival que encara són al home (per darrere de les nostres) no compten
+        return float(self._rolls[indices(np.maximum(np.array([board.cells()[18:]]), 0))[0]])
+
+    def best_move(self, board: Board) -> Move:
+        """
+        Retorna el moviment que minimitza el nombre esperat de tirades per salvar totes les fitxes
+        (el primer de 'successors()', si n'hi ha més d'un).
+        Prec: totes les fitxes del jugador que li toca moure són al home o salvades.
+        """
+        layouts = successor_layouts(board)
+        homes = np.maximum(layouts[:, 18:24], 0) # Les fitxes del rival que encara són al home no compten
+        return board.valid_moves(unique=True)[int(np.argmin(self._rolls[indices(homes)]))]
+
+
+def main() -> None:
+    """Genera la base de dades de bear off del bot."""
+    parser = argparse.ArgumentParser(description="Genera la base de dades de bear off del bot")
+    parser.add_argument("--output", default=BEAROFF_PATH, help="Fitxer on es guarda la base de dades")
+    args = parser.parse_args()
+
+    def progress(done: int, total: int) -> None:
+        print(f"{done}/{total} posicions ({time.perf_counter() - start:.0f}s)", flush=True)
+
+    start = time.perf_counter()
+    save(args.output, generate(progress=progress))
+    print(f"Base de dades: {BEAROFF_POSITIONS} posicions, {os.path.getsize(args.output)} bytes, {time.perf_counter() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import argparse, math, os, pickle, random, tempfile, time
+from board import BLACK, WHITE, Board, DiceCup, MOVE_CACHE_SIZE, board_constructions, configure_move_cache
+import bot as bot_module
+from bot import bot
+from evaluator import load_evaluator
+from position_index import PositionIndex, build_index
+from records import GameRecord, RecordWriter, read_records
+from suite import BASELINE_PATH, CORPUS_PATH, OPERATIONS, THRESHOLD, BenchResult, build_corpus, compare, load_baseline, \
+    load_corpus, run_suite, save_baseline, save_corpus
+
+
+def self_play_positions(games: int, seed: int) -> list[Board]:
+    """
+    Juga 'games' partides del bot contra ell mateix i retorna totes les posicions per on
+    passen, juntament amb totes les posicions a les que es podria arribar des de cadascuna.
+    """
+    positions: list[Board] = []
+    for game in range(games):
+        cup = DiceCup(seed + game)
+        board = Board(cup.roll())
+        while not board.over():
+            positions.append(board)
+            positions.extend(successor for _, successor in board.successors())
+            board = board.play(bot(board))
+            board = board.next(cup.roll()).flip()
+    return positions
+
+
+def zobrist(args: argparse.Namespace) -> None:
+    """Mesura el nombre de col·lisions de les claus Zobrist sobre posicions de partides del bot."""
+    start = time.perf_counter()
+    positions = self_play_positions(args.games, args.seed)
+    print(f"Posicions generades: {len(positions)} ({time.perf_counter() - start:.1f}s)")
+
+    # Posicions realment diferents (fitxes i jugador que li toca moure) i les seves claus
+    distinct = {(board, board.current()): board.key() for board in positions}
+    keys = list(distinct.values())
+    print(f"Posicions diferents: {len(keys)}")
+
+    # Comparar les col·lisions observades amb les esperades per claus aleatòries de b bits
+    for bits in (16, 20, 24, 32, 64):
+        buckets = 2**bits
+        observed = len(keys) - len({key % buckets for key in keys})
+        expected = len(keys) + buckets * math.expm1(len(keys) * math.log1p(-1 / buckets))
+        print(f"{bits:2d} bits: {observed:6d} col·lisions (esperades {expected:10.2f})")
+
+
+def decisions(args: argparse.Namespace) -> None:
+    """Mesura el temps i el nombre de taulers construïts per cada decisió del bot."""
+    evaluator = load_evaluator(args.evaluator)
+    constructions = decisions_count = nodes = 0
+    elapsed = 0.0
+    for game in range(args.games):
+        cup = DiceCup(args.seed + game)
+        board = Board(cup.roll())
+        while not board.over():
+            start, before = time.perf_counter(), board_constructions()
+            move = bot(board, args.depth, args.width, evaluator=evaluator)
+            elapsed += time.perf_counter() - start
+            constructions += board_constructions() - before
+            nodes += bot_module.last_search.nodes
+            decisions_count += 1
+            board = board.play(move).next(cup.roll()).flip()
+
+    print(f"Decisions: {decisions_count}")
+    print(f"Taulers construïts per decisió: {constructions / decisions_count:.1f}")
+    print(f"Temps per decisió: {1000 * elapsed / decisions_count:.2f} ms")
+    print(f"Posicions avaluades per decisió: {nodes / decisions_count:.1f} ({nodes / elapsed:.0f}/s)")
+    book = bot_module.book_info()
+    if book is not None:
+        print(f"Llibre d'obertures: {book.hits} decisions de {book.entries} posicions")
+    table = bot_module.table_info()
+    print(f"Taula de transposicions: {100 * table.hit_rate():.1f}% encerts, {100 * table.fill():.1f}% plena, {table.evictions} substitucions")
+
+
+def race(args: argparse.Namespace) -> None:
+    """Compara el temps per decisió del bot a les posicions amb contacte i sense (amb el camí ràpid de curses i sense)."""
+    contact_time = race_time = 0.0
+    contact_count = 0
+    race_positions: list[Board] = []
+    for game in range(args.games):
+        cup = DiceCup(args.seed + game)
+        board = Board(cup.roll())
+        while not board.over():
+            is_race = board.is_race()
+            start = time.perf_counter()
+            move = bot(board, book=False, bearoff=False)
+            elapsed = time.perf_counter() - start
+            if is_race:
+                race_positions.append(board)
+                race_time += elapsed
+            else:
+                contact_count += 1
+                contact_time += elapsed
+            board = board.play(move).next(cup.roll()).flip()
+
+    # Les mateixes posicions sense contacte, amb la cerca completa
+    start = time.perf_counter()
+    for board in race_positions:
+        bot(board, book=False, bearoff=False, race=False)
+    search_time = time.perf_counter() - start
+
+    turns = contact_count + len(race_positions)
+    print(f"Decisions: {turns} ({100 * len(race_positions) / turns:.1f}% sense contacte)")
+    print(f"Amb contacte: {1000 * contact_time / max(contact_count, 1):.2f} ms per decisió")
+    print(f"Sense contacte: {1000 * race_time / max(len(race_positions), 1):.2f} ms per decisió "
+          f"(amb la cerca completa: {1000 * search_time / max(len(race_positions), 1):.2f} ms)")
+
+
+def parallel(args: argparse.Namespace) -> None:
+    """Mesura l'acceleració de la cerca del bot repartida entre processos, respecte a un sol procés."""
+    positions = [board for board in self_play_positions(args.games, args.seed) if len(board.successors()) > 1][::args.step]
+    print(f"Posicions: {len(positions)} (nuclis disponibles: {os.cpu_count()})")
+
+    # Sense taula de transposicions (els processos la comencen buida), perquè cada mesura faci la mateixa feina
+    bot_module.configure_table(0)
+    rankings = None
+    serial_time = 0.0
+    workers = 1
+    while workers <= args.max_workers:
+        configure_move_cache(MOVE_CACHE_SIZE) # Memòria cau de moviments buida (els processos l'hereten)
+        bot_module.configure_workers(workers)
+        bot_module.evaluate_moves(positions[0], args.depth, args.width) # Engegar els processos abans de mesurar
+        start = time.perf_counter()
+        result = [[(str(e.move), e.score) for e in bot_module.evaluate_moves(board, args.depth, args.width)] for board in positions]
+        elapsed = time.perf_counter() - start
+        if rankings is None:
+            rankings, serial_time = result, elapsed
+        print(f"{workers:3d} processos: {elapsed:7.2f}s, acceleració {serial_time / elapsed:5.2f}x, "
+              f"{'mateix resultat' if result == rankings else 'RESULTAT DIFERENT'}")
+        workers *= 2
+    bot_module.configure_workers(0)
+    bot_module.configure_table(bot_module.TABLE_BYTES)
+
+
+def dice(args: argparse.Namespace) -> None:
+    """Compara tirar els daus d'un en un amb 'DiceCup.rolls' i 'DiceCup.skip'."""
+    cup = DiceCup(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.rolls):
+        cup.roll()
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    DiceCup(args.seed).rolls(args.rolls)
+    bulk = time.perf_counter() - start
+    start = time.perf_counter()
+    DiceCup(args.seed).skip(args.rolls)
+    skip = time.perf_counter() - start
+    print(f"roll() x {args.rolls}: {single * 1000:.1f} ms ({args.rolls / single / 1e6:.2f} M tirades/s)")
+    print(f"rolls({args.rolls}): {bulk * 1000:.1f} ms ({args.rolls / bulk / 1e6:.2f} M tirades/s, {single / bulk:.0f}x)")
+    print(f"skip({args.rolls}): {skip * 1e6:.1f} us")
+
+
+def bot_games(games: int, seed: int) -> list[GameRecord]:
+    """Juga 'games' partides del bot contra ell mateix (la partida i amb 'DiceCup(seed + i)') i les retorna guardades."""
+    records: list[GameRecord] = []
+    for game in range(games):
+        cup = DiceCup(seed + game)
+        board = Board(cup.roll())
+        moves, player = [], WHITE
+        while not board.over():
+            moves.append(bot(board, player=player))
+            board = board.play(moves[-1], player).next(cup.roll())
+            player = BLACK if player == WHITE else WHITE
+        records.append(GameRecord.from_moves(seed + game, "A", "B", moves))
+    return records
+
+
+def records(args: argparse.Namespace) -> None:
+    """Compara la mida i la velocitat del format de partides de 'records.py' amb 'pickle'."""
+    games = bot_games(args.games, args.seed)
+    move_lists = [(record.seed, record.white, record.black, record.moves()) for record in games]
+
+    total = len(games) * args.copies
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.bin")
+        start = time.perf_counter()
+        with RecordWriter(path) as writer:
+            for _ in range(args.copies):
+                for record in games:
+                    writer.write(record)
+        write = time.perf_counter() - start
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        count = sum(1 for _ in read_records(path))
+        read = time.perf_counter() - start
+    start = time.perf_counter()
+    for record in games:
+        record.replay()
+    replay = time.perf_counter() - start
+    pickled = len(pickle.dumps(move_lists))
+
+    moves = sum(len(record.moves()) for record in games)
+    print(f"Partides: {len(games)} ({moves / len(games):.1f} jugades per partida)")
+    print(f"Mida per partida: {size / total:.1f} bytes ({pickled / len(games):.0f} bytes amb pickle)")
+    print(f"Escriptura: {total / write:.0f} partides/s, lectura: {count / read:.0f} partides/s ({count} partides)")
+    print(f"Reproducció: {len(games) / replay:.0f} partides/s")
+
+
+def positions(args: argparse.Namespace) -> None:
+    """Mesura la latència de 'PositionIndex.position_at' segons les jugades entre instantànies, contra reproduir la partida."""
+    games = bot_games(args.games, args.seed)
+    rng = random.Random(args.seed)
+    queries = [(game_id, rng.randint(1, len(games[game_id].moves()) + 1))
+               for game_id in (rng.randrange(len(games)) for _ in range(args.queries))]
+    start = time.perf_counter()
+    for game_id, turn in queries:
+        games[game_id].replay(turn - 1)
+    replay = time.perf_counter() - start
+    print(f"Partides: {len(games)}, consultes: {len(queries)}")
+    print(f"Reproduint des del principi: {replay / len(queries) * 1e6:.0f} us per posició")
+
+    with tempfile.TemporaryDirectory() as directory:
+        records_path, index_path = os.path.join(directory, "games.bin"), os.path.join(directory, "games.idx")
+        with RecordWriter(records_path) as writer:
+            for record in games:
+                writer.write(record)
+        for every in args.every:
+            build_index(records_path, index_path, every)
+            with PositionIndex(records_path, index_path) as index:
+                start = time.perf_counter()
+                for game_id, turn in queries:
+                    index.position_at(game_id, turn)
+                elapsed = time.perf_counter() - start
+            print(f"Instantània cada {every:>2} jugades: {elapsed / len(queries) * 1e6:.0f} us per posició "
+                  f"({replay / elapsed:.1f}x), {os.path.getsize(index_path) / len(games):.0f} bytes d'índex per partida")
+
+
+def corpus(args: argparse.Namespace) -> None:
+    """Torna a generar el corpus de posicions de 'suite'."""
+    positions = build_corpus(args.per_category, args.seed)
+    save_corpus(args.output, positions)
+    print(f"Corpus: {args.output}, " + ", ".join(f"{category} {len(boards)}" for category, boards in positions.items()))
+
+
+def suite(args: argparse.Namespace) -> None:
+    """Mesura les operacions del motor sobre el corpus de posicions i les compara amb la referència."""
+    def progress(result: BenchResult) -> None:
+        print(f"{result.key():<26} {result.ops_per_second():>10.0f} crides/s {result.constructions:>8.1f} taulers/crida "
+              f"{result.peak_bytes / 1024:>8.1f} KB/crida", flush=True)
+
+    operations = tuple(args.operations) if args.operations else OPERATIONS
+    results = run_suite(load_corpus(args.corpus), operations, args.rounds, args.depth, load_evaluator(args.evaluator), progress)
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Referència guardada: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No hi ha referència ({args.baseline}): es pot crear amb --save")
+        return
+    regressions = compare(results, load_baseline(args.baseline), args.threshold)
+    for regression in regressions:
+        print(f"Regressió: {regression}")
+    if regressions:
+        raise SystemExit(1)
+    print(f"Cap regressió de més del {100 * args.threshold:.0f}% respecte la referència")
+
+
+def main() -> None:
+    """Punt d'entrada dels bancs de proves de rendiment."""
+    parser = argparse.ArgumentParser(description="Bancs de proves de rendiment del motor de Backgammon")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("zobrist", help="Taxa de col·lisions de les claus Zobrist")
+    command.add_argument("--games", type=int, default=20, help="Nombre de partides del bot contra ell mateix")
+    command.add_argument("--seed", type=int, default=123456, help="Llavor de la primera partida")
+    command.set_defaults(run=zobrist)
+
+    command = commands.add_parser("decisions", help="Temps i taulers construïts per decisió del bot")
+    command.add_argument("--games", type=int, default=5, help="Nombre de partides del bot contra ell mateix")
+    command.add_argument("--seed", type=int, default=123456, help="Llavor de la primera partida")
+    command.add_argument("--depth", type=int, default=2, help="Profunditat de la cerca del bot")
+    command.add_argument("--width", type=int, default=8, help="Moviments explorats a cada node de la cerca")
+    command.add_argument("--evaluator", default="heuristic", help="'heuristic' o un fitxer .npz de pesos de la xarxa neuronal")
+    command.set_defaults(run=decisions)
+
+    command = commands.add_parser("race", help="Temps per decisió del bot amb contacte i sense")
+    command.add_argument("--games", type=int, default=5, help="Nombre de partides del bot contra ell mateix")
+    command.add_argument("--seed", type=int, default=123456, help="Llavor de la primera partida")
+    command.set_defaults(run=race)
+
+    command = commands.add_parser("parallel", help="Acceleració de la cerca del bot segons el nombre de processos")
+    command.add_argument("--games", type=int, default=1, help="Nombre de partides del bot contra ell mateix")
+    command.add_argument("--seed", type=int, default=123456, help="Llavor de la primera partida")
+    command.add_argument("--step", type=int, default=20, help="Es fa servir una de cada 'step' posicions de les partides")
+    command.add_argument("--depth", type=int, default=2, help="Profunditat de la cerca del bot")
+    command.add_argument("--width", type=int, default=8, help="Moviments explorats a cada node de la cerca")
+    command.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="Nombre màxim de processos")
+    command.set_defaults(run=parallel)
+
+    command = commands.add_parser("dice", help="Tirades dels daus una a una, en bloc i saltant endavant")
+    command.add_argument("--rolls", type=int, default=1_000_000, help="Nombre de tirades")
+    command.add_argument("--seed", type=int, default=123456, help="Llavor dels daus")
+    command.set_defaults(run=dice)
+
+    command = commands.add_parser("records", help="Mida i velocitat del format de partides")
+    command.add_argument("--games", type=int, default=5, help="Nombre de partides del bot contra ell mateix")
+    command.add_argument("--copies", type=int, default=2000, help="Vegades que s'escriu cada partida al fitxer")
+    command.add_argument("--seed", type=int, default=123456, help="Llavor de la primera partida")
+    command.set_defaults(run=records)
+
+    command = commands.add_parser("positions", help="Latència de l'índex de posicions de les partides")
+    command.add_argument("--games", type=int, default=5, help="Nombre de partides del bot contra ell mateix")
+    command.add_argument("--queries", type=int, default=2000, help="Posicions a l'atzar que es consulten")
+    command.add_argument("--every", type=int, nargs="+", default=[1, 4, 8, 16], help="Jugades entre instantànies")
+    command.add_argument("--seed", type=int, default=123456, help="Llavor de la primera partida")
+    command.set_defaults(run=positions)
+
+    command = commands.add_parser("corpus", help="Torna a generar el corpus de posicions de 'suite'")
+    command.add_argument("--per-category", type=int, default=8, help="Posicions de cada categoria")
+    command.add_argument("--seed", type=int, default=1, help="Llavor de la primera partida")
+    command.add_argument("--output", default=CORPUS_PATH, help="Fitxer on es guarda el corpus")
+    command.set_defaults(run=corpus)
+
+    command = commands.add_parser("suite", help="Operacions del motor sobre el corpus, comparades amb la referència")
+    command.add_argument("--corpus", default=CORPUS_PATH, help="Fitxer del corpus de posicions")
+    command.add_argument("--baseline", default=BASELINE_PATH, help="Fitxer JSON amb els resultats de referència")
+    command.add_argument("--save", action="store_true", help="Guarda els resultats com a nova referència")
+    command.add_argument("--threshold", type=float, default=THRESHOLD, help="Empitjorament relatiu que es considera una regressió")
+    command.add_argument("--operations", nargs="+", choices=OPERATIONS, default=None, help="Operacions a mesurar (per defecte, totes)")
+    command.add_argument("--rounds", type=int, default=5, help="Rondes de cada mesura (es queda la més ràpida)")
+    command.add_argument("--depth", type=int, default=2, help="Profunditat de la cerca del bot")
+    command.add_argument("--evaluator", default="heuristic", help="'heuristic' o un fitxer .npz de pesos de la xarxa neuronal")
+    command.set_defaults(run=suite)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
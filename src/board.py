@@ -1,12 +1,39 @@
 from __future__ import annotations
+import random
+from array import array
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Literal
+import numpy as np
 
 
 WHITE = 0
 BLACK = 1
 BAR = -1
 
+# Índexs de la disposició interna del tauler (veure Board)
+_BAR_W = 24
+_BAR_B = 25
+_OFF_W = 26
+_OFF_B = 27
+
+# Per cada jugador (WHITE, BLACK): signe de les seves fitxes, la seva barra, les seves fitxes salvades i
+# l'índex de cada casella des del seu punt de vista (el negre veu el tauler girat, veure Board.flip)
+_SIGN = (1, -1)
+_BAR = (_BAR_W, _BAR_B)
+_OFF = (_OFF_W, _OFF_B)
+_POINTS = (tuple(range(24)), tuple(range(23, -1, -1)))
+
+# Taules per la clau Zobrist del tauler. Per cada posició de la disposició interna hi ha un valor
+# aleatori per cada nombre de fitxes (-15..15, indexat directament amb el nombre, també negatiu).
+# La taula "mirall" dona la clau del tauler girat (veure Board.flip), i així es pot mantenir alhora.
+_zobrist_random = random.Random(20240501)
+_ZOBRIST = [[_zobrist_random.getrandbits(64) for _ in range(31)] for _ in range(28)]
+_ZOBRIST_MIRROR = [[_ZOBRIST[23 - i][-count] for count in range(31)] for i in range(24)] + \
+                  [_ZOBRIST[_BAR_B], _ZOBRIST[_BAR_W], _ZOBRIST[_OFF_B], _ZOBRIST[_OFF_W]]
+_ZOBRIST_SIDE = _zobrist_random.getrandbits(64) # Li toca moure al negre
+_ZOBRIST_DICE = [[_zobrist_random.getrandbits(64) for _ in range(7)] for _ in range(7)]
+
 
 type Player = Literal[0] | Literal[1]
 type OptionalPlayer = Player | None
@@ -28,6 +55,11 @@ class Dice:
         return 1 <= self.die1 <= 6 and 1 <= self.die2 <= 6
 
 
+# Les 21 tirades diferents dels daus, amb la seva probabilitat (1/36 els dobles, 2/36 la resta)
+ROLLS: list[tuple[Dice, float]] = [(Dice(die1, die2), (1 if die1 == die2 else 2) / 36)
+                                   for die1 in range(1, 7) for die2 in range(die1, 7)]
+
+
 class DiceCup:
 
     _a = 1664525
@@ -45,6 +77,43 @@ class DiceCup:
         self._seed = (self._a * self._seed + self._c) % self._m
         return self._seed
 
+    @classmethod
+    def _jump(cls, steps: int) -> tuple[int, int]:
+        """
+        Retorna (A, C) tals que avançar 'steps' passos del generador és x -> (A*x + C) mod m. Es calcula
+        per exponenciació binària: aplicar dos cops x -> a*x + c és x -> a²*x + c*(a + 1).
+        """
+        multiplier, increment = 1, 0
+        a, c = cls._a, cls._c
+        while steps:
+            if steps & 1:
+                multiplier, increment = (a * multiplier) % cls._m, (a * increment + c) % cls._m
+            a, c = (a * a) % cls._m, (c * (a + 1)) % cls._m
+            steps >>= 1
+        return multiplier, increment
+
+    def skip(self, n: int) -> None:
+        """Descarta les 'n' tirades següents sense generar-les, en temps O(log n). Llença ValueError si 'n' és negatiu."""
+        if n < 0:
+            raise ValueError(f"No es poden descartar {n} tirades")
+        multiplier, increment = self._jump(2 * n)
+        self._seed = (multiplier * self._seed + increment) % self._m
+
+    def rolls(self, n: int) -> np.ndarray:
+        """
+        Retorna les 'n' tirades següents (les mateixes que 'n' crides a 'roll') com un array (n, 2)
+        d'uint8, calculades alhora: l'estat k-èssim és a^k*x + c*(1 + a + ... + a^(k-1)) mod m, i com
+        que m = 2^32 divideix 2^64, les operacions amb uint64 (que es desborden mòdul 2^64) són exactes.
+        La llavor es redueix mòdul m abans, perquè pot ser negativa o no cabre en 64 bits.
+        """
+        if n <= 0:
+            return np.empty((0, 2), dtype=np.uint8)
+        powers = np.cumprod(np.full(2 * n, self._a, dtype=np.uint64)) # a^1 .. a^2n
+        sums = np.cumsum(np.concatenate((np.ones(1, dtype=np.uint64), powers[:-1]))) # 1 + a + ... + a^(k-1)
+        states = (powers * np.uint64(self._seed % self._m) + np.uint64(self._c) * sums) & np.uint64(self._m - 1)
+        self._seed = int(states[-1])
+        return ((states % 1009) % 6 + 1).astype(np.uint8).reshape(n, 2)
+
 
 @dataclass
 class Jump:
@@ -58,59 +127,223 @@ class Move:
 
     jumps: list[Jump]  # length 0-4
 
+    def pack(self) -> bytes:
+        """Retorna el moviment en un byte per salt: (point + 1) * 6 + pips - 1. Veure 'unpack'."""
+        return bytes((jump.point + 1) * 6 + jump.pips - 1 for jump in self.jumps)
+
+    @staticmethod
+    def unpack(packed: bytes) -> Move:
+        """Reconstrueix un moviment a partir dels bytes retornats per 'pack'."""
+        return Move([Jump(byte // 6 - 1, byte % 6 + 1) for byte in packed])
+
+
+@dataclass
+class CacheInfo:
+    """Estadístiques de la memòria cau de moviments."""
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class MoveCache:
+    """
+    Memòria cau LRU, de mida limitada, dels moviments vàlids d'un tauler. Les claus són la clau
+    Zobrist de la posició, els daus, el tipus de generació i el jugador que mou; cada entrada guarda
+    també la posició, per descartar les col·lisions. Amb mida 0 queda desactivada.
+    Els moviments es guarden empaquetats (veure 'Move.pack'), de manera que són immutables i cada
+    consulta en construeix de nous: modificar-ne un de retornat no pot corrompre la memòria cau.
+    """
+
+    _maxsize: int
+    _entries: OrderedDict[tuple[int, int, int, bool, int], tuple[array[int], list]]
+    _hits: int
+    _misses: int
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: tuple[int, int, int, bool, int], position: array[int]) -> list | None:
+        """Retorna el resultat guardat per aquella clau i posició (o None si no hi és)."""
+        if not self._maxsize:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != position:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry[1]
+
+    def put(self, key: tuple[int, int, int, bool, int], position: array[int], result: list) -> None:
+        """Guarda un resultat, descartant el menys utilitzat recentment si la memòria cau és plena."""
+        if not self._maxsize:
+            return
+        self._entries[key] = (position[:], result)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        """Retorna les estadístiques d'ús de la memòria cau."""
+        return CacheInfo(self._hits, self._misses, self._maxsize, len(self._entries))
+
+
+_constructions = 0 # Nombre de taulers construïts pel procés (veure 'board_constructions')
+
+
+def board_constructions() -> int:
+    """Retorna el nombre de taulers (Board) que s'han construït fins ara en aquest procés."""
+    return _constructions
+
+
+MOVE_CACHE_SIZE = 2048 # Mida per defecte de la memòria cau de moviments
+_move_cache = MoveCache(MOVE_CACHE_SIZE)
+
+
+def configure_move_cache(maxsize: int) -> None:
+    """Canvia la mida de la memòria cau de moviments del procés (0 la desactiva) i la buida."""
+    global _move_cache
+    _move_cache = MoveCache(maxsize)
+
+
+def move_cache_info() -> CacheInfo:
+    """Retorna les estadístiques de la memòria cau de moviments del procés."""
+    return _move_cache.info()
+
 
 class Board:
 
+    # Disposició interna: un array de 28 posicions amb signe (array('b')).
+    #   0..23 -> Nombre de fitxes per posició (positiu: blanques, negatiu: negres)
+    #   24, 25 -> Fitxes blanques i negres a la barra
+    #   26, 27 -> Fitxes blanques i negres salvades
+
+    __slots__ = ("_dice", "_turn", "_data", "_undo", "_key", "_mirror", "_race")
+
     # Parameters:
-    
+
     _dice: Dice # Daus que han sortit per la jugada actual
-    _barW: int # Nombre de fitxes blanques a la barra
-    _barB: int # Nombre de fitxes negres a la barra
     _turn: int # Torn actual de la partida
-    _cells: list[int] # Nombre de fitxes, per posició, al tauler
-    _offW: int # Nombre de fitxes que han salvat les blanques
-    _offB: int # Nombre de fitxes que han salvat les negres
+    _data: array[int] # Caselles, barres i fitxes salvades, amb la disposició descrita a dalt
+    _undo: list[int] # Pila per desfer els salts aplicats amb 'apply_jump' (origen, (pips*2 + captura)*2 + jugador)
+    _key: int # Clau Zobrist de la posició, mantinguda a cada canvi de '_data'
+    _mirror: int # Clau Zobrist de la posició girada (la de 'flip()')
 
     def __init__(self, dice: Dice, turn: int = 1, cells: list[int] | None = None, barW: int = 0, barB: int = 0) -> None:
         """Construcció inicial del tauler, si no es personalitza res, es tracta com una nova partida."""
+        global _constructions
+        _constructions += 1
         self._dice = dice.copy()
-        self._barW = barW
-        self._barB = barB
         self._turn = turn
 
         # Generació de les caselles
-        if cells:
-            self._cells = cells
-        else:
-            self._cells = [2, 0, 0, 0, 0, -5, 0, -3, 0, 0, 0, 5, -5, 0, 0, 0, 3, 0, 5, 0, 0, 0, 0, -2] # Tauler amb les posicions inicials
-        
-        self._offW = 15 - sum([cell for cell in self._cells if cell > 0]) - self._barW # Totes les blanques que NO hi són al tauler
-        self._offB = 15 + sum([cell for cell in self._cells if cell < 0]) - self._barB # Totes les fixtes negres que NO ho son al tauler
-        
+        if not cells:
+            cells = [2, 0, 0, 0, 0, -5, 0, -3, 0, 0, 0, 5, -5, 0, 0, 0, 3, 0, 5, 0, 0, 0, 0, -2] # Tauler amb les posicions inicials
+
+        offW = 15 - sum([cell for cell in cells if cell > 0]) - barW # Totes les blanques que NO hi són al tauler
+        offB = 15 + sum([cell for cell in cells if cell < 0]) - barB # Totes les fixtes negres que NO ho son al tauler
+        self._data = array("b", cells)
+        self._data.extend((barW, barB, offW, offB))
+        self._undo = []
+        self._race = False
+        self._key = self._mirror = 0
+        for i, count in enumerate(self._data):
+            self._key ^= _ZOBRIST[i][count]
+            self._mirror ^= _ZOBRIST_MIRROR[i][count]
+
+    @classmethod
+    def _from_data(cls, dice: Dice, turn: int, data: array[int], key: int, mirror: int, race: bool = False) -> Board:
+        """
+        Construeix un tauler directament a partir de la seva disposició interna i claus, sense recalcular res.
+        'race' indica si ja se sap que no hi ha contacte (veure 'is_race').
+        """
+        global _constructions
+        _constructions += 1
+        board = cls.__new__(cls)
+        board._dice = dice
+        board._turn = turn
+        board._data = data
+        board._undo = []
+        board._key = key
+        board._mirror = mirror
+        board._race = race
+        return board
+
+    def __eq__(self, other: object) -> bool:
+        """Dos taulers són iguals si tenen la mateixa posició de fitxes (no es comparen ni els daus ni el torn)."""
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self._data == other._data
+
+    def __hash__(self) -> int:
+        return self._key
+
+    def key(self, dice: bool = False) -> int:
+        """
+        Retorna la clau Zobrist (64 bits) del tauler: la de la posició de les fitxes, combinada
+        amb el jugador que li toca moure i, si 'dice' és 'True', amb els daus actuals.
+        """
+        key = self._key
+        if self._turn % 2 == 0:
+            key ^= _ZOBRIST_SIDE
+        if dice:
+            key ^= _ZOBRIST_DICE[self._dice.die1][self._dice.die2]
+        return key
+
     def copy(self) -> Board:
         """Retorna una copia del tauler actual."""
-        return Board(self.dice(), self.turn(), self.cells(), self.bar(WHITE), self.bar(BLACK))
+        return Board._from_data(self._dice, self._turn, self._data[:], self._key, self._mirror, self._race)
 
     def flip(self) -> Board:
         """Retorna el mateix tauler amb els colors i sentits invertits."""
-        return Board(self.dice(), self.turn(), list(reversed([-i for i in self.cells()])), self.bar(BLACK), self.bar(WHITE))
+        data = array("b", [-cell for cell in reversed(self._data[:_BAR_W])])
+        data.extend((self._data[_BAR_B], self._data[_BAR_W], self._data[_OFF_B], self._data[_OFF_W]))
+        return Board._from_data(self._dice, self._turn, data, self._mirror, self._key, self._race)
+
+    def layout(self) -> bytes:
+        """
+        Retorna la posició del tauler en 28 bytes amb signe: les 24 posicions, les fitxes blanques
+        i negres a la barra i les fitxes blanques i negres salvades.
+        """
+        return self._data.tobytes()
+
+    def pack(self) -> bytes:
+        """
+        Retorna el tauler en 34 bytes, per enviar-lo a un altre procés o guardar-lo: la posició
+        (veure 'layout'), els dos daus i el torn (4 bytes, little-endian). Veure 'unpack'.
+        """
+        return self._data.tobytes() + bytes((self._dice.die1, self._dice.die2)) + self._turn.to_bytes(4, "little")
+
+    @classmethod
+    def unpack(cls, packed: bytes) -> Board:
+        """Reconstrueix un tauler a partir dels bytes retornats per 'pack'."""
+        data = array("b")
+        data.frombytes(packed[:28])
+        key = mirror = 0
+        for i, count in enumerate(data):
+            key ^= _ZOBRIST[i][count]
+            mirror ^= _ZOBRIST_MIRROR[i][count]
+        return cls._from_data(Dice(packed[28], packed[29]), int.from_bytes(packed[30:34], "little"), data, key, mirror)
 
     def cells(self) -> list[int]:
         """Retorna una llista amb el nombre de fitxes, per posicions, al tauler"""
-        return self._cells.copy()
+        return self._data[:_BAR_W].tolist()
 
     def cell(self, i: int) -> int:
         """Retorna el nombre de fitxes que hi ha a una posició concreta del tauler.
         Prec: 0 <= i <= 23"""
-        return self._cells[i]
+        return self._data[i]
 
     def bar(self, player: Player) -> int:
         """Retorna el nombre de fitxes que té a la barra el jugador (blanc o negre)"""
-        return self._barW if player == WHITE else self._barB
+        return self._data[_BAR_W] if player == WHITE else self._data[_BAR_B]
 
     def off(self, player: Player) -> int:
         """Retorna el nombre de fitxes que té salvades el jugador (blanc o negre)"""
-        return self._offW if player == WHITE else self._offB
+        return self._data[_OFF_W] if player == WHITE else self._data[_OFF_B]
 
     def dice(self) -> Dice:
         """Retorna una copia del dau actual que s'està jugant"""
@@ -139,171 +372,428 @@ class Board:
         """Retorna 'True' si la partida ha acabat, retorna "False" alternament."""
         return not self.winner() is None
 
-    def valid_moves(self) -> list[Move]:
-        """Retorna una llista amb tots els possibles moviments válids que es poden fer"""
-        # Comprobar si la jugada té dobles
-        if self.dice().is_double():
-            list_dice = [self.dice().die1]*2 + [self.dice().die2]*2
-        else:
-            list_dice = [self.dice().die1, self.dice().die2]
+    def is_race(self) -> bool:
+        """
+        Retorna "True" si ja no hi ha contacte entre els dos jugadors: cap fitxa a la barra i totes
+        les fitxes blanques per davant de les negres, de manera que ja no es poden capturar.
+        Un cop es trenca el contacte no es pot tornar a produir, així que el resultat es recorda i
+        passa als taulers que en deriven (copy, flip, next, play i successors).
+        """
+        if not self._race:
+            data = self._data
+            if data[_BAR_W] or data[_BAR_B]:
+                return False
+            white = next((i for i in range(24) if data[i] >= 1), 24) # Fitxa blanca més endarrerida
+            black = next((i for i in range(23, -1, -1) if data[i] <= -1), -1) # Fitxa negra més endarrerida
+            self._race = black < white
+        return self._race
+
+    def valid_moves(self, unique: bool = False, player: Player = WHITE) -> list[Move]:
+        """
+        Retorna una llista amb tots els possibles moviments válids que es poden fer.
+        Si 'unique' és 'True', només es retorna un moviment per cada posició resultant diferent.
+        'player' és el jugador que mou: si és BLACK, es mouen les fitxes negres del mateix tauler, i
+        els moviments es donen des del seu punt de vista (són els mateixos que 'flip().valid_moves()').
+        """
+        if unique:
+            return [Move.unpack(successor[0]) for successor in self._successors(player)]
+
+        key = (self._key, self._dice.die1, self._dice.die2, False, player)
+        packed_moves = _move_cache.get(key, self._data)
+        if packed_moves is not None:
+            return [Move.unpack(packed) for packed in packed_moves]
 
         # Generar tots els possibles moviments que es poden fer
-        possible_moves = self._generate_moves(self.copy(), list_dice, [])
+        possible_moves = self._generate_moves(self.copy(), self._list_dice(), [], [], player)
 
         # Quedar-se només amb aquells que tinguin el màxim nombre de moviments
-        if possible_moves:
-            len_moves = max(len(move.jumps) for move in possible_moves)
-
-            # Si el moviment només té un salt, cal utilitzar el dau més gran
-            if len_moves == 1:
-                max_move = max((move.jumps[0].pips for move in possible_moves if move.jumps))
-                valid_moves = [move for move in possible_moves if (move.jumps and move.jumps[0].pips == max_move)]
-            else:
-                valid_moves = [move for move in possible_moves if len(move.jumps) == len_moves]
-        else:
-            valid_moves = []
-
+        len_moves, max_pips = self._longest(possible_moves)
+        valid_moves = [move for move in possible_moves if self._is_longest(move, len_moves, max_pips)]
+        _move_cache.put(key, self._data, [move.pack() for move in valid_moves])
         return valid_moves
-      
-    def is_valid_move(self, move: Move) -> bool:
+
+    def successors(self, player: Player = WHITE) -> list[tuple[Move, Board]]:
+        """
+        Retorna una parella (moviment, tauler resultant) per cada posició diferent a la que
+        es pot arribar amb un moviment vàlid de 'player'. Els moviments són els mateixos que
+        retorna 'valid_moves()', quedant-se només amb el primer de cada posició.
         """
-        Donat un moviment, retorna 'True' si aquest és vàlid, considerant l'estat
-        actual del tauler. Retorn 'False' alternament.
+        successors: list[tuple[Move, Board]] = []
+        for packed, layout, key, mirror in self._successors(player):
+            data = array("b")
+            data.frombytes(layout)
+            successors.append((Move.unpack(packed), Board._from_data(self._dice, self._turn, data, key, mirror, self._race)))
+        return successors
+
+    def successor_layouts(self, player: Player = WHITE) -> bytes:
         """
-        return move in self.valid_moves()
+        Retorna la posició (veure 'layout') de cada tauler de 'successors(player)', una darrere
+        l'altra, sense construir cap tauler nou.
+        """
+        return b"".join([layout for _, layout, _, _ in self._successors(player)])
 
-    def play(self, move: Move) -> Board:
+    def _successors(self, player: Player = WHITE) -> list[tuple[bytes, bytes, int, int]]:
+        """
+        Igual que 'successors', però amb el moviment empaquetat (veure 'Move.pack') i, en comptes de
+        cada tauler resultant, la seva posició (veure 'layout') i les seves claus Zobrist, sense
+        construir cap tauler. La llista és la de la memòria cau: no s'ha de modificar.
         """
-        Retorna una copia del tauler després d'aplicar-li un moviment.
+        key = (self._key, self._dice.die1, self._dice.die2, True, player)
+        successors = _move_cache.get(key, self._data)
+        if successors is None:
+            # Generar els moviments descartant les branques que ja hem explorat
+            possible_moves = self._generate_successors(self.copy(), self._list_dice(), [], [], set(), player)
+            len_moves, max_pips = self._longest([successor[0] for successor in possible_moves])
+
+            # Quedar-se només amb aquells que tinguin el màxim nombre de moviments, un per posició
+            positions: dict[bytes, tuple[bytes, bytes, int, int]] = {}
+            for move, layout, zobrist, mirror in possible_moves:
+                if layout not in positions and self._is_longest(move, len_moves, max_pips):
+                    positions[layout] = (move.pack(), layout, zobrist, mirror)
+            successors = list(positions.values())
+            _move_cache.put(key, self._data, successors)
+
+        return successors
+
+    def _list_dice(self) -> list[int]:
+        """Retorna la llista de daus que es poden jugar (quatre si són dobles)"""
+        # Comprobar si la jugada té dobles
+        if self.dice().is_double():
+            return [self.dice().die1]*2 + [self.dice().die2]*2
+        return [self.dice().die1, self.dice().die2]
+
+    def _longest(self, possible_moves: list[Move]) -> tuple[int, int]:
+        """
+        Donada una llista de moviments generats, retorna el màxim nombre de salts que es poden fer
+        i, si només se'n pot fer un, el dau més gran que es pot jugar (0 alternament).
+        """
+        len_moves = max(len(move.jumps) for move in possible_moves)
+
+        # Si el moviment només té un salt, cal utilitzar el dau més gran
+        if len_moves == 1:
+            return len_moves, max(move.jumps[0].pips for move in possible_moves if move.jumps)
+        return len_moves, 0
+
+    def _is_longest(self, move: Move, len_moves: int, max_pips: int) -> bool:
+        """Retorna 'True' si el moviment fa servir el màxim nombre de daus possible (veure '_longest')"""
+        if len_moves == 1:
+            return bool(move.jumps) and move.jumps[0].pips == max_pips
+        return len(move.jumps) == len_moves
+
+    def is_valid_move(self, move: Move, player: Player = WHITE) -> bool:
+        """
+        Donat un moviment de 'player' (veure 'valid_moves'), retorna 'True' si aquest és vàlid,
+        considerant l'estat actual del tauler. Retorn 'False' alternament.
+        Es comproba directament (sense generar tots els moviments) reproduint els salts i
+        assegurant-se que no es podien fer més salts, o un salt amb el dau més gran.
+        """
+        list_dice = self._list_dice()
+        board = self.copy()
+
+        # Cada salt ha de fer servir un dau que quedi i ha de ser legal en el moment de fer-lo
+        for jump in move.jumps:
+            if jump.pips not in list_dice or jump not in (self._generate_jumps(board, jump.pips, player) or []):
+                return False
+            list_dice.remove(jump.pips)
+            board.apply_jump(jump, player)
+
+        # Si s'han fet servir tots els daus, segur que és el màxim nombre de salts possible
+        if not list_dice:
+            return True
+
+        # Alternament, no hi ha d'haver cap manera de fer més salts
+        max_jumps = self._max_jumps(self.copy(), self._list_dice(), player)
+        if len(move.jumps) != max_jumps:
+            return False
+
+        # Si només es pot fer un salt, cal utilitzar el dau més gran possible
+        if max_jumps == 1:
+            max_pips = max(die for die in self._list_dice() if self._generate_jumps(self, die, player))
+            return move.jumps[0].pips == max_pips
+        return True
+
+    def _max_jumps(self, current_board: Board, list_dice: list[int], player: Player) -> int:
+        """
+        Retorna el màxim nombre de salts que es poden fer sobre el tauler amb la llista de daus.
+        La cerca s'atura tan bon punt troba una manera de fer servir tots els daus.
+        """
+        max_jumps = 0
+        for i in range(len(list_dice)):
+            die = list_dice[i]
+            valid_jumps = self._generate_jumps(current_board, die, player)
+            if valid_jumps:
+                del list_dice[i]
+                for jump in valid_jumps:
+                    current_board.apply_jump(jump, player)
+                    max_jumps = max(max_jumps, 1 + self._max_jumps(current_board, list_dice, player))
+                    current_board.undo_jump()
+                    if max_jumps == len(list_dice) + 1:
+                        break
+                list_dice.insert(i, die)
+                if max_jumps == len(list_dice):
+                    return max_jumps
+
+            # Amb dobles tots els daus restants són iguals
+            if current_board.dice().is_double():
+                break
+        return max_jumps
+
+    def play(self, move: Move, player: Player = WHITE) -> Board:
+        """
+        Retorna una copia del tauler després d'aplicar-li un moviment de 'player' (veure 'valid_moves').
         Prec: El moviment ha de ser vàlid.
         """
         next_board = self.copy()
         for jump in move.jumps:
-            jump_position = jump.point + jump.pips
+            next_board._jump(jump.point, jump.pips, player)
+        return next_board
 
-            # Treure la fitxa de l'origen
-            if jump.point == -1:
-                next_board._barW -= 1
-            else:
-                next_board._cells[jump.point] -= 1
+    def apply_jump(self, jump: Jump, player: Player = WHITE) -> None:
+        """
+        Aplica un salt de 'player' sobre el mateix tauler (sense fer-ne cap copia) i el guarda a la
+        pila de desfer, de manera que 'undo_jump' el pugui desfer.
+        Prec: El salt ha de ser legal.
+        """
+        hit = self._jump(jump.point, jump.pips, player)
+        self._undo.append(jump.point)
+        self._undo.append((jump.pips * 2 + hit) * 2 + player)
 
-            # Si el moviment es un "bear off"
-            if jump_position > 23:
-                next_board._offW += 1
+    def undo_jump(self) -> None:
+        """
+        Desfà l'últim salt aplicat amb 'apply_jump', deixant el tauler tal com estava.
+        Prec: Hi ha d'haver algun salt aplicat.
+        """
+        record = self._undo.pop()
+        point = self._undo.pop()
+        self._race = False # Potser abans del salt encara hi havia contacte
+        pips, hit, player = record >> 2, (record >> 1) & 1, record & 1
+        sign, points = _SIGN[player], _POINTS[player]
+        jump_position = point + pips
+
+        # Tornar la fitxa al destí on era
+        if jump_position > 23:
+            self._add(_OFF[player], -1)
+        elif hit:
+            self._add(points[jump_position], -2 * sign)
+            self._add(_BAR[1 - player], -1)
+        else:
+            self._add(points[jump_position], -sign)
 
-            # Si el moviment és una captura
-            elif next_board.cell(jump_position) == -1:
-                next_board._cells[jump_position] = 1
-                next_board._barB += 1
+        # Tornar la fitxa a l'origen
+        if point == -1:
+            self._add(_BAR[player], 1)
+        else:
+            self._add(points[point], sign)
 
-            # Si és un moviment normal
-            else:
-                next_board._cells[jump_position] += 1
+    def apply_move(self, move: Move, player: Player = WHITE) -> None:
+        """Aplica tots els salts d'un moviment de 'player' sobre el mateix tauler (veure 'apply_jump')."""
+        for jump in move.jumps:
+            self.apply_jump(jump, player)
+
+    def undo_move(self, move: Move) -> None:
+        """Desfà tots els salts d'un moviment aplicat amb 'apply_move'."""
+        for _ in move.jumps:
+            self.undo_jump()
+
+    def _jump(self, point: int, pips: int, player: Player) -> int:
+        """
+        Mou una fitxa de 'player' de 'point' 'pips' posicions (des del seu punt de vista) sobre el
+        mateix tauler. Retorna 1 si el salt ha capturat una fitxa del rival, 0 alternament.
+        """
+        sign, points = _SIGN[player], _POINTS[player]
+        jump_position = point + pips
+
+        # Treure la fitxa de l'origen
+        if point == -1:
+            self._add(_BAR[player], -1)
+        else:
+            self._add(points[point], -sign)
+
+        # Si el moviment es un "bear off"
+        if jump_position > 23:
+            self._add(_OFF[player], 1)
+
+        # Si el moviment és una captura
+        elif self._data[points[jump_position]] == -sign:
+            self._add(points[jump_position], 2 * sign)
+            self._add(_BAR[1 - player], 1)
+            return 1
+
+        # Si és un moviment normal
+        else:
+            self._add(points[jump_position], sign)
+
+        return 0
+
+    def _add(self, i: int, delta: int) -> None:
+        """Suma 'delta' a la posició 'i' de la disposició interna, actualitzant les claus Zobrist."""
+        data = self._data
+        old = data[i]
+        new = data[i] = old + delta
+        self._key ^= _ZOBRIST[i][old] ^ _ZOBRIST[i][new]
+        self._mirror ^= _ZOBRIST_MIRROR[i][old] ^ _ZOBRIST_MIRROR[i][new]
 
-        return next_board
-        
     def next(self, dice: Dice) -> Board:
         """Retorna una copia del tauler preparat pel següent moviment."""
-        next_board = self.copy()
-        next_board._dice = dice
-        next_board._turn += 1
-        return next_board
+        return Board._from_data(dice, self._turn + 1, self._data[:], self._key, self._mirror, self._race)
     
-    def _generate_moves(self, current_board: Board, list_dice: list[int], list_moves: list[Move] = [], current_move: Move = Move(jumps=[])) -> list[Move]:
+    def _generate_moves(self, current_board: Board, list_dice: list[int], list_moves: list[Move], jumps: list[Jump],
+                        player: Player) -> list[Move]:
         """
         Donat un tauler i una llista de daus, utilitza generació exhaustiva per retornar una llista amb 
         tots els possibles moviments que es poden fer amb aquella llista de daus.
+        El tauler es recorre aplicant i desfent els salts sobre ell mateix ('jumps' són els salts aplicats
+        fins ara), de manera que en acabar queda igual que estava.
         Nota: Cal diferenciar entre salts (moure una fitxa x posicions) de moviments (moure x fitxes y posicions)
         """
         # Cas base: No tenim daus disponibles, per tant, no podem fer salts xd
         if list_dice == []:
-            list_moves.append(current_move)
+            list_moves.append(Move(jumps=jumps[:]))
             return list_moves
         
         else:
             # Per cada dau que encara ens quedi, generem tots els salts válids que podem fer
             valid_jumps: list[Jump] | None = []
-            for die in list_dice:
-                valid_jumps = self._generate_jumps(current_board, die)
+            for i in range(len(list_dice)):
+                die = list_dice[i]
+                valid_jumps = self._generate_jumps(current_board, die, player)
 
                 # Si tenim salts válids, per cadascun generem recursivament els següents moviments
                 if valid_jumps:
+                    del list_dice[i]
                     for jump in valid_jumps:
-                        # Creem un nou tauler simulant aquell moviment i treient el dau que acabem d'utilitzar.
-                        new_board = current_board.copy().play(Move(jumps=[jump]))
-                        new_current_move = Move(jumps=current_move.jumps + [jump])
-
-                        new_list_dice = list_dice[:]
-                        new_list_dice.remove(die)
+                        # Simulem el salt sobre el mateix tauler, traient el dau que acabem d'utilitzar.
+                        current_board.apply_jump(jump, player)
+                        jumps.append(jump)
 
                         # Recursió per generar més moviments a partir del salt
-                        self._generate_moves(new_board, new_list_dice, list_moves, new_current_move)
+                        self._generate_moves(current_board, list_dice, list_moves, jumps, player)
+
+                        jumps.pop()
+                        current_board.undo_jump()
+                    list_dice.insert(i, die)
 
                 # Si resulta que els daus són dobles, no cal provar per tots els daus restants, ja que són iguals
                 if current_board.dice().is_double():
-                    list_moves.append(current_move)
+                    list_moves.append(Move(jumps=jumps[:]))
                     return list_moves
             
             # Si després de probar amb tots els daus no podem fer salts, afeigim el moviment que haguem fet fins aquest
             if not valid_jumps:
-                list_moves.append(current_move) 
+                list_moves.append(Move(jumps=jumps[:]))
 
             return list_moves
         
-    def _generate_jumps(self, board: Board, die: int) -> list[Jump] | None:
+    def _generate_successors(self, current_board: Board, list_dice: list[int], list_moves: list[tuple[Move, bytes, int, int]],
+                             jumps: list[Jump], visited: set[tuple[bytes, tuple[int, ...]]], player: Player) -> list[tuple[Move, bytes, int, int]]:
         """
-        Donat un tauler i un moviment de dau, retorna tots els salts legals que es poden
-        fer en aquella jugada.
+        Igual que '_generate_moves', però retorna també la posició resultant de cada moviment (i les seves
+        claus Zobrist, veure '_successors') i no torna a explorar una posició a la que ja s'ha arribat
+        amb els mateixos daus restants (per exemple, amb dobles, moure la fitxa A i després la B o moure
+        primer la B i després la A).
+        """
+        # Si ja hem arribat abans a aquesta posició amb els mateixos daus, la branca ja està generada
+        layout = current_board._data.tobytes()
+        state = (layout, tuple(list_dice))
+        if state in visited:
+            return list_moves
+        visited.add(state)
+
+        # Cas base: No tenim daus disponibles
+        if list_dice == []:
+            list_moves.append((Move(jumps=jumps[:]), layout, current_board._key, current_board._mirror))
+            return list_moves
+
+        valid_jumps: list[Jump] | None = []
+        for i in range(len(list_dice)):
+            die = list_dice[i]
+            valid_jumps = self._generate_jumps(current_board, die, player)
+            if valid_jumps:
+                del list_dice[i]
+                for jump in valid_jumps:
+                    current_board.apply_jump(jump, player)
+                    jumps.append(jump)
+                    self._generate_successors(current_board, list_dice, list_moves, jumps, visited, player)
+                    jumps.pop()
+                    current_board.undo_jump()
+                list_dice.insert(i, die)
+
+            # Amb dobles tots els daus restants són iguals
+            if current_board.dice().is_double():
+                list_moves.append((Move(jumps=jumps[:]), layout, current_board._key, current_board._mirror))
+                return list_moves
+
+        if not valid_jumps:
+            list_moves.append((Move(jumps=jumps[:]), layout, current_board._key, current_board._mirror))
+
+        return list_moves
+
+    def _generate_jumps(self, board: Board, die: int, player: Player = WHITE) -> list[Jump] | None:
+        """
+        Donat un tauler i un moviment de dau, retorna tots els salts legals que pot
+        fer 'player' en aquella jugada (des del seu punt de vista).
         """
         list_jumps: list[Jump] = []
+        data = board._data
+        # Les caselles es recorren des del punt de vista del jugador, i les fitxes seves són positives
+        sign, points = _SIGN[player], _POINTS[player]
 
         # Si tenim fitxes a la barra, primer les hem de treure
-        if board.bar(WHITE) > 0:    
+        if data[_BAR[player]] > 0:
             next_position = die - 1
-            next_position_points = board.cell(next_position)
+            next_position_points = data[points[next_position]] * sign
             
-            # Si a la següent posició tenim ALGUNA fitxa blanca, EXACTAMENT UNA negra o ESTA BUIDA, el moviment és legal
+            # Si a la següent posició tenim ALGUNA fitxa pròpia, EXACTAMENT UNA del rival o ESTA BUIDA, el moviment és legal
             if next_position_points >= -1:
                 list_jumps.append(Jump(-1, die))
                 return list_jumps
             return None
 
-        # Per fitxes al tauler
-        for position, points in enumerate(board.cells()): # position: nombre casella, points: fitxes a la casella
-            # Si la casella pertany al jugador blanc
-            if points >= 1: 
+        # Per fitxes al tauler (amb les del blanc, que és el cas habitual, es llegeixen directament)
+        cells = data if player == WHITE else data[23::-1]
+        for position in range(24): # position: nombre casella, count: fitxes a la casella
+            count = cells[position] * sign
+            # Si la casella pertany al jugador
+            if count >= 1:
                 next_position = position + die
                 # Si el moviment és un "bear off" válid
                 if next_position > 23:
-                    if self._can_bear_off(board, Jump(position, die)):
+                    if self._can_bear_off(board, Jump(position, die), player):
                         list_jumps.append(Jump(position, die))
 
                 else:
-                    next_position_points = board.cell(next_position)
-                    # Si a la següent posició tenim ALGUNA fitxa blanca, EXACTAMENT UNA negra o ESTA BUIDA, el moviment és legal
-                    if next_position_points >= -1:
+                    # Si a la següent posició tenim ALGUNA fitxa pròpia, EXACTAMENT UNA del rival o ESTA BUIDA, el moviment és legal
+                    if cells[next_position] * sign >= -1:
                         list_jumps.append(Jump(position, die))                
         return list_jumps
     
-    def _can_bear_off(self, board: Board, jump: Jump) -> bool:
+    def _can_bear_off(self, board: Board, jump: Jump, player: Player = WHITE) -> bool:
         """
-        Donat un tauler, retorna "True" si totes les fitxes blanques es troben al home 
+        Donat un tauler, retorna "True" si totes les fitxes de 'player' es troben al home
         per fer "bear off". Retorna "False" alternament.
         """
         # Assegurar-se de que no hi ha cap fitxa fora del home board, sino pot fer "bear off".
-        for position, points in enumerate(board.cells()): # position: nombre casella, points: fitxes a la casella
-            if points >= 1 and position < 18:
-                return False
-            if position >= 18:
-                break
+        data, sign, points = board._data, _SIGN[player], _POINTS[player]
+        if (max(data[:18]) >= 1) if player == WHITE else (min(data[6:24]) <= -1):
+            return False
     
         # Si el salt es "exacte"
         if jump.point + jump.pips == 24:
             return True
 
         # Si el salt es passa
-        furthest_point = min((pos for pos in range(18, 24) if (board.cell(pos) >= 1 and pos + max(self.dice().die1, self.dice().die2) >= 24)))
+        furthest_point = min((pos for pos in range(18, 24) if (data[points[pos]] * sign >= 1 and pos + max(self.dice().die1, self.dice().die2) >= 24)))
         if jump.point + jump.pips > 24 and jump.point == furthest_point:
             return True
         
         return False
+
+
+def layouts(boards: list[Board]) -> np.ndarray:
+    """Retorna la posició de cada tauler (veure 'Board.layout') com un array de mida (N, 28) d'int8."""
+    return np.frombuffer(b"".join([board.layout() for board in boards]), dtype=np.int8).reshape(-1, 28)
+
+
+def successor_layouts(board: Board, player: Player = WHITE) -> np.ndarray:
+    """Retorna les posicions de tots els taulers resultants dels moviments vàlids (veure 'layouts')."""
+    return np.frombuffer(board.successor_layouts(player), dtype=np.int8).reshape(-1, 28)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import struct
+from dataclasses import dataclass
+from typing import Callable
+from board import ROLLS, Board, Move
+
+
+BOOK_FORMAT = 1 # Versió del format del fitxer del llibre d'obertures
+
+# Capçalera: identificador, versió del format, versió de l'avaluació, jugades, profunditat i amplada de la cerca, entrades
+_HEADER = struct.Struct("<4sBIBBBI")
+_MAGIC = b"BGBK"
+# Entrada: clau de la posició (veure 'Board.key'), daus (6 * (menor - 1) + major - 1) i moviment (veure 'Move.pack')
+_ENTRY = struct.Struct("<QB4s")
+_PADDING = b"\xff" # Els moviments de menys de 4 salts s'omplen amb aquest byte
+
+
+def _book_key(board: Board) -> tuple[int, int]:
+    """Retorna la clau d'un tauler al llibre: la de la posició i el torn, i els daus (sense ordre)."""
+    dice = board.dice()
+    low, high = min(dice.die1, dice.die2), max(dice.die1, dice.die2)
+    return board.key(), 6 * (low - 1) + high - 1
+
+
+@dataclass
+class BookInfo:
+    """Estadístiques del llibre d'obertures."""
+    hits: int # Consultes que han trobat la posició
+    misses: int # Consultes que no l'han trobat
+    entries: int # Posicions del llibre
+    version: int # Versió de l'avaluació amb què s'ha generat
+
+
+class OpeningBook:
+    """
+    Llibre d'obertures: la millor jugada, calculada prèviament, de les posicions de les primeres
+    jugades de la partida. Les posicions es busquen per la seva clau Zobrist i els daus.
+    """
+
+    version: int # Versió de l'avaluació amb què s'ha generat
+    plies: int # Jugades de la partida que cobreix
+    depth: int # Profunditat de la cerca amb què s'ha generat
+    width: int # Amplada de la cerca amb què s'ha generat
+    _moves: dict[tuple[int, int], bytes]
+    _hits: int
+    _misses: int
+
+    def __init__(self, version: int, plies: int, depth: int, width: int) -> None:
+        self.version = version
+        self.plies = plies
+        self.depth = depth
+        self.width = width
+        self._moves = {}
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+    def add(self, board: Board, move: Move) -> None:
+        """Afegeix (o substitueix) la jugada d'un tauler."""
+        self._moves[_book_key(board)] = move.pack()
+
+    def __contains__(self, board: Board) -> bool:
+        return _book_key(board) in self._moves
+
+    def lookup(self, board: Board) -> Move | None:
+        """Retorna la jugada del llibre per aquell tauler (o None si no hi és)."""
+        packed = self._moves.get(_book_key(board))
+        if packed is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return Move.unpack(packed)
+
+    def info(self) -> BookInfo:
+        """Retorna les estadístiques d'ús del llibre."""
+        return BookInfo(self._hits, self._misses, len(self._moves), self.version)
+
+    def save(self, path: str) -> None:
+        """Guarda el llibre en un fitxer binari (13 bytes per posició)."""
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, BOOK_FORMAT, self.version, self.plies, self.depth, self.width, len(self._moves)))
+            for (key, dice), packed in sorted(self._moves.items()):
+                file.write(_ENTRY.pack(key, dice, packed.ljust(4, _PADDING)))
+
+    @classmethod
+    def load(cls, path: str, version: int) -> OpeningBook:
+        """
+        Carrega un llibre guardat amb 'save'. Llença ValueError si el fitxer no és un llibre d'aquest
+        format o si s'ha generat amb una altra versió de l'avaluació (i, per tant, s'ha de regenerar).
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path} no és un llibre d'obertures")
+        magic, book_format, book_version, plies, depth, width, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or book_format != BOOK_FORMAT or len(data) != _HEADER.size + count * _ENTRY.size:
+            raise ValueError(f"{path} no és un llibre d'obertures del format {BOOK_FORMAT}")
+        if book_version != version:
+            raise ValueError(f"{path} s'ha generat amb la versió {book_version} de l'avaluació (la actual és la {version})")
+
+        book = cls(book_version, plies, depth, width)
+        for key, dice, packed in _ENTRY.iter_unpack(memoryview(data)[_HEADER.size:]):
+            book._moves[(key, dice)] = packed.rstrip(_PADDING)
+        return book
+
+
+def build(choose: Callable[[Board], Move], plies: int, version: int, depth: int, width: int,
+          progress: Callable[[int, int], None] | None = None) -> OpeningBook:
+    """
+    Genera el llibre de les primeres 'plies' jugades de la partida: des del tauler inicial amb
+    qualsevol tirada, la jugada escollida per 'choose' i, després de cada jugada del llibre,
+    totes les tirades del rival (des del seu punt de vista). Si es dona, es crida 'progress'
+    amb la jugada i el nombre de posicions noves de cada jugada.
+    """
+    book = OpeningBook(version, plies, depth, width)
+    frontier = [Board(dice) for dice, _ in ROLLS]
+    for ply in range(1, plies + 1):
+        if progress is not None:
+            progress(ply, len(frontier))
+        next_frontier: dict[tuple[int, int], Board] = {}
+        for board in frontier:
+            move = choose(board)
+            book.add(board, move)
+            after = board.play(move)
+            if ply < plies and not after.over():
+                for dice, _ in ROLLS:
+                    next_board = after.next(dice).flip()
+                    if next_board not in book:
+                        next_frontier.setdefault(_book_key(next_board), next_board)
+        frontier = list(next_frontier.values())
+    return book
@@ -1,45 +1,514 @@
-from board import Board, Move, WHITE
+import os, sys, time, warnings
+import numpy as np
+from bearoff import BEAROFF_PATH, BearoffDatabase, is_bearoff
+from book import BookInfo, OpeningBook
+from evaluator import HEURISTIC, Evaluator, HeuristicEvaluator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from board import BLACK, ROLLS, Board, Move, Player, WHITE, layouts, successor_layouts
 from dataclasses import dataclass
 
+EVALUATOR_VERSION = 1 # Versió de l'avaluació estàtica: s'ha d'incrementar quan canvia, perquè es regeneri el llibre d'obertures
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "opening-book.bin")
+
+DEPTH = 2 # Profunditat per defecte de la cerca del bot
+MAX_DEPTH = 4 # Profunditat màxima de la cerca amb límit de temps
+
+
 @dataclass
 class EvaluatedMove:
     move: Move
-    score: int
-
-def bot(board: Board) -> Move:
-    """
-    Escull la millor jugada possible pel jugador actual, suposant que el rival jugarà 
-    la miilor resposta a aquell moviment.    
-    """
-    moves = evaluate_moves(board)
-    # Si hi han moviments possibles, retorna el de millor puntuació, sino retorna buit.
-    return moves[0].move if moves else Move(jumps=[])
-
-def evaluate_moves(board: Board) -> list[EvaluatedMove]:
-    """Donat un tauler, retorna una llista ordenada de les millors jugades possibles."""
-    evaluated_moves: list[EvaluatedMove] = []
-
-    # Evalua tots els possibles moviments del blanc
-    white_moves = [EvaluatedMove(move, evaluate_board(board, move)) for move in board.valid_moves()]
-
-    white_moves.sort(key=lambda x: (x.score), reverse=True)
-    
-    # Por cada moviment que pot fer el blanc, suposem que el negre jugarà la millor resposta
-    for white_move in white_moves[:50]:
-        simulated_board = board.copy().play(white_move.move)
-
-        # Trobar la millor resposta del negre
-        best_Bmove = 0
-        for Bmove in simulated_board.valid_moves():
-            board_puntuation = evaluate_board(simulated_board, Bmove)
-            best_Bmove = max(best_Bmove, board_puntuation)
-        
-        # L'evaluació serà la diferència entre el moviment del blanc i la del negre
-        evaluated_moves.append(EvaluatedMove(white_move.move, white_move.score - best_Bmove))
-    
+    score: float
+
+
+@dataclass
+class SearchStats:
+    """Estadístiques de la cerca feta pel bot en una decisió."""
+    depth: int = 0 # Profunditat (en jugades) de la cerca
+    nodes: int = 0 # Nombre de posicions avaluades
+    seconds: float = 0.0 # Temps total de la cerca
+
+    def nodes_per_second(self) -> float:
+        """Retorna el nombre de posicions avaluades per segon."""
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+
+last_search = SearchStats() # Estadístiques de l'última decisió del bot
+
+
+@dataclass
+class TableInfo:
+    """Estadístiques de la taula de transposicions."""
+    hits: int # Consultes que han trobat el valor
+    misses: int # Consultes que no l'han trobat
+    stores: int # Valors guardats
+    evictions: int # Valors guardats que n'han substituït un altre d'una posició diferent
+    entries: int # Entrades ocupades
+    capacity: int # Nombre màxim d'entrades
+
+    def hit_rate(self) -> float:
+        """Retorna la proporció de consultes que han trobat el valor."""
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    def fill(self) -> float:
+        """Retorna la proporció d'entrades ocupades."""
+        return self.entries / self.capacity if self.capacity else 0.0
+
+
+class TranspositionTable:
+    """
+    Taula de transposicions, de memòria limitada, amb els valors exactes de la cerca del bot als
+    nodes d'atzar. Cada entrada guarda la posició, la profunditat, l'amplada i l'avaluació de la cerca
+    (la seva 'key', que no canvia entre còpies, i no pas l'objecte, que podria ocupar molta memòria),
+    i el valor només es fa servir per una cerca idèntica, de manera que la taula no canvia les jugades
+    escollides. Cada posició té dues entrades possibles: la primera es queda amb la cerca més
+    profunda i la segona es substitueix sempre. Amb memòria 0 queda desactivada.
+    """
+
+    ENTRY_BYTES = 176 # Memòria aproximada de cada entrada (posició, profunditat, amplada, avaluació i valor)
+
+    _buckets: int
+    _entries: list[tuple[bytes, int, int, str, float] | None]
+    _hits: int
+    _misses: int
+    _stores: int
+    _evictions: int
+
+    def __init__(self, max_bytes: int) -> None:
+        self._buckets = max_bytes // (2 * self.ENTRY_BYTES)
+        self._entries = [None] * (2 * self._buckets)
+        self._hits = self._misses = self._stores = self._evictions = 0
+
+    def _index(self, board: Board, depth: int) -> int:
+        """Retorna la primera de les dues entrades on pot estar la posició a aquella profunditat."""
+        return 2 * ((hash(board) + depth) % self._buckets)
+
+    def get(self, board: Board, depth: int, width: int, evaluator: Evaluator) -> float | None:
+        """Retorna el valor guardat d'aquella posició i cerca (o None si no hi és)."""
+        if not self._buckets:
+            return None
+        index = self._index(board, depth)
+        layout = board.layout()
+        for entry in self._entries[index:index + 2]:
+            if entry is not None and entry[1] == depth and entry[2] == width and entry[0] == layout and entry[3] == evaluator.key:
+                self._hits += 1
+                return entry[4]
+        self._misses += 1
+        return None
+
+    def put(self, board: Board, depth: int, width: int, evaluator: Evaluator, value: float) -> None:
+        """Guarda el valor exacte d'una posició per aquella cerca."""
+        if not self._buckets:
+            return
+        index = self._index(board, depth)
+        preferred = self._entries[index]
+        if preferred is not None and preferred[1] > depth:
+            index += 1
+        replaced = self._entries[index]
+        layout = board.layout()
+        if replaced is not None and replaced[0] != layout:
+            self._evictions += 1
+        self._entries[index] = (layout, depth, width, sys.intern(evaluator.key), value)
+        self._stores += 1
+
+    def info(self) -> TableInfo:
+        """Retorna les estadístiques d'ús de la taula."""
+        entries = sum(entry is not None for entry in self._entries)
+        return TableInfo(self._hits, self._misses, self._stores, self._evictions, entries, len(self._entries))
+
+
+TABLE_BYTES = 16 * 2**20 # Memòria per defecte de la taula de transposicions
+_table = TranspositionTable(TABLE_BYTES)
+
+
+def configure_table(max_bytes: int) -> None:
+    """Canvia la memòria de la taula de transposicions del procés (0 la desactiva) i la buida."""
+    global _table
+    _table = TranspositionTable(max_bytes)
+
+
+def table_info() -> TableInfo:
+    """Retorna les estadístiques de la taula de transposicions del procés."""
+    return _table.info()
+
+
+def bot(board: Board, depth: int | None = None, width: int = 8, deadline_ms: float | None = None,
+        book: bool = True, bearoff: bool = True, race: bool = True, evaluator: Evaluator = HEURISTIC,
+        player: Player = WHITE) -> Move:
+    """
+    Escull la millor jugada possible pel jugador actual, amb una cerca expectiminimax de 'depth'
+    jugades (per defecte DEPTH): després de cada moviment, el rival pot treure qualsevol de les 21
+    tirades i jugarà la seva millor resposta. A cada tirada només s'exploren en profunditat els
+    'width' millors moviments segons l'avaluació estàtica 'evaluator'.
+    Si es dona 'deadline_ms', la cerca s'aprofundeix jugada a jugada (fins a 'depth', per defecte
+    MAX_DEPTH) i es retorna la millor jugada trobada quan s'acaba el temps (amb un retard de com a
+    molt una generació de moviments). 'last_search.depth' indica la profunditat que s'ha completat.
+    Si 'book' és 'True' i la posició és al llibre d'obertures (veure 'load_book'), es retorna
+    directament la jugada del llibre (i 'last_search.depth' és 0); el llibre només es fa servir amb
+    l'avaluació heurística, que és la que l'ha generat. Igualment, si 'bearoff' és 'True'
+    i és una posició de "bear off" sense contacte, es retorna la jugada exacta de la base de dades
+    de bear off (veure 'load_bearoff'). Si 'race' és 'True' i ja no hi ha contacte, n'hi ha prou amb
+    escollir a una jugada la millor posició segons 'race_scores' (i 'last_search.depth' és 1).
+    'player' és el jugador que mou (veure 'Board.valid_moves'): amb BLACK, el tauler és el de la
+    partida i la jugada es dona des del punt de vista del negre. La cerca sempre veu el tauler des
+    del jugador que mou, així que només es gira el tauler de l'arrel.
+    """
+    if player == BLACK:
+        board = board.flip()
+    search = _Search(width, evaluator)
+    if book and _book is not None and isinstance(evaluator, HeuristicEvaluator):
+        move = _book.lookup(board)
+        if move is not None:
+            search.finish(0)
+            return move
+    if bearoff and _bearoff is not None and is_bearoff(board):
+        move = _bearoff.best_move(board)
+        search.finish(0)
+        return move
+    if race and board.is_race():
+        successors = board.successors()
+        race_values = race_scores(layouts([next_board for _, next_board in successors]))
+        search.stats.nodes += len(successors)
+        search.finish(1)
+        return successors[int(np.argmax(race_values))][0]
+
+    moves, scores = search.expand(board)
+    candidates = list(zip(moves[:width], scores))
+
+    # Amb profunditat 1 n'hi ha prou amb l'avaluació estàtica
+    if deadline_ms is None:
+        depth = DEPTH if depth is None else depth
+        if depth == 1:
+            best_move = moves[0][0]
+        elif _pool is not None:
+            values = search.parallel_values(candidates, depth)
+            best_move = candidates[values.index(max(values))][0][0]
+        else:
+            best_move = search.root(candidates, depth)
+        search.finish(depth)
+        return best_move
+
+    # Aprofundiment iteratiu: la jugada de l'avaluació estàtica ja és una resposta vàlida, i cada
+    # iteració comença pels moviments que millor han sortit a l'anterior
+    search.set_deadline(deadline_ms)
+    best_move, reached = moves[0][0], 1
+    for current in range(2, (MAX_DEPTH if depth is None else depth) + 1):
+        if len(candidates) == 1:
+            break
+        try:
+            best_move = search.root(candidates, current)
+        except _Timeout:
+            # El primer moviment és el millor de l'anterior iteració: si ja s'ha superat, el nou és millor
+            if search.root_best is not None:
+                best_move = search.root_best
+            break
+        reached = current
+        order = sorted(range(len(candidates)), key=lambda i: search.root_values[i], reverse=True)
+        candidates = [candidates[i] for i in order]
+
+    search.finish(reached)
+    return best_move
+
+
+def evaluate_moves(board: Board, depth: int | None = None, width: int = 8, evaluator: Evaluator = HEURISTIC) -> list[EvaluatedMove]:
+    """
+    Donat un tauler, retorna una llista ordenada de les millors jugades possibles, amb el seu valor
+    exacte segons la cerca de 'bot' de 'depth' jugades (per defecte DEPTH), només dels 'width' millors
+    moviments segons l'avaluació estàtica.
+    """
+    depth = DEPTH if depth is None else depth
+    search = _Search(width, evaluator)
+    moves, scores = search.expand(board)
+    if depth == 1:
+        evaluated_moves = [EvaluatedMove(move, score) for (move, _), score in zip(moves, scores)]
+    elif _pool is not None:
+        candidates = list(zip(moves[:width], scores))
+        evaluated_moves = [EvaluatedMove(move, value)
+                           for ((move, _), _), value in zip(candidates, search.parallel_values(candidates, depth))]
+    else:
+        evaluated_moves = [EvaluatedMove(move, search.value_after(next_board, score, depth - 1, -float("inf"), float("inf")))
+                           for (move, next_board), score in zip(moves[:width], scores)]
+    search.finish(depth)
+
     # Ordenem els moviments per puntuació de major a menor
-    return (sorted(evaluated_moves, key=lambda x: (x.score), reverse=True))
-        
+    return sorted(evaluated_moves, key=lambda x: (x.score), reverse=True)
+
+
+_book: OpeningBook | None = None # Llibre d'obertures del bot (veure 'load_book')
+
+
+def load_book(path: str | None = BOOK_PATH) -> None:
+    """
+    Carrega el llibre d'obertures que fa servir el bot (amb None, el bot no en fa servir cap).
+    Si el fitxer no existeix, o s'ha generat amb una altra versió de l'avaluació, no se'n fa servir cap.
+    """
+    global _book
+    _book = None
+    if path is None or not os.path.exists(path):
+        return
+    try:
+        _book = OpeningBook.load(path, EVALUATOR_VERSION)
+    except ValueError as error:
+        warnings.warn(f"No es fa servir el llibre d'obertures: {error}")
+
+
+def book_info() -> BookInfo | None:
+    """Retorna les estadístiques del llibre d'obertures del bot (o None si no en fa servir cap)."""
+    return _book.info() if _book is not None else None
+
+
+load_book() # El llibre d'obertures es carrega en importar el mòdul
+
+
+_bearoff: BearoffDatabase | None = None # Base de dades de bear off del bot (veure 'load_bearoff')
+
+
+def load_bearoff(path: str | None = BEAROFF_PATH) -> None:
+    """
+    Mapa a memòria la base de dades de bear off que fa servir el bot (amb None, el bot no en fa
+    servir cap). Si el fitxer no existeix o no és vàlid, no se'n fa servir cap.
+    """
+    global _bearoff
+    _bearoff = None
+    if path is None or not os.path.exists(path):
+        return
+    try:
+        _bearoff = BearoffDatabase(path)
+    except ValueError as error:
+        warnings.warn(f"No es fa servir la base de dades de bear off: {error}")
+
+
+load_bearoff() # La base de dades de bear off es mapa a memòria en importar el mòdul
+
+
+_pool: ProcessPoolExecutor | None = None # Processos que cerquen els moviments de l'arrel (veure 'configure_workers')
+
+
+def configure_workers(workers: int) -> None:
+    """
+    Fa que les cerques del bot sense límit de temps reparteixin els moviments de l'arrel entre
+    'workers' processos, que es mantenen vius entre decisions. Amb 0 o 1 es cerca en aquest procés.
+    El resultat és el mateix en tots els casos.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = ProcessPoolExecutor(workers) if workers > 1 else None
+
+
+def _search_candidate(packed: bytes, score: float, depth: int, width: int, evaluator: Evaluator) -> tuple[float, int]:
+    """
+    Tasca dels processos de 'configure_workers': retorna el valor exacte, cercant 'depth' jugades,
+    del tauler empaquetat (veure 'Board.pack') al que s'ha arribat amb un moviment de l'arrel, i
+    el nombre de posicions avaluades.
+    """
+    search = _Search(width, evaluator)
+    value = search.value_after(Board.unpack(packed), score, depth - 1, -float("inf"), float("inf"))
+    return value, search.stats.nodes
+
+
+class _Timeout(Exception):
+    """S'ha acabat el temps de la cerca."""
+
+
+class _Search:
+    """
+    Cerca expectiminimax amb poda Star1/Star2 als nodes d'atzar. Tots els taulers es veuen des del
+    punt de vista del jugador que li toca moure (les blanques) i els valors són els de l'avaluació estàtica.
+    """
+
+    _width: int # Nombre de moviments que s'exploren en profunditat a cada node
+    _evaluator: Evaluator # Avaluació estàtica de les posicions
+    _bound: float # Cota del valor absolut de les puntuacions de l'avaluació
+    _start: float # Moment en què ha començat la cerca
+    _deadline: float | None # Moment en què s'ha d'aturar la cerca (None si no hi ha límit)
+    stats: SearchStats
+    root_best: Move | None # Millor moviment de l'arrel que s'ha demostrat fins ara a la iteració actual
+    root_values: list[float] # Valors (o cotes) dels moviments de l'arrel de l'última iteració
+    _exact: bool # Si l'últim valor retornat per la cerca és exacte (i no només una cota)
+
+    def __init__(self, width: int, evaluator: Evaluator) -> None:
+        self._width = width
+        self._evaluator = evaluator
+        self._bound = evaluator.bound
+        self._start = time.perf_counter()
+        self._deadline = None
+        self.stats = SearchStats()
+        self.root_best = None
+        self.root_values = []
+        self._exact = True
+
+    def set_deadline(self, deadline_ms: float) -> None:
+        """A partir d'ara, la cerca s'atura (amb '_Timeout') 'deadline_ms' mil·lisegons després de començar."""
+        self._deadline = self._start + deadline_ms / 1000
+
+    def _check_deadline(self) -> None:
+        """Atura la cerca si s'ha acabat el temps."""
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise _Timeout()
+
+    def root(self, candidates: list[tuple[tuple[Move, Board], float]], depth: int) -> Move:
+        """
+        Retorna el millor dels moviments candidats (amb el tauler resultant i la seva avaluació
+        estàtica) cercant 'depth' jugades. Els moviments es cerquen en ordre i cadascun només ha de
+        demostrar si millora el millor trobat fins ara.
+        """
+        self.root_best, self.root_values = None, []
+        best_move, best_score = candidates[0][0][0], -float("inf")
+        for (move, next_board), score in candidates:
+            value = self.value_after(next_board, score, depth - 1, best_score, float("inf"))
+            self.root_values.append(value)
+            if value > best_score:
+                best_move, best_score = move, value
+                self.root_best = best_move
+        return best_move
+
+    def finish(self, depth: int) -> None:
+        """Tanca la cerca i en publica les estadístiques a 'last_search'."""
+        global last_search
+        self.stats.depth = depth
+        self.stats.seconds = time.perf_counter() - self._start
+        last_search = self.stats
+
+    def expand(self, board: Board) -> tuple[list[tuple[Move, Board]], list[float]]:
+        """
+        Retorna els moviments vàlids del tauler (amb el tauler resultant) ordenats de millor a pitjor
+        segons l'avaluació estàtica, juntament amb aquesta avaluació.
+        """
+        self._check_deadline()
+        successors = board.successors()
+        scores = self._evaluator.score(layouts([next_board for _, next_board in successors])).tolist()
+        self.stats.nodes += len(successors)
+        order = sorted(range(len(successors)), key=lambda i: scores[i], reverse=True)
+        return [successors[i] for i in order], [scores[i] for i in order]
+
+    def parallel_values(self, candidates: list[tuple[tuple[Move, Board], float]], depth: int) -> list[float]:
+        """
+        Retorna els valors exactes dels moviments candidats (veure 'root'), cercats en paral·lel als
+        processos de 'configure_workers'. Els valors exactes no depenen de l'ordre de la cerca.
+        """
+        packed = [next_board.pack() for (_, next_board), _ in candidates]
+        scores = [score for _, score in candidates]
+        values = []
+        for value, nodes in _pool.map(_search_candidate, packed, scores, repeat(depth), repeat(self._width), repeat(self._evaluator)):
+            values.append(value)
+            self.stats.nodes += nodes
+        return values
+
+    def value_after(self, board: Board, score: float, depth: int, alpha: float, beta: float) -> float:
+        """
+        Retorna el valor del tauler pel jugador que acaba de moure ('score' és la seva avaluació
+        estàtica), cercant 'depth' jugades més. Si el valor queda fora de la finestra (alpha, beta),
+        pot ser només una cota ('_exact' indica si el valor retornat és exacte).
+        """
+        if depth == 0 or board.over():
+            self._exact = True
+            return score
+        return -self.chance(board.flip(), depth, -beta, -alpha)
+
+    def chance(self, board: Board, depth: int, alpha: float, beta: float) -> float:
+        """
+        Retorna el valor esperat, pel jugador que tira els daus, de les 21 tirades possibles.
+        Star2: abans de res se sondeja cada tirada amb el seu millor moviment segons l'avaluació estàtica,
+        que dona una cota inferior. Star1: a mesura que es cerquen les tirades, si el valor esperat ja no
+        pot entrar a la finestra (alpha, beta), es retorna la cota sense cercar la resta.
+        Els valors exactes es guarden a la taula de transposicions.
+        """
+        stored = _table.get(board, depth, self._width, self._evaluator)
+        if stored is not None:
+            self._exact = True
+            return stored
+
+        children = [board.next(dice) for dice, _ in ROLLS]
+        lower = [-self._bound] * len(ROLLS)
+        lower_exact = [False] * len(ROLLS)
+        expansions: list[tuple[list[tuple[Move, Board]], list[float]] | None] = [None] * len(ROLLS)
+
+        # Star2: sondejar cada tirada (només té sentit si les tirades no són fulles, on el sondeig ja és la cerca)
+        if depth > 1:
+            for i, child in enumerate(children):
+                expansions[i] = moves, scores = self.expand(child)
+                lower[i] = self.value_after(moves[0][1], scores[0], depth - 1, -self._bound, self._bound)
+                lower_exact[i] = self._exact
+            probed = sum(probability * value for (_, probability), value in zip(ROLLS, lower))
+            if probed >= beta:
+                self._exact = False
+                return probed
+
+        # Star1
+        value = 0.0
+        exact = True
+        rest_lower = sum(probability * value for (_, probability), value in zip(ROLLS, lower))
+        rest_upper = float(self._bound)
+        for i, (child, (_, probability)) in enumerate(zip(children, ROLLS)):
+            rest_lower -= probability * lower[i]
+            rest_upper -= probability * self._bound
+            child_alpha = (alpha - value - rest_upper) / probability
+            child_beta = (beta - value - rest_lower) / probability
+            child_value = self.best(child, depth, max(child_alpha, lower[i]), min(child_beta, self._bound),
+                                    expansions[i], lower[i] if lower_exact[i] else None)
+            value += probability * child_value
+            exact = exact and self._exact
+            if child_value <= child_alpha:
+                self._exact = False
+                return value + rest_upper
+            if child_value >= child_beta:
+                self._exact = False
+                return value + rest_lower
+
+        if exact:
+            _table.put(board, depth, self._width, self._evaluator, value)
+        self._exact = exact
+        return value
+
+    def best(self, board: Board, depth: int, alpha: float, beta: float,
+             expansion: tuple[list[tuple[Move, Board]], list[float]] | None = None, probe: float | None = None) -> float:
+        """
+        Retorna el valor del millor moviment pel jugador que li toca moure, cercant 'depth' jugades.
+        'expansion' són els moviments ja ordenats (veure 'expand') i 'probe' el valor exacte ja conegut del primer.
+        """
+        # Si és l'última jugada de la cerca, el valor és la millor avaluació estàtica
+        if depth == 1:
+            self._check_deadline()
+            positions = successor_layouts(board)
+            self.stats.nodes += len(positions)
+            self._exact = True
+            return float(self._evaluator.score(positions).max())
+
+        moves, scores = expansion if expansion else self.expand(board)
+        best, exact = -float("inf"), False
+        for i, ((_, next_board), score) in enumerate(zip(moves[:self._width], scores)):
+            if i == 0 and probe is not None and expansion:
+                value, self._exact = probe, True
+            else:
+                value = self.value_after(next_board, score, depth - 1, max(alpha, best), beta)
+            # El valor és exacte si ho és el del millor moviment: els altres són, com a molt, el millor
+            if value > best:
+                best, exact = value, self._exact
+            if best >= beta:
+                exact = False
+                break
+        self._exact = exact
+        return best
+
+
+# Fitxes malgastades, al "bear off", per cada fitxa a les caselles 18..23 (com més a prop de sortir, més punts dels daus es perden)
+_RACE_WASTAGE = np.array([0.0, 0.25, 0.5, 1.0, 1.5, 2.0])
+_RACE_STACK = 0.5 # Fitxes malgastades per cada fitxa de més de 3 en una casella del home
+
+
+def race_scores(layouts: np.ndarray) -> np.ndarray:
+    """
+    Avaluació de N posicions sense contacte (veure 'layouts'), des del punt de vista de les blanques:
+    menys el seu recompte efectiu de punts, és a dir, els punts que els falten per salvar totes les
+    fitxes més una estimació dels que malgastaran al "bear off".
+    """
+    white = np.maximum(layouts[:, :24], 0).astype(np.int64)
+    pips = white @ np.arange(24, 0, -1)
+    home = white[:, 18:24]
+    wastage = home @ _RACE_WASTAGE + _RACE_STACK * np.maximum(home - 3, 0).sum(axis=1)
+    return -(pips + wastage)
+
 
 def evaluate_board(board: Board, move: Move) -> int:
     """
@@ -48,24 +517,27 @@ def evaluate_board(board: Board, move: Move) -> int:
     2) Fer "bear off" (cada fitxa +30)
     3) Tenir fitxes a la barra (-20 per fitxa)
     4) Tenir fitxes soles (cada fitxa -15)
+    El moviment s'aplica sobre el mateix tauler i es desfà abans de retornar.
     """
     move_puntuation = 0
-    next_board = board.copy().play(move)
+    board.apply_move(move)
+    cells = board.cells()
 
     # Quan més avançades les fitxes millor (cada posició +1)
-    for cell in next_board.cells():
+    for cell in cells:
         if cell >= 1:
             move_puntuation += cell
 
     # Fer "bear off" (cada fitxa +30)
-    move_puntuation += 30 * next_board.off(WHITE)
+    move_puntuation += 30 * board.off(WHITE)
 
     # Tenir fitxes a la barra (-20 punts per fitxa)
-    move_puntuation -= 20 * next_board.bar(WHITE)
+    move_puntuation -= 20 * board.bar(WHITE)
 
     # Tenir fitxes soles (cada fitxa -15)
-    for cell in next_board.cells():
+    for cell in cells:
         if cell == 1:
             move_puntuation -= 15
-    
+
+    board.undo_move(move)
     return move_puntuation
@@ -1,12 +1,16 @@
-from board import Board, DiceCup, WHITE
+import argparse
+from board import Board, DiceCup, WHITE, BLACK
 from show import show
 from bot import bot
+from evaluator import HEURISTIC, Evaluator, load_evaluator
 
-def main():
+def main(deadline_ms: float | None = None, evaluator: Evaluator = HEURISTIC):
     """
     Gestiona una partida entre dos humans. Representa a la terminal l'estat de cada 
     moviment. Cada torn representa primer el moviment del WHITE i després el moviment del BLACK.
     La partida finalitza quan un dels jugadors guanya la partida.
+    Si es dona 'deadline_ms', cada bot té aquests mil·lisegons per decidir cada moviment.
+    Els dos bots avaluen les posicions amb 'evaluator'.
     """
     # Inicialització de la partida
     seed = 123456
@@ -18,7 +22,7 @@ def main():
     # Torn del WHITE
     while not board.over():
         print(f"JPetit: \033[3mTinc els daus: {board.dice().die1, board.dice().die2} deixa'm pensar...\033[0m")
-        move = bot(board)
+        move = bot(board, deadline_ms=deadline_ms, evaluator=evaluator)
         if move.jumps:
             print(f"JPetit: \033[3mCrec que mouré {[(23 - jump.point + 1, jump.pips) for jump in move.jumps]}\033[0m")
         else:
@@ -29,21 +33,23 @@ def main():
 
         # Torn del BLACK
         if not board.over():
-            board = board.flip()
             print(f"JPetitEvil: \033[3mTinc els daus: {board.dice().die1, board.dice().die2} deixa'm pensar...\033[0m")
-            move = bot(board)
+            move = bot(board, deadline_ms=deadline_ms, evaluator=evaluator, player=BLACK)
             if move.jumps:
                 print(f"JPetitEvil: \033[3mCrec que mouré {[(23 - jump.point + 1, jump.pips) for jump in move.jumps]}\033[0m")
             else:
                 print("JPetitEvil: \033[3mPasso el meu torn, no puc moure fitxes\033[0m (JPetitEvil is turnin' eviler >:c)")
-            board = board.play(move)
+            board = board.play(move, BLACK)
             board = board.next(cup.roll())
-            board = board.flip()
             show(board)
     
-    # Donar els guanyadors i la llavor de la partidas
-    print(f"Winner: {'W' if board.winner() == WHITE else 'B'}")
+    # Donar els guanyadors i la llavor de la partidas (el tauler sempre està orientat pel blanc)
+    print(f"Winner: {'W' if board.off(WHITE) == 15 else 'B'}")
     print(f"Seed: {seed}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Partida entre dos bots")
+    parser.add_argument("--deadline-ms", type=float, default=None, help="Mil·lisegons per decidir cada moviment")
+    parser.add_argument("--evaluator", default="heuristic", help="'heuristic' o un fitxer .npz de pesos de la xarxa neuronal")
+    args = parser.parse_args()
+    main(args.deadline_ms, load_evaluator(args.evaluator))
\ No newline at end of file
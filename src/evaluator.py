@@ -0,0 +1,166 @@
+from __future__ import annotations
+import hashlib
+from dataclasses import dataclass
+from typing import Protocol
+import numpy as np
+
+
+class Evaluator(Protocol):
+    """
+    Avaluació estàtica de posicions pel bot. Les posicions es donen en blocs, com un array (N, 28)
+    d'int8 (veure 'Board.layout'), i es puntuen des del punt de vista de les blanques: com més alta,
+    millor per elles. La puntuació ha de ser antisimètrica (la d'una posició vista pel rival és la
+    mateixa canviada de signe) i el seu valor absolut no pot superar 'bound'. Dues avaluacions amb
+    la mateixa 'key' han de donar les mateixes puntuacions: la taula de transposicions del bot
+    les identifica així, també entre processos (on cada tasca rep una còpia de l'avaluació).
+    """
+
+    @property
+    def bound(self) -> float:
+        """Cota del valor absolut de les puntuacions."""
+        ...
+
+    @property
+    def key(self) -> str:
+        """Identificador de l'avaluació."""
+        ...
+
+    def score(self, layouts: np.ndarray) -> np.ndarray:
+        """Retorna la puntuació de cada posició (un array de N floats)."""
+        ...
+
+
+def mirror(layouts: np.ndarray) -> np.ndarray:
+    """Retorna les N posicions vistes pel rival (veure 'Board.flip')."""
+    return np.concatenate((-layouts[:, 23::-1], layouts[:, [25, 24, 27, 26]]), axis=1)
+
+
+def evaluate_boards(layouts: np.ndarray) -> np.ndarray:
+    """
+    Versió vectoritzada de 'bot.evaluate_board': donades N posicions (un array (N, 28) d'int8,
+    veure 'board.layouts') retorna la puntuació de cadascuna amb la mateixa heurística.
+    """
+    cells = layouts[:, :24].astype(np.int64)
+    scores = np.where(cells >= 1, cells, 0).sum(axis=1) # Quan més avançades les fitxes millor
+    scores += 30 * layouts[:, 26].astype(np.int64) # Fer "bear off" (cada fitxa +30)
+    scores -= 20 * layouts[:, 24].astype(np.int64) # Tenir fitxes a la barra (-20 punts per fitxa)
+    scores -= 15 * (cells == 1).sum(axis=1) # Tenir fitxes soles (cada fitxa -15)
+    return scores
+
+
+def evaluate_positions(layouts: np.ndarray) -> np.ndarray:
+    """
+    Avaluació simètrica de N posicions (veure 'board.layouts'), des del punt de vista de les blanques:
+    la puntuació de les blanques menys la de les negres (veure 'evaluate_boards').
+    """
+    return evaluate_boards(layouts) - evaluate_boards(mirror(layouts))
+
+
+@dataclass(frozen=True)
+class HeuristicEvaluator:
+    """L'heurística original del bot (veure 'evaluate_positions')."""
+
+    bound: float = 750 # 15 fitxes salvades contra 15 a la barra
+
+    @property
+    def key(self) -> str:
+        return "heuristic"
+
+    def score(self, layouts: np.ndarray) -> np.ndarray:
+        return evaluate_positions(layouts).astype(np.float64)
+
+
+HEURISTIC = HeuristicEvaluator()
+
+
+def encode(layouts: np.ndarray) -> np.ndarray:
+    """
+    Codifica N posicions per la xarxa neuronal, a l'estil de TD-Gammon: per cada casella i jugador,
+    quatre unitats (si hi ha com a mínim 1, 2 i 3 fitxes, i (fitxes - 3) / 2 de la resta), i per cada
+    jugador les fitxes a la barra / 2 i les fitxes salvades / 15. Retorna un array (N, 196).
+    """
+    cells = layouts[:, :24].astype(np.float64)
+    units = []
+    for checkers in (np.maximum(cells, 0), np.maximum(-cells, 0)):
+        units += [checkers >= 1, checkers >= 2, checkers >= 3, np.maximum(checkers - 3, 0) / 2]
+    bar_off = layouts[:, 24:28].astype(np.float64) / np.array([2, 2, 15, 15])
+    return np.concatenate([np.stack(units, axis=2).reshape(len(layouts), -1), bar_off], axis=1)
+
+
+INPUTS = 24 * 2 * 4 + 4 # Mida de la codificació de 'encode'
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+class NeuralEvaluator:
+    """
+    Xarxa neuronal d'una capa oculta (sigmoides), a l'estil de TD-Gammon, que estima la probabilitat
+    de guanyar de les blanques a partir de la codificació de 'encode'. La puntuació d'una posició és
+    la seva probabilitat menys la de la mateixa posició vista pel rival, de manera que és antisimètrica
+    i queda entre -1 i 1. Els pesos es guarden en fitxers .npz.
+    """
+
+    bound: float = 1.0
+    hidden_weights: np.ndarray # (INPUTS, H)
+    hidden_bias: np.ndarray # (H,)
+    output_weights: np.ndarray # (H,)
+    output_bias: float
+    key: str # Resum dels pesos (veure 'rekey')
+
+    def __init__(self, hidden_weights: np.ndarray, hidden_bias: np.ndarray, output_weights: np.ndarray, output_bias: float) -> None:
+        self.hidden_weights = np.asarray(hidden_weights, dtype=np.float64)
+        self.hidden_bias = np.asarray(hidden_bias, dtype=np.float64)
+        self.output_weights = np.asarray(output_weights, dtype=np.float64)
+        self.output_bias = float(output_bias)
+        self.rekey()
+
+    def rekey(self) -> None:
+        """Recalcula 'key' a partir dels pesos: s'ha de cridar després de modificar-los."""
+        digest = hashlib.blake2b(digest_size=16)
+        for weights in (self.hidden_weights, self.hidden_bias, self.output_weights, np.float64(self.output_bias)):
+            digest.update(np.ascontiguousarray(weights).tobytes())
+        self.key = f"neural-{digest.hexdigest()}"
+
+    @classmethod
+    def random(cls, hidden: int = 40, seed: int = 0) -> NeuralEvaluator:
+        """Retorna una xarxa amb 'hidden' neurones ocultes i pesos aleatoris petits (per entrenar-la)."""
+        rng = np.random.default_rng(seed)
+        return cls(rng.normal(0, 0.1, (INPUTS, hidden)), np.zeros(hidden), rng.normal(0, 0.1, hidden), 0.0)
+
+    @classmethod
+    def load(cls, path: str) -> NeuralEvaluator:
+        """Carrega els pesos d'un fitxer guardat amb 'save'."""
+        with np.load(path) as weights:
+            return cls(weights["hidden_weights"], weights["hidden_bias"], weights["output_weights"], weights["output_bias"])
+
+    def save(self, path: str) -> None:
+        """Guarda els pesos en un fitxer .npz (en float32)."""
+        np.savez_compressed(path, hidden_weights=self.hidden_weights.astype(np.float32),
+                            hidden_bias=self.hidden_bias.astype(np.float32),
+                            output_weights=self.output_weights.astype(np.float32),
+                            output_bias=np.float32(self.output_bias))
+
+    def forward(self, layouts: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Passa N posicions per la xarxa i retorna les entrades (veure 'encode'), les activacions de
+        la capa oculta i la sortida: el mateix càlcul per jugar que per entrenar (veure 'train.gradients').
+        """
+        inputs = encode(layouts)
+        hidden = _sigmoid(inputs @ self.hidden_weights + self.hidden_bias)
+        return inputs, hidden, _sigmoid(hidden @ self.output_weights + self.output_bias)
+
+    def probabilities(self, layouts: np.ndarray) -> np.ndarray:
+        """Retorna la probabilitat estimada de guanyar de les blanques a cada posició."""
+        return self.forward(layouts)[2]
+
+    def score(self, layouts: np.ndarray) -> np.ndarray:
+        return self.probabilities(layouts) - self.probabilities(mirror(layouts))
+
+
+def load_evaluator(name: str) -> Evaluator:
+    """Retorna l'avaluació indicada: "heuristic" per l'heurística, o el camí d'un fitxer .npz de pesos de la xarxa neuronal."""
+    if name == "heuristic":
+        return HEURISTIC
+    return NeuralEvaluator.load(name)
@@ -28,20 +28,18 @@ def main() -> None:
         
         # Torn del bot
         if not board.over():
-            board = board.flip()
             print(f"JPetit: \033[3mTinc els daus: {board.dice().die1, board.dice().die2} deixa'm pensar...\033[0m")
-            move = bot(board)
+            move = bot(board, player=BLACK)
             if move.jumps:
                 print(f"JPetit: \033[3mCrec que mouré {[(23 - jump.point + 1, jump.pips) for jump in move.jumps]}\033[0m")
             else:
                 print("JPetit: \033[3mPasso el meu torn, no puc moure fitxes\033[0m (JPetit is sad :c)")
-            board = board.play(move)
+            board = board.play(move, BLACK)
             board = board.next(cup.roll())
-            board = board.flip()
             show(board)
 
-    # Donar els guanyadors i la llavor de la partida
-    print(f"Winner: {'W' if board.winner() == WHITE else 'B'}")
+    # Donar els guanyadors i la llavor de la partida (el tauler sempre està orientat pel blanc)
+    print(f"Winner: {'W' if board.off(WHITE) == 15 else 'B'}")
     print(f"Seed: {seed}")
 
 if __name__ == "__main__":
@@ -1,11 +1,11 @@
 import sys
-from board import Board, WHITE, DiceCup, Move, Jump
+from board import Board, WHITE, BLACK, DiceCup, Move, Jump, Player
 from show import show
 
-def read_move(current_board: Board) -> Move:
+def read_move(current_board: Board, player: Player = WHITE) -> Move:
     """
     Llegeix una linea donada desde la terminal i la converteix en un objecte Move, 
-    desprésde validar si aquell moviment era legal.
+    desprésde validar si aquell moviment era legal pel jugador 'player' (des del seu punt de vista).
     Exemple: "0 2 0 1" la converteix Move(jumps=[Jump(point=0, pips=2), Jump(point=0, pips=1)])
     """
     blank_move = Move(jumps=[])
@@ -17,7 +17,7 @@ def read_move(current_board: Board) -> Move:
 
         # Si l'usuari necessita ajuda per saber els movimients que pot fer
         if line == ["?"]:
-            valid_moves = current_board.valid_moves()
+            valid_moves = current_board.valid_moves(player=player)
             if valid_moves == blank_move:
                 print("No tens moviments possibles. Siusplau, passa el torn!")
                 continue
@@ -31,7 +31,7 @@ def read_move(current_board: Board) -> Move:
         
         # Si l'usuari no té moviments per fer
         if line == ["\n"]:
-            if current_board.valid_moves() == [blank_move]:
+            if current_board.valid_moves(player=player) == [blank_move]:
                 return blank_move
             
         # Si l'entrada no té el el par complet (point, pip)
@@ -53,7 +53,7 @@ def read_move(current_board: Board) -> Move:
                 continue
         
 
-        if not current_board.is_valid_move(move):
+        if not current_board.is_valid_move(move, player):
             print("El moviment indicat no es valid, torna a probar!\n(Escriu '?' per veure els moviments possibles)")
         
         else:
@@ -85,15 +85,13 @@ def main() -> None:
         # Torn de BLACK
         if not board.over():
             print("Torn del negre!")
-            board = board.flip()
-            move = read_move(board)
-            board = board.play(move)
+            move = read_move(board, BLACK)
+            board = board.play(move, BLACK)
             board = board.next(cup.roll())
-            board = board.flip()
             show(board)
 
-    # Donar els guanyadors i la llavor de la partida
-    print(f"Winner: {'W' if board.winner() == WHITE else 'B'}")
+    # Donar els guanyadors i la llavor de la partida (el tauler sempre està orientat pel blanc)
+    print(f"Winner: {'W' if board.off(WHITE) == 15 else 'B'}")
     print(f"Seed: {seed}")
 
 if __name__ == "__main__":
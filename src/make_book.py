@@ -0,0 +1,33 @@
+import argparse, os, time
+from board import Board, Move
+from book import build
+from bot import BOOK_PATH, EVALUATOR_VERSION, bot
+
+
+def main() -> None:
+    """
+    Genera el llibre d'obertures del bot: la seva millor jugada, amb una cerca més profunda que
+    la de la partida, per les posicions de les primeres jugades. S'ha de tornar a generar cada
+    cop que canvia l'avaluació estàtica (veure 'bot.EVALUATOR_VERSION').
+    """
+    parser = argparse.ArgumentParser(description="Genera el llibre d'obertures del bot")
+    parser.add_argument("--plies", type=int, default=2, help="Jugades de la partida que cobreix el llibre")
+    parser.add_argument("--depth", type=int, default=3, help="Profunditat de la cerca del bot")
+    parser.add_argument("--width", type=int, default=4, help="Moviments explorats a cada node de la cerca")
+    parser.add_argument("--output", default=BOOK_PATH, help="Fitxer on es guarda el llibre")
+    args = parser.parse_args()
+
+    def choose(board: Board) -> Move:
+        return bot(board, args.depth, args.width, book=False)
+
+    def progress(ply: int, positions: int) -> None:
+        print(f"Jugada {ply}: {positions} posicions ({time.perf_counter() - start:.0f}s)", flush=True)
+
+    start = time.perf_counter()
+    book = build(choose, args.plies, EVALUATOR_VERSION, args.depth, args.width, progress)
+    book.save(args.output)
+    print(f"Llibre: {len(book)} posicions, {os.path.getsize(args.output)} bytes, {time.perf_counter() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+import argparse, time
+from dataclasses import dataclass, field
+from board import BLACK, ROLLS, Board, Dice, configure_move_cache, move_cache_info
+
+
+GENERATORS = ("valid_moves", "successors")
+
+
+@dataclass
+class PerftResult:
+    """Resultat de 'perft': el recompte de l'arbre de jugades d'una posició."""
+    generator: str # Generador de moviments (veure 'GENERATORS')
+    depth: int # Jugades de l'arbre
+    leaves: int # Fulles de l'arbre: seqüències de tirades i moviments (o posicions per tirada, amb "successors")
+    unique: int # Posicions diferents a l'última jugada
+    positions: int # Posicions generades a totes les jugades
+    seconds: float # Temps total
+    by_roll: dict[str, int] = field(default_factory=dict) # Fulles per cada tirada de la primera jugada
+
+    def positions_per_second(self) -> float:
+        """Retorna el nombre de posicions generades per segon."""
+        return self.positions / self.seconds if self.seconds else 0.0
+
+
+def _children(board: Board, generator: str) -> list[Board]:
+    """Retorna les posicions a les que es pot arribar des del tauler (amb els seus daus) amb el generador donat."""
+    if generator == "valid_moves":
+        return [board.play(move) for move in board.valid_moves()]
+    if generator == "successors":
+        return [next_board for _, next_board in board.successors()]
+    raise ValueError(f"Generador desconegut: {generator}")
+
+
+def _expand(board: Board, dice: Dice, depth: int, generator: str, result: PerftResult, leaves: set[bytes]) -> int:
+    """
+    Expandeix l'arbre de 'depth' jugades des del tauler (li toca tirar al blanc) amb la primera
+    tirada 'dice', i retorna el nombre de fulles. Les partides acabades no s'expandeixen més.
+    """
+    children = _children(board.next(dice), generator)
+    result.positions += len(children)
+    if depth == 1:
+        leaves.update(child.layout() for child in children)
+        return len(children)
+    return sum(_expand(child.flip(), roll, depth - 1, generator, result, leaves)
+               for child in children if not child.over() for roll, _ in ROLLS)
+
+
+def perft(board: Board, depth: int, generator: str = "valid_moves") -> PerftResult:
+    """
+    Compta l'arbre de jugades de 'depth' jugades des de 'board' (li toca tirar al blanc; els seus
+    daus s'ignoren): a cada jugada, les 21 tirades i tots els moviments legals de cadascuna. Amb
+    "valid_moves" cada moviment és una branca, encara que porti a la mateixa posició que un altre,
+    com el perft dels escacs; amb "successors", només una per posició resultant. Les posicions
+    diferents de l'última jugada han de ser les mateixes amb tots dos. Com els mats als escacs,
+    les partides acabades abans de l'última jugada no tenen més moviments ni aporten cap fulla.
+    La memòria cau de moviments es desactiva, perquè es mesuri la generació, i després es torna a
+    deixar com estava.
+    """
+    result = PerftResult(generator, depth, 0, 0, 0, 0.0)
+    leaves: set[bytes] = set()
+    cache_size = move_cache_info().maxsize
+    configure_move_cache(0)
+    start = time.perf_counter()
+    try:
+        if depth == 0:
+            result.leaves = result.unique = 1
+            return result
+        if board.over():
+            return result
+        for dice, _ in ROLLS:
+            count = _expand(board, dice, depth, generator, result, leaves)
+            result.by_roll[f"{dice.die1}-{dice.die2}"] = count
+            result.leaves += count
+        result.unique = len(leaves)
+    finally:
+        result.seconds = time.perf_counter() - start
+        configure_move_cache(cache_size)
+    return result
+
+
+def differential(board: Board, depth: int) -> list[str]:
+    """
+    Prova diferencial dels generadors: recorre l'arbre de 'depth' jugades (veure 'perft') i, a cada
+    node, compara les posicions resultants de 'valid_moves' + 'play' amb les de 'successors' i
+    amb les de 'successors(BLACK)' sobre el tauler girat (el generador directe del negre).
+    Retorna una descripció de cada node on no coincideixen (la posició en hexadecimal, veure
+    'Board.pack'), o una llista buida si coincideixen a tot arreu.
+    """
+    mismatches: list[str] = []
+    cache_size = move_cache_info().maxsize
+    configure_move_cache(0)
+    try:
+        frontier = [board] if not board.over() else []
+        for _ in range(depth):
+            following: list[Board] = []
+            for node in frontier:
+                for dice, _ in ROLLS:
+                    rolled = node.next(dice)
+                    reference = {child.layout(): child for child in _children(rolled, "valid_moves")}
+                    fast = [child.layout() for child in _children(rolled, "successors")]
+                    black = {child.flip().layout() for _, child in rolled.flip().successors(BLACK)}
+                    if len(set(fast)) != len(fast) or set(fast) != set(reference) or black != set(reference):
+                        mismatches.append(f"{rolled.pack().hex()}: {len(reference)} posicions amb valid_moves, "
+                                          f"{len(set(fast))} amb successors, {len(black)} amb successors(BLACK)")
+                    following.extend(child.flip() for child in reference.values() if not child.over())
+            # Cada posició només s'expandeix un cop per jugada
+            frontier = list({node.layout(): node for node in following}.values())
+    finally:
+        configure_move_cache(cache_size)
+    return mismatches
+
+
+def main() -> None:
+    """Compta l'arbre de jugades d'una posició amb cada generador de moviments."""
+    parser = argparse.ArgumentParser(description="Recompte de l'arbre de jugades (perft) per validar i mesurar la generació de moviments")
+    parser.add_argument("--position", default=None, help="Tauler en hexadecimal (veure 'Board.pack'); per defecte, l'inicial")
+    parser.add_argument("--depth", type=int, default=1, help="Jugades de l'arbre")
+    parser.add_argument("--generator", choices=GENERATORS, nargs="+", default=list(GENERATORS), help="Generadors de moviments")
+    parser.add_argument("--divide", action="store_true", help="Mostra les fulles per cada tirada de la primera jugada")
+    parser.add_argument("--check", action="store_true", help="Compara els dos generadors a cada node (veure 'differential')")
+    args = parser.parse_args()
+
+    board = Board.unpack(bytes.fromhex(args.position)) if args.position else Board(Dice(1, 1))
+    results = []
+    for generator in args.generator:
+        result = perft(board, args.depth, generator)
+        results.append(result)
+        if args.divide:
+            for roll, count in result.by_roll.items():
+                print(f"  {roll}: {count}")
+        print(f"{generator:<12} profunditat {result.depth}: {result.leaves} fulles, {result.unique} posicions diferents, "
+              f"{result.seconds:.2f}s ({result.positions_per_second():.0f} posicions/s)")
+    if len({result.unique for result in results}) > 1:
+        print("Els generadors no arriben a les mateixes posicions!")
+        raise SystemExit(1)
+    if args.check:
+        mismatches = differential(board, args.depth)
+        for mismatch in mismatches:
+            print(f"Discrepància: {mismatch}")
+        if mismatches:
+            raise SystemExit(1)
+        print("Els dos generadors coincideixen a tots els nodes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import argparse, mmap, os, struct, time
+from board import BLACK, WHITE, Board, DiceCup, Move
+from records import GameRecord, scan_records
+
+
+INDEX_FORMAT = 1 # Versió del format del fitxer d'índex
+INDEX_EVERY = 8 # Jugades entre dues instantànies, per defecte
+
+# Capçalera: identificador, versió del format, jugades entre instantànies, nombre de partides, nombre
+# d'instantànies i bytes del fitxer de partides indexats. Després, totes les instantànies i al final
+# una entrada per partida.
+_HEADER = struct.Struct("<4sBIIIQ")
+_MAGIC = b"BGPI"
+
+# Per cada partida: on comença al fitxer de partides, la seva primera instantània i el nombre de moviments
+_GAME = struct.Struct("<QII")
+
+# Per cada instantània: el tauler (veure 'Board.pack') i on comença el següent moviment a 'GameRecord.packed'
+_SNAPSHOT = struct.Struct("<34sH")
+
+
+def build_index(records_path: str, index_path: str, every: int = INDEX_EVERY) -> int:
+    """
+    Crea l'índex de posicions d'un fitxer de partides (veure 'records.py'): per cada partida, guarda
+    el tauler cada 'every' jugades (el de la jugada 0, la 'every', la 2*'every'...). Les partides es
+    llegeixen una a una i les instantànies s'escriuen a mesura que es generen. Retorna el nombre de
+    partides indexades.
+    """
+    if every < 1:
+        raise ValueError("Hi ha d'haver com a mínim una jugada entre instantànies")
+    games = bytearray()
+    count = snapshots = size = 0
+    with open(index_path, "wb") as file:
+        file.write(bytes(_HEADER.size)) # La capçalera s'escriu al final, quan ja se sap tot
+        for offset, record in scan_records(records_path):
+            first = snapshots
+            cup = DiceCup(record.seed)
+            board = Board(cup.roll())
+            packed, position, ply = record.packed, 0, 0
+            while True:
+                if ply % every == 0:
+                    file.write(_SNAPSHOT.pack(board.pack(), position))
+                    snapshots += 1
+                if position == len(packed):
+                    break
+                jumps = packed[position]
+                move = Move.unpack(packed[position + 1:position + 1 + jumps])
+                board = board.play(move, WHITE if ply % 2 == 0 else BLACK).next(cup.roll())
+                position += 1 + jumps
+                ply += 1
+            games += _GAME.pack(offset, first, ply)
+            count += 1
+            size = offset + len(record.pack())
+        file.write(games)
+        file.seek(0)
+        file.write(_HEADER.pack(_MAGIC, INDEX_FORMAT, every, count, snapshots, size))
+    return count
+
+
+class PositionIndex:
+    """
+    Accés directe a qualsevol posició de les partides d'un fitxer de partides, a partir del seu índex
+    (veure 'build_index'): es parteix de l'última instantània anterior i es reprodueixen com a molt
+    'every' - 1 moviments, amb els daus avançats directament fins allà (veure 'DiceCup.skip'). Tots
+    dos fitxers es mapen a memòria, de manera que obrir-los és immediat i només es llegeixen les
+    pàgines que es consulten.
+    """
+
+    _index: mmap.mmap # Fitxer d'índex
+    _records: mmap.mmap # Fitxer de partides
+    _every: int # Jugades entre instantànies
+    _games: int # Nombre de partides indexades
+    _table: int # On comença l'entrada de la primera partida a l'índex
+
+    def __init__(self, records_path: str, index_path: str) -> None:
+        """
+        Mapa a memòria el fitxer de partides i el seu índex. Llença ValueError si l'índex no és
+        d'aquest format o no correspon al fitxer de partides (que pot haver crescut després).
+        """
+        with open(index_path, "rb") as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{index_path} no és un índex de posicions")
+            magic, index_format, self._every, self._games, snapshots, size = _HEADER.unpack(header)
+            self._table = _HEADER.size + snapshots * _SNAPSHOT.size
+            if magic != _MAGIC or index_format != INDEX_FORMAT or \
+                    os.path.getsize(index_path) != self._table + self._games * _GAME.size:
+                raise ValueError(f"{index_path} no és un índex de posicions del format {INDEX_FORMAT}")
+            if os.path.getsize(records_path) < size:
+                raise ValueError(f"{index_path} no és l'índex de {records_path}")
+            self._index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(records_path, "rb") as file:
+            self._records = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self._games
+
+    def every(self) -> int:
+        """Retorna el nombre de jugades entre dues instantànies."""
+        return self._every
+
+    def _game(self, game_id: int) -> tuple[int, int, int]:
+        if not 0 <= game_id < self._games:
+            raise IndexError(f"No hi ha cap partida {game_id} a l'índex")
+        return _GAME.unpack_from(self._index, self._table + game_id * _GAME.size)
+
+    def record(self, game_id: int) -> GameRecord:
+        """Retorna la partida 'game_id' (les partides es numeren des de 0, per ordre al fitxer de partides)."""
+        return GameRecord.unpack(self._records, self._game(game_id)[0])
+
+    def turns(self, game_id: int) -> int:
+        """Retorna el nombre de moviments de la partida 'game_id'."""
+        return self._game(game_id)[2]
+
+    def position_at(self, game_id: int, turn: int) -> Board:
+        """
+        Retorna el tauler de la partida 'game_id' al torn 'turn' (veure 'Board.turn'): el torn 1 és la
+        posició inicial i l'últim, 'turns(game_id)' + 1, la posició després de l'últim moviment. És el
+        mateix tauler que 'GameRecord.replay(turn - 1)', daus inclosos.
+        """
+        offset, first, moves = self._game(game_id)
+        ply = turn - 1
+        if not 0 <= ply <= moves:
+            raise IndexError(f"La partida {game_id} no té el torn {turn}")
+        packed_board, position = _SNAPSHOT.unpack_from(self._index, _HEADER.size + (first + ply // self._every) * _SNAPSHOT.size)
+        board = Board.unpack(packed_board)
+        done = ply - ply % self._every
+        if done == ply:
+            return board
+
+        # Reproduir els moviments que falten des de la instantània, amb els daus que toquen a partir d'allà
+        record = GameRecord.unpack(self._records, offset)
+        cup = DiceCup(record.seed)
+        cup.skip(done + 1)
+        packed = record.packed
+        for current in range(done, ply):
+            jumps = packed[position]
+            move = Move.unpack(packed[position + 1:position + 1 + jumps])
+            board = board.play(move, WHITE if current % 2 == 0 else BLACK).next(cup.roll())
+            position += 1 + jumps
+        return board
+
+    def close(self) -> None:
+        self._index.close()
+        self._records.close()
+
+    def __enter__(self) -> PositionIndex:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def main() -> None:
+    """Crea l'índex de posicions d'un fitxer de partides."""
+    parser = argparse.ArgumentParser(description="Crea l'índex de posicions d'un fitxer de partides (veure 'records.py')")
+    parser.add_argument("records", help="Fitxer de partides")
+    parser.add_argument("--output", default=None, help="Fitxer on es guarda l'índex (per defecte, el de partides amb '.idx')")
+    parser.add_argument("--every", type=int, default=INDEX_EVERY, help="Jugades entre dues instantànies")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.records)[0] + ".idx"
+    start = time.perf_counter()
+    games = build_index(args.records, output, args.every)
+    print(f"Índex: {output}, {games} partides, {os.path.getsize(output)} bytes, {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
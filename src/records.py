@@ -0,0 +1,180 @@
+from __future__ import annotations
+import mmap, os, struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator
+from board import BLACK, WHITE, Board, DiceCup, Move
+
+
+RECORDS_FORMAT = 1 # Versió del format del fitxer de partides
+
+# Capçalera del fitxer: identificador i versió del format. Després, les partides una darrere l'altra.
+_HEADER = struct.Struct("<4sB")
+_MAGIC = b"BGGR"
+
+# Capçalera de cada partida: llavor, bytes dels moviments i bytes dels noms del blanc i del negre.
+# Després, els dos noms (UTF-8) i els moviments (veure 'GameRecord.moves').
+_GAME = struct.Struct("<QHBB")
+
+
+def pack_moves(moves: Iterable[Move]) -> bytes:
+    """
+    Codifica una llista de moviments: per cada moviment, un byte amb el nombre de salts (0-4) i
+    després un byte per salt (veure 'Move.pack').
+    """
+    packed = bytearray()
+    for move in moves:
+        packed.append(len(move.jumps))
+        packed += move.pack()
+    return bytes(packed)
+
+
+def unpack_moves(packed: bytes) -> Iterator[Move]:
+    """Retorna un per un els moviments codificats amb 'pack_moves'."""
+    i = 0
+    while i < len(packed):
+        count = packed[i]
+        yield Move.unpack(packed[i + 1:i + 1 + count])
+        i += 1 + count
+
+
+@dataclass
+class GameRecord:
+    """
+    Una partida guardada: la llavor dels daus, els jugadors i els moviments codificats (veure
+    'pack_moves'), uns 3 bytes per moviment. Els moviments no es descodifiquen fins que calen, de
+    manera que es poden recórrer milions de partides sense construir cap moviment.
+    """
+    seed: int # Llavor dels daus (veure 'DiceCup')
+    white: str # Identificador del jugador blanc
+    black: str # Identificador del jugador negre
+    packed: bytes # Moviments codificats amb 'pack_moves'
+
+    @classmethod
+    def from_moves(cls, seed: int, white: str, black: str, moves: Iterable[Move]) -> GameRecord:
+        """Construeix el registre d'una partida a partir dels seus moviments."""
+        return cls(seed, white, black, pack_moves(moves))
+
+    @classmethod
+    def unpack(cls, data: bytes | mmap.mmap, offset: int = 0) -> GameRecord:
+        """
+        Reconstrueix la partida que comença a la posició 'offset' de les dades (el que retorna 'pack',
+        o un fitxer de partides sencer mapat a memòria). Llença ValueError si la partida està tallada.
+        """
+        if len(data) < offset + _GAME.size:
+            raise ValueError("La partida està tallada")
+        seed, size, white_size, black_size = _GAME.unpack_from(data, offset)
+        white = offset + _GAME.size
+        black = white + white_size
+        moves = black + black_size
+        if len(data) < moves + size:
+            raise ValueError("La partida està tallada")
+        return cls(seed, bytes(data[white:black]).decode(), bytes(data[black:moves]).decode(), bytes(data[moves:moves + size]))
+
+    def moves(self) -> list[Move]:
+        """Retorna els moviments de la partida, alternativament del blanc i del negre, cadascun des del seu punt de vista."""
+        return list(unpack_moves(self.packed))
+
+    def replay(self, turns: int | None = None) -> Board:
+        """
+        Reprodueix la partida des de 'Board(DiceCup(seed).roll())', com 'arena.Game.apply_move': a cada
+        jugada es fa el moviment (el tauler sempre està orientat pel blanc) i es tiren els daus de la
+        següent. Retorna el tauler després dels 'turns' primers moviments (per defecte, de tots).
+        """
+        cup = DiceCup(self.seed)
+        board = Board(cup.roll())
+        player = WHITE
+        for ply, move in enumerate(unpack_moves(self.packed)):
+            if turns is not None and ply >= turns:
+                break
+            board = board.play(move, player).next(cup.roll())
+            player = BLACK if player == WHITE else WHITE
+        return board
+
+    def pack(self) -> bytes:
+        """Retorna la partida en el format del fitxer. Llença ValueError si no s'hi pot representar."""
+        white, black = self.white.encode(), self.black.encode()
+        if not 0 <= self.seed < 2**64 or len(self.packed) >= 2**16 or len(white) >= 2**8 or len(black) >= 2**8:
+            raise ValueError("La partida no es pot guardar en el format de partides")
+        return _GAME.pack(self.seed, len(self.packed), len(white), len(black)) + white + black + self.packed
+
+
+class RecordWriter:
+    """
+    Escriu partides al final d'un fitxer de partides, a mesura que es van acabant. Si el fitxer no
+    existeix o és buit, s'hi escriu la capçalera; alternament, ha de ser un fitxer de partides.
+    """
+
+    _file: BinaryIO
+
+    def __init__(self, path: str) -> None:
+        """Obre el fitxer per afegir-hi partides. Llença ValueError si ja existeix i no és un fitxer de partides."""
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as file:
+                _check_header(file, path)
+        self._file = open(path, "ab")
+        if not self._file.tell():
+            self._file.write(_HEADER.pack(_MAGIC, RECORDS_FORMAT))
+
+    def write(self, record: GameRecord) -> int:
+        """Afegeix una partida al fitxer i retorna la posició (en bytes) on comença."""
+        offset = self._file.tell()
+        self._file.write(record.pack())
+        return offset
+
+    def flush(self) -> None:
+        """Escriu al disc les partides que encara són a la memòria intermèdia."""
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> RecordWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _check_header(file: BinaryIO, path: str) -> None:
+    """Llegeix la capçalera del fitxer. Llença ValueError si no és un fitxer de partides d'aquest format."""
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size or _HEADER.unpack(header) != (_MAGIC, RECORDS_FORMAT):
+        raise ValueError(f"{path} no és un fitxer de partides del format {RECORDS_FORMAT}")
+
+
+def read_record(file: BinaryIO, path: str = "") -> GameRecord | None:
+    """
+    Llegeix la partida que comença a la posició actual del fitxer (o retorna None si s'ha arribat al
+    final). Llença ValueError si la partida està tallada.
+    """
+    header = file.read(_GAME.size)
+    if not header:
+        return None
+    if len(header) == _GAME.size:
+        seed, size, white_size, black_size = _GAME.unpack(header)
+        data = file.read(white_size + black_size + size)
+        if len(data) == white_size + black_size + size:
+            return GameRecord(seed, data[:white_size].decode(), data[white_size:white_size + black_size].decode(),
+                              data[white_size + black_size:])
+    raise ValueError(f"{path} té una partida tallada")
+
+
+def scan_records(path: str) -> Iterator[tuple[int, GameRecord]]:
+    """Igual que 'read_records', però retorna també la posició (en bytes) on comença cada partida al fitxer."""
+    with open(path, "rb") as file:
+        _check_header(file, path)
+        while True:
+            offset = file.tell()
+            record = read_record(file, path)
+            if record is None:
+                return
+            yield offset, record
+
+
+def read_records(path: str) -> Iterator[GameRecord]:
+    """
+    Retorna una per una les partides d'un fitxer escrit amb 'RecordWriter', sense carregar-lo sencer.
+    Llença ValueError si no és un fitxer de partides o si l'última partida està tallada.
+    """
+    for _, record in scan_records(path):
+        yield record
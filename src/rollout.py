@@ -0,0 +1,116 @@
+from __future__ import annotations
+import argparse, math, time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+import numpy as np
+from board import BLACK, WHITE, Board, Dice, DiceCup, layouts
+from evaluator import Evaluator
+from tournament import BotConfig, parse_config
+
+# Les 36 tirades ordenades dels daus, per estratificar les primeres tirades de les partides
+STRATA = [Dice(die1, die2) for die1 in range(1, 7) for die2 in range(1, 7)]
+
+
+@dataclass
+class RolloutResult:
+    """Resultat d'un "rollout": l'equitat estimada del jugador que li toca tirar (entre -1 i 1)."""
+    games: int # Partides jugades
+    equity: float # Mitjana del resultat de les partides (1 si guanya, -1 si perd)
+    stderr: float # Error estàndard de la mitjana
+    seconds: float # Temps total
+
+    def rollouts_per_second(self) -> float:
+        """Retorna el nombre de partides jugades per segon."""
+        return self.games / self.seconds if self.seconds else 0.0
+
+
+def first_rolls(index: int) -> tuple[Dice, Dice]:
+    """
+    Retorna les dues primeres tirades de la partida 'index' d'un rollout: cada bloc de 36 partides
+    fa servir les 36 tirades a la primera i a la segona jugada (desplaçades un lloc a cada bloc),
+    de manera que la sort de les primeres tirades, la que més pesa, queda repartida a parts iguals.
+    """
+    return STRATA[index % 36], STRATA[(index + index // 36) % 36]
+
+
+def truncation_evaluator(policy: BotConfig) -> Evaluator:
+    """
+    Retorna l'avaluació de 'policy' per puntuar les partides truncades. Ha de donar directament
+    l'equitat (cota 1, com 'NeuralEvaluator'): les puntuacions d'una heurística com la del bot no
+    són una equitat encara que es divideixin per la seva cota, així que llença ValueError.
+    """
+    evaluator = policy.evaluation()
+    if evaluator.bound != 1:
+        raise ValueError(f"Per truncar les partides cal una avaluació en l'escala de l'equitat, no {policy.evaluator}")
+    return evaluator
+
+
+def play_out(board: Board, index: int, seed: int, policy: BotConfig, truncate: int | None = None) -> float:
+    """
+    Juga la partida 'index' d'un rollout des de 'board' (li toca tirar al blanc; els seus daus
+    s'ignoren) fins al final, amb les dues primeres tirades de 'first_rolls' i la resta de
+    'DiceCup(seed + index)', i tots dos jugadors escollint amb 'policy'. Retorna 1 si guanya el
+    blanc i -1 si perd. Si es dona 'truncate', s'atura després d'aquestes jugades i retorna
+    l'equitat segons l'avaluació estàtica de 'policy' (veure 'truncation_evaluator').
+    """
+    cup = DiceCup(seed + index)
+    rolls = first_rolls(index)
+    player = WHITE
+    for ply in range(truncate if truncate is not None else 2**31):
+        board = board.next(rolls[ply] if ply < 2 else cup.roll())
+        board = board.play(policy.move(board, player), player)
+        if board.off(player) == 15:
+            return 1.0 if player == WHITE else -1.0
+        player = BLACK if player == WHITE else WHITE
+    return float(np.clip(truncation_evaluator(policy).score(layouts([board]))[0], -1, 1))
+
+
+def _play_outs(packed: bytes, start: int, stop: int, seed: int, policy: BotConfig, truncate: int | None) -> list[float]:
+    board = Board.unpack(packed)
+    return [play_out(board, index, seed, policy, truncate) for index in range(start, stop)]
+
+
+def rollout(board: Board, games: int = 1296, policy: BotConfig = BotConfig(depth=1), truncate: int | None = None,
+            seed: int = 0, workers: int = 1) -> RolloutResult:
+    """
+    Estima l'equitat del jugador que li toca tirar a 'board' (el blanc) jugant-hi 'games' partides
+    (veure 'play_out'), repartides entre 'workers' processos. Cada partida només depèn del seu
+    índex i de 'seed', així que el resultat no depèn del nombre de processos. Amb 1.296 partides,
+    cada combinació de les dues primeres tirades surt exactament un cop.
+    """
+    if truncate is not None:
+        truncation_evaluator(policy)
+    start = time.perf_counter()
+    if workers > 1:
+        # Uns quants blocs per procés, perquè acabin tots alhora encara que les partides durin diferent
+        bounds = np.linspace(0, games, 4 * workers + 1).astype(int)
+        with ProcessPoolExecutor(workers) as pool:
+            chunks = pool.map(_play_outs, repeat(board.pack()), bounds[:-1], bounds[1:], repeat(seed),
+                              repeat(policy), repeat(truncate))
+            values = np.array([value for chunk in chunks for value in chunk])
+    else:
+        values = np.array([play_out(board, index, seed, policy, truncate) for index in range(games)])
+    stderr = float(values.std(ddof=1) / math.sqrt(games)) if games > 1 else 0.0
+    return RolloutResult(games, float(values.mean()), stderr, time.perf_counter() - start)
+
+
+def main() -> None:
+    """Fa un rollout d'una posició i en mostra l'equitat estimada."""
+    parser = argparse.ArgumentParser(description="Estima l'equitat d'una posició jugant-la fins al final moltes vegades")
+    parser.add_argument("--position", default=None, help="Tauler en hexadecimal (veure 'Board.pack'); per defecte, l'inicial")
+    parser.add_argument("--games", type=int, default=1296, help="Partides del rollout")
+    parser.add_argument("--policy", default="depth=1", help="Configuració del bot que juga les partides (veure 'tournament.py')")
+    parser.add_argument("--truncate", type=int, default=None, help="Jugades abans d'aturar-se i fer servir l'avaluació estàtica (ha de donar l'equitat, com la xarxa neuronal)")
+    parser.add_argument("--seed", type=int, default=0, help="Llavor dels daus a partir de la tercera tirada")
+    parser.add_argument("--workers", type=int, default=1, help="Processos que juguen les partides")
+    args = parser.parse_args()
+
+    board = Board.unpack(bytes.fromhex(args.position)) if args.position else Board(Dice(1, 1))
+    result = rollout(board, args.games, parse_config(args.policy), args.truncate, args.seed, args.workers)
+    print(f"Equitat: {result.equity:+.4f} ± {result.stderr:.4f} ({result.games} partides, "
+          f"{result.rollouts_per_second():.1f} partides/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+from __future__ import annotations
+import gc, json, math, os, time, tracemalloc
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Callable
+from board import WHITE, Board, DiceCup, board_constructions, configure_move_cache, move_cache_info
+import bot as bot_module
+from bearoff import is_bearoff
+from bot import bot, successor_layouts
+from evaluator import HEURISTIC, Evaluator
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "bench-corpus.json")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "bench-baseline.json")
+CORPUS_FORMAT = 1 # Versió del format del fitxer del corpus
+
+CATEGORIES = ("opening", "contact", "bar-entry", "double-heavy", "bear-off", "race")
+OPERATIONS = ("valid_moves", "successors", "play", "evaluation", "bot")
+THRESHOLD = 0.25 # Empitjorament relatiu a partir del qual un resultat es considera una regressió
+ROUND_SECONDS = 0.1 # Durada mínima de cada ronda de mesura
+
+
+def classify(board: Board) -> str:
+    """
+    Retorna la categoria del corpus d'una posició, vista pel jugador que li toca moure (el blanc):
+    "opening" (les dues primeres jugades), "bear-off" (veure 'bearoff.is_bearoff'), "race" (sense
+    contacte), "bar-entry" (amb fitxes a la barra), "double-heavy" (dobles) o "contact" (la resta).
+    """
+    if board.turn() <= 2:
+        return "opening"
+    if is_bearoff(board):
+        return "bear-off"
+    if board.is_race():
+        return "race"
+    if board.bar(WHITE):
+        return "bar-entry"
+    if board.dice().is_double():
+        return "double-heavy"
+    return "contact"
+
+
+def build_corpus(per_category: int = 8, seed: int = 1, max_games: int = 500) -> dict[str, list[Board]]:
+    """
+    Escull 'per_category' posicions de cada categoria (veure 'classify') de partides del bot a 1
+    jugada contra ell mateix, la partida i amb 'DiceCup(seed + i)'. Cada partida aporta com a molt
+    una posició de cada categoria, perquè siguin variades, i no es repeteix cap posició. Les
+    d'obertura són alternativament de la primera i de la segona jugada.
+    """
+    corpus: dict[str, list[Board]] = {category: [] for category in CATEGORIES}
+    chosen: set[bytes] = set()
+    for game in range(max_games):
+        if all(len(boards) >= per_category for boards in corpus.values()):
+            break
+        cup = DiceCup(seed + game)
+        board = Board(cup.roll())
+        seen: set[str] = set()
+        while not board.over():
+            category = classify(board)
+            if (category not in seen and len(corpus[category]) < per_category and board.pack() not in chosen
+                    and (category != "opening" or board.turn() == 1 + len(corpus[category]) % 2)):
+                seen.add(category)
+                chosen.add(board.pack())
+                corpus[category].append(board)
+            board = board.play(bot(board, depth=1, book=False)).next(cup.roll()).flip()
+    return corpus
+
+
+def save_corpus(path: str, corpus: dict[str, list[Board]]) -> None:
+    """Guarda el corpus en un fitxer JSON, amb cada posició en hexadecimal (veure 'Board.pack')."""
+    positions = {category: [board.pack().hex() for board in boards] for category, boards in corpus.items()}
+    with open(path, "w") as file:
+        json.dump({"format": CORPUS_FORMAT, "positions": positions}, file, indent=1)
+        file.write("\n")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> dict[str, list[Board]]:
+    """Carrega un corpus guardat amb 'save_corpus'. Llença ValueError si el fitxer no ho és."""
+    with open(path) as file:
+        data = json.load(file)
+    if not isinstance(data, dict) or data.get("format") != CORPUS_FORMAT:
+        raise ValueError(f"{path} no és un corpus de posicions del format {CORPUS_FORMAT}")
+    return {category: [Board.unpack(bytes.fromhex(position)) for position in positions]
+            for category, positions in data["positions"].items()}
+
+
+@dataclass
+class BenchResult:
+    """Resultat d'una operació sobre les posicions d'una categoria del corpus."""
+    operation: str # Operació mesurada (veure 'OPERATIONS')
+    category: str # Categoria de les posicions (veure 'CATEGORIES')
+    calls: int # Crides per passada (una per posició, o per moviment amb "play")
+    seconds: float # Temps per passada de la ronda més ràpida
+    constructions: float # Taulers construïts per crida (veure 'board_constructions')
+    peak_bytes: float # Memòria màxima reservada durant cada crida, de mitjana (veure 'tracemalloc')
+    reference: float # Temps del bucle de referència just abans de la mesura (veure 'calibrate')
+
+    def key(self) -> str:
+        return f"{self.operation}/{self.category}"
+
+    def ops_per_second(self) -> float:
+        """Retorna el nombre de crides per segon."""
+        return self.calls / self.seconds if self.seconds else 0.0
+
+    def relative_speed(self) -> float:
+        """
+        Retorna les crides que es fan en el temps del bucle de referència: no depèn de la velocitat
+        de la màquina (ni de si en aquell moment va més lenta), així que és el que es compara.
+        """
+        return self.ops_per_second() * self.reference
+
+
+def calibrate(rounds: int = 5) -> float:
+    """Retorna el temps de la més ràpida de 'rounds' execucions d'un bucle de referència fix, en segons."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        total = 0
+        for i in range(50_000):
+            total += i * i % 7
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _calls(operation: str, boards: list[Board], depth: int, evaluator: Evaluator) -> list[Callable[[], object]]:
+    """Retorna les crides que fa una ronda de l'operació sobre les posicions donades."""
+    if operation == "valid_moves":
+        return [board.valid_moves for board in boards]
+    if operation == "successors":
+        return [board.successors for board in boards]
+    if operation == "play":
+        return [partial(board.play, move) for board in boards for move in board.valid_moves()]
+    if operation == "evaluation":
+        return [partial(evaluator.score, successor_layouts(board)) for board in boards]
+    if operation == "bot":
+        return [partial(bot, board, depth, book=False, evaluator=evaluator) for board in boards]
+    raise ValueError(f"Operació desconeguda: {operation}")
+
+
+def measure(operation: str, category: str, boards: list[Board], rounds: int = 5, depth: int = 2,
+            evaluator: Evaluator = HEURISTIC) -> BenchResult:
+    """
+    Mesura una operació sobre les posicions d'una categoria: el temps per passada de la més ràpida
+    de 'rounds' rondes (les passades es repeteixen fins que la ronda dura 'ROUND_SECONDS') i, en
+    una passada a part amb 'tracemalloc', els taulers construïts i la memòria reservada per crida.
+    """
+    calls = _calls(operation, boards, depth, evaluator)
+    reference = calibrate()
+
+    # Les operacions ràpides es repeteixen dins de cada ronda, perquè cap ronda duri menys de 'ROUND_SECONDS'.
+    # Com a 'timeit', el recol·lector d'escombraries s'atura mentre es mesura.
+    collect = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for call in calls:
+            call()
+        repeat = max(1, math.ceil(ROUND_SECONDS / max(time.perf_counter() - start, 1e-9)))
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for call in calls:
+                    call()
+            best = min(best, (time.perf_counter() - start) / repeat)
+    finally:
+        if collect:
+            gc.enable()
+
+    peak = 0
+    before = board_constructions()
+    tracemalloc.start()
+    try:
+        for call in calls:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            call()
+            peak += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    constructions = board_constructions() - before
+    return BenchResult(operation, category, len(calls), best, constructions / max(len(calls), 1), peak / max(len(calls), 1),
+                       reference)
+
+
+def run_suite(corpus: dict[str, list[Board]], operations: tuple[str, ...] = OPERATIONS, rounds: int = 5, depth: int = 2,
+              evaluator: Evaluator = HEURISTIC, progress: Callable[[BenchResult], None] | None = None) -> list[BenchResult]:
+    """
+    Mesura cada operació sobre cada categoria del corpus (veure 'measure'). La memòria cau de
+    moviments i la taula de transposicions es desactiven, perquè cada ronda faci tota la feina i
+    no aprofiti la de les anteriors, i en acabar es tornen a deixar amb la mida que tenien (buides).
+    """
+    cache_size = move_cache_info().maxsize
+    table_bytes = bot_module.table_info().capacity * bot_module.TranspositionTable.ENTRY_BYTES
+    configure_move_cache(0)
+    bot_module.configure_table(0)
+    results: list[BenchResult] = []
+    try:
+        for operation in operations:
+            for category, boards in corpus.items():
+                result = measure(operation, category, boards, rounds, depth, evaluator)
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    finally:
+        configure_move_cache(cache_size)
+        bot_module.configure_table(table_bytes)
+    return results
+
+
+def save_baseline(path: str, results: list[BenchResult]) -> None:
+    """Guarda els resultats com a referència per comparar-hi les execucions següents (veure 'compare')."""
+    with open(path, "w") as file:
+        json.dump({result.key(): asdict(result) for result in results}, file, indent=1)
+        file.write("\n")
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict[str, BenchResult]:
+    """Carrega els resultats de referència guardats amb 'save_baseline'."""
+    with open(path) as file:
+        return {key: BenchResult(**result) for key, result in json.load(file).items()}
+
+
+def compare(results: list[BenchResult], baseline: dict[str, BenchResult], threshold: float = THRESHOLD) -> list[str]:
+    """
+    Compara els resultats amb els de referència i retorna una descripció de cada regressió: menys
+    velocitat (veure 'relative_speed'), o més taulers construïts o memòria per crida, en més d'un
+    'threshold' relatiu. Els resultats que no són a la referència no es comparen.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result.key())
+        if base is None:
+            continue
+        if result.relative_speed() < base.relative_speed() * (1 - threshold):
+            expected = base.relative_speed() / result.reference
+            regressions.append(f"{result.key()}: {result.ops_per_second():.0f} crides/s (referència {expected:.0f} en aquesta màquina)")
+        if result.constructions > base.constructions * (1 + threshold):
+            regressions.append(f"{result.key()}: {result.constructions:.1f} taulers per crida (referència {base.constructions:.1f})")
+        if result.peak_bytes > base.peak_bytes * (1 + threshold):
+            regressions.append(f"{result.key()}: {result.peak_bytes:.0f} bytes per crida (referència {base.peak_bytes:.0f})")
+    return regressions
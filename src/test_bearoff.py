@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from board import Board, Dice, Jump
+from bearoff import BEAROFF_POSITIONS, BearoffDatabase, generate, indices, is_bearoff, positions, save
+
+
+def test_indices():
+    """Prova si bearoff.indices numera totes les posicions del home, sense repeticions, de 0 a 54.263"""
+    homes = np.array(positions())
+    assert len(homes) == BEAROFF_POSITIONS == 54264
+    assert sorted(indices(homes).tolist()) == list(range(BEAROFF_POSITIONS))
+    assert indices(np.array([[0] * 6])).tolist() == [0]
+
+
+def test_generate():
+    """Prova els valors esperats de tirades de posicions que es poden calcular a mà"""
+    table = generate(2)
+    assert np.count_nonzero(~np.isnan(table)) == len(positions(2)) == 28
+
+    def rolls(home):
+        return table[indices(np.array([home]))[0]]
+
+    assert rolls((0, 0, 0, 0, 0, 0)) == 0
+    assert rolls((0, 0, 0, 0, 0, 1)) == rolls((0, 0, 0, 0, 0, 2)) == 1
+    assert rolls((1, 0, 0, 0, 0, 0)) == 1.25 # No surt amb 1-1, 1-2, 1-3, 1-4 i 2-3 (9 de 36)
+    assert 1 < rolls((1, 1, 0, 0, 0, 0)) < rolls((2, 0, 0, 0, 0, 0)) < 3
+
+
+def test_database(tmp_path):
+    """Prova si BearoffDatabase llegeix la base de dades guardada i escull el moviment que menys tirades necessita"""
+    table = generate(3)
+    path = tmp_path / "bearoff.bin"
+    save(str(path), table)
+    assert path.stat().st_size == 9 + 4 * BEAROFF_POSITIONS
+    database = BearoffDatabase(str(path))
+    assert len(database) == BEAROFF_POSITIONS
+
+    board = Board(Dice(6, 1), cells=[-1] + [0] * 17 + [1, 0, 0, 0, 1, 1])
+    assert is_bearoff(board)
+    assert database.expected_rolls(board) == np.float32(table[indices(np.array([board.cells()[18:]]))[0]])
+    move = database.best_move(board)
+    assert board.is_valid_move(move)
+    after = board.play(move)
+    assert all(database.expected_rolls(after) <= database.expected_rolls(next_board) for _, next_board in board.successors())
+    assert database.expected_rolls(after) == 1
+
+    # Amb fitxes del rival al home, per darrere de les nostres, només compten les nostres
+    table = generate(5)
+    save(str(path), table)
+    database = BearoffDatabase(str(path))
+    board = Board(Dice(3, 2), cells=[-12] + [0] * 17 + [-1, -2, 0, 2, 3, 0])
+    assert is_bearoff(board)
+    assert database.expected_rolls(board) == np.float32(table[indices(np.array([[0, 0, 0, 2, 3, 0]]))[0]])
+    move = database.best_move(board)
+    assert sorted(move.jumps, key=lambda jump: jump.point) == [Jump(21, 3), Jump(22, 2)]
+    after = board.play(move)
+    assert all(database.expected_rolls(after) <= database.expected_rolls(next_board) for _, next_board in board.successors())
+
+    path.write_bytes(b"XXXX" + path.read_bytes()[4:])
+    with pytest.raises(ValueError):
+        BearoffDatabase(str(path))
+
+
+def test_is_bearoff():
+    """Prova si bearoff.is_bearoff detecta les posicions de bear off sense contacte"""
+    assert not is_bearoff(Board(Dice(1, 2)))
+    assert is_bearoff(Board(Dice(1, 2), cells=[-2] + [0] * 17 + [3, 0, 0, 0, 0, 1]))
+    assert not is_bearoff(Board(Dice(1, 2), cells=[-2] + [0] * 17 + [3, -1, 0, 0, 0, 1])) # Contacte
+    assert not is_bearoff(Board(Dice(1, 2), cells=[-2] + [0] * 16 + [1, 3, 0, 0, 0, 0, 1])) # Fitxa fora del home
+    assert not is_bearoff(Board(Dice(1, 2), cells=[-2] + [0] * 17 + [3, 0, 0, 0, 0, 1], barB=1))
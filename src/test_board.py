@@ -1,4 +1,6 @@
-from board import Board, WHITE, BLACK, Move, Jump, Dice
+import random
+import pytest
+from board import Board, WHITE, BLACK, Move, Jump, Dice, DiceCup, configure_move_cache, move_cache_info, MOVE_CACHE_SIZE
 
 def test_dice_is_valid():
     """Prova si dice.is_valid funciona correctament."""
@@ -114,3 +116,267 @@ def test_over():
     assert board.over() and board.winner() == WHITE
     board = board.flip()
     assert board.over() and board.winner() == BLACK
+
+
+def test_board_copy_and_hash():
+    """Prova si board.copy, board.__eq__ i board.__hash__ funcionen correctament"""
+    board = Board(Dice(5, 1), cells=[0, -4, 0, 0, -1, -5, -1, 0, -1, 2, 0, 0, -3, 0, 0, 0, 0, 0, 5, 1, 4, 0, 1, 1], barW = 1)
+    copy = board.copy()
+    assert copy == board and hash(copy) == hash(board)
+    assert copy.off(WHITE) == board.off(WHITE) == 0 and copy.off(BLACK) == board.off(BLACK) == 0
+    assert copy.bar(WHITE) == 1 and copy.cells() == board.cells()
+
+    # La copia és independent de l'original
+    moved = copy.play(Move([Jump(-1, 5), Jump(19, 1)]))
+    assert moved != board and copy == board
+    assert moved.bar(WHITE) == 0 and moved.bar(BLACK) == 1
+
+    # Els taulers es poden fer servir com a claus de diccionaris
+    positions = {board: "inici", moved: "final"}
+    assert positions[copy] == "inici"
+    assert positions[board.play(Move([Jump(-1, 5), Jump(19, 1)]))] == "final"
+
+    # Fer "flip" dues vegades retorna la mateixa posició
+    assert board.flip().flip() == board
+    assert board.flip().bar(BLACK) == 1 and board.flip().cell(0) == -1
+
+
+def test_pack_and_unpack():
+    """Prova si board.pack i Board.unpack reconstrueixen el mateix tauler, daus, torn i claus"""
+    rng = random.Random(23)
+    for turn in (1, 2, 70000):
+        board = random_board(rng)
+        board = Board(board.dice(), turn, board.cells(), board.bar(WHITE), board.bar(BLACK))
+        packed = board.pack()
+        assert len(packed) == 34
+        unpacked = Board.unpack(packed)
+        assert unpacked == board and unpacked.key(dice=True) == board.key(dice=True)
+        assert unpacked.turn() == turn and unpacked.dice() == board.dice() and unpacked.flip() == board.flip()
+        assert unpacked.valid_moves() == board.valid_moves()
+
+
+def test_move_pack_and_unpack():
+    """Prova si move.pack i Move.unpack reconstrueixen el mateix moviment, amb un byte per salt"""
+    for move in (Move([]), Move([Jump(-1, 6), Jump(23, 1)]), Move([Jump(5, 3)] * 4)):
+        assert len(move.pack()) == len(move.jumps)
+        assert Move.unpack(move.pack()) == move
+    assert set(Move([Jump(point, pips)]).pack()[0] for point in range(-1, 24) for pips in range(1, 7)) == set(range(150))
+
+
+def test_is_race():
+    """Prova si board.is_race detecta quan ja no hi ha contacte, i si el resultat passa als taulers derivats"""
+    assert not Board(Dice(1, 2)).is_race()
+    board = Board(Dice(6, 5), cells=[0] * 16 + [1, 0, 0, -15, 0, 0, 0, 14])
+    assert not board.is_race()
+    moved = board.play(Move([Jump(16, 5), Jump(21, 6)]))
+    assert moved.is_race() and moved.flip().is_race() and moved.next(Dice(1, 1)).is_race() and moved.copy().is_race()
+    assert all(next_board.is_race() for _, next_board in moved.successors())
+
+    # Amb fitxes a la barra o per darrere de les del rival, hi ha contacte
+    assert not Board(Dice(1, 2), cells=[-14] + [0] * 22 + [15], barB=1).is_race()
+    assert not Board(Dice(1, 2), cells=[2, -15] + [0] * 21 + [13]).is_race()
+    assert Board(Dice(1, 2), cells=[-15, 2] + [0] * 21 + [13]).is_race()
+
+    # Desfer un salt que ha trencat el contacte torna a tenir contacte
+    board.apply_jump(Jump(16, 5))
+    assert board.is_race()
+    board.undo_jump()
+    assert not board.is_race()
+
+
+def test_successors():
+    """Prova si board.successors i board.valid_moves(unique=True) funcionen correctament"""
+    # Amb dobles, moltes ordenacions dels salts porten a la mateixa posició
+    board = Board(Dice(2, 2))
+    moves = board.valid_moves()
+    successors = board.successors()
+    positions = {board.play(move) for move in moves}
+    assert len(successors) == len(positions) < len(moves)
+    assert {position for _, position in successors} == positions
+    for move, position in successors:
+        assert board.is_valid_move(move) and board.play(move) == position
+    assert board.valid_moves(unique=True) == [move for move, _ in successors]
+
+    # Sense moviments possibles
+    board = Board(Dice(3,3), cells=[-1, 3, -1, -1, -4, 0, 3, 0, 0, -5, 0, 5, 0, 0, -2, 0, 0, 0, 0, 0, 0, 0, 0, 4], barB = 1)
+    assert board.successors() == [(Move(jumps=[]), board)]
+
+    # Un únic moviment possible amb 1 salt, cal jugar el del dau més gran
+    board = Board(Dice(4, 6), cells=[0, 0, 0, 0, 0, 1, 0, 0, 0, -1, 0, 0, 0, 0, 0, -2, 0, 0, 0, 0, 0, 0, 0, 0])
+    assert board.valid_moves(unique=True) == [Move(jumps=[Jump(point=5, pips=6)])]
+
+
+def test_apply_and_undo_jump():
+    """Prova si board.apply_jump i board.undo_jump deixen el tauler igual que board.play"""
+    # "Treure de barra" amb dues captures seguides
+    board = Board(Dice(5, 2), cells=[0, -4, 0, 0, -1, -5, -1, 0, -1, 2, 0, 0, -3, 0, 0, 0, 0, 0, 5, 1, 4, 0, 1, 1], barW = 1)
+    original = board.copy()
+    move = Move([Jump(-1, 5), Jump(4, 2)])
+    board.apply_move(move)
+    assert board == original.play(move)
+    assert board.bar(WHITE) == 0 and board.bar(BLACK) == 2 and board.cell(4) == 0 and board.cell(6) == 1
+
+    board.undo_move(move)
+    assert board == original and board.bar(WHITE) == 1 and board.bar(BLACK) == 0
+
+    # Desfer salt a salt, en ordre invers
+    for move in original.valid_moves():
+        for jump in move.jumps:
+            board.apply_jump(jump)
+        assert board == original.play(move)
+        for _ in move.jumps:
+            board.undo_jump()
+        assert board == original
+
+
+def test_move_cache():
+    """Prova si la memòria cau de moviments no canvia els resultats i compta els encerts correctament"""
+    board = Board(Dice(4, 4), cells=[0, -2, 0, -3, 2, -3, 0, 0, -5, 0, 0, 0, 0, 0, 0, 5, 0, 0, 3, -2, 3, 0, 2, 0])
+    try:
+        configure_move_cache(0)
+        moves, successors = board.valid_moves(), board.successors()
+        assert move_cache_info().hits == move_cache_info().misses == move_cache_info().currsize == 0
+
+        configure_move_cache(2)
+        assert board.valid_moves() == moves and board.successors() == successors
+        assert move_cache_info().misses == 2 and move_cache_info().hits == 0
+        assert board.valid_moves() == moves and board.copy().successors() == successors
+        assert move_cache_info().hits == 2
+
+        # Modificar el resultat retornat no modifica la memòria cau
+        board.valid_moves().clear()
+        assert board.valid_moves() == moves
+
+        # Ni tampoc modificar els moviments retornats
+        board.valid_moves()[0].jumps.append(Jump(0, 6))
+        board.valid_moves(unique=True)[0].jumps[0].pips = 1
+        board.successors()[0][0].jumps.clear()
+        assert board.valid_moves() == moves and board.successors() == successors
+        assert all(board.is_valid_move(move) for move in board.valid_moves(unique=True))
+
+        # Només es guarden els 'maxsize' resultats usats més recentment
+        other = board.next(Dice(6, 5))
+        other.valid_moves()
+        assert move_cache_info().currsize == 2
+    finally:
+        configure_move_cache(MOVE_CACHE_SIZE)
+
+
+def test_zobrist_key():
+    """Prova si board.key es manté igual que si es calculés de nou per la posició"""
+    def fresh(board: Board) -> Board:
+        return Board(board.dice(), board.turn(), board.cells(), board.bar(WHITE), board.bar(BLACK))
+
+    board = Board(Dice(5, 2), cells=[0, -4, 0, 0, -1, -5, -1, 0, -1, 2, 0, 0, -3, 0, 0, 0, 0, 0, 5, 1, 4, 0, 1, 1], barW = 1)
+    for move in board.valid_moves():
+        played = board.play(move)
+        assert played.key() == fresh(played).key()
+        assert played.flip().key() == fresh(played.flip()).key()
+
+    # Captures i desfer salts
+    board.apply_move(Move([Jump(-1, 5), Jump(4, 2)]))
+    assert board.key() == fresh(board).key()
+    board.undo_move(Move([Jump(-1, 5), Jump(4, 2)]))
+    assert board.key() == fresh(board).key()
+
+    # El jugador que li toca moure i els daus formen part de la clau
+    next_board = board.next(Dice(5, 2))
+    assert next_board == board and next_board.key() != board.key()
+    assert next_board.next(Dice(5, 2)).key() == board.key()
+    assert board.key(dice=True) != board.key() and board.key(dice=True) != board.next(Dice(2, 5)).next(Dice(2, 5)).key(dice=True)
+
+
+def random_board(rng: random.Random) -> Board:
+    """Retorna un tauler aleatori (amb fitxes a la barra, salvades o totes al home de tant en tant)."""
+    cells = [0] * 24
+    bar = [0, 0]
+    home = rng.random() < 0.2
+    for sign in (1, -1):
+        for _ in range(15 - rng.choice([0, 0, 1, 3, 8])):
+            if rng.random() < 0.05:
+                bar[0 if sign == 1 else 1] += 1
+                continue
+            free = [i for i in (range(18, 24) if home and sign == 1 else range(24)) if cells[i] * sign >= 0]
+            cells[rng.choice(free)] += sign
+    return Board(Dice(rng.randint(1, 6), rng.randint(1, 6)), 1, cells, bar[0], bar[1])
+
+
+def test_is_valid_move_matches_generation():
+    """Prova diferencial: board.is_valid_move ha de coincidir amb 'move in board.valid_moves()'"""
+    rng = random.Random(2024)
+    for _ in range(150):
+        board = random_board(rng)
+        valid_moves = board.valid_moves()
+        dice = [board.dice().die1, board.dice().die2]
+
+        # Moviments vàlids, moviments incomplets o en un altre ordre i moviments aleatoris
+        moves = valid_moves[:10]
+        for move in valid_moves[:5]:
+            moves += [Move(move.jumps[:-1]), Move(list(reversed(move.jumps)))]
+        for _ in range(15):
+            jumps = [Jump(rng.randint(-1, 23), rng.choice(dice + [rng.randint(1, 6)])) for _ in range(rng.randint(0, 4))]
+            moves.append(Move(jumps))
+
+        for move in moves:
+            assert board.is_valid_move(move) == (move in valid_moves)
+
+
+def test_black_moves_match_flip():
+    """Prova diferencial: generar i jugar els moviments del negre directament ha de donar el mateix que girar el tauler"""
+    rng = random.Random(2025)
+    for _ in range(100):
+        # Amb els taulers girats, el negre també té de tant en tant totes les fitxes al home
+        board = random_board(rng)
+        for board in (board, board.flip()):
+            flipped = board.flip()
+            assert board.valid_moves(player=BLACK) == flipped.valid_moves()
+            assert board.valid_moves(unique=True, player=BLACK) == flipped.valid_moves(unique=True)
+            successors = board.successors(BLACK)
+            assert [move for move, _ in successors] == [move for move, _ in flipped.successors()]
+            assert [next_board.flip().layout() for _, next_board in successors] == \
+                   [next_board.layout() for _, next_board in flipped.successors()]
+            assert board.successor_layouts(BLACK) == b"".join(next_board.layout() for _, next_board in successors)
+
+            for move in board.valid_moves(player=BLACK)[:5]:
+                after = board.play(move, BLACK)
+                assert after == flipped.play(move).flip() and after.key() == flipped.play(move).flip().key()
+                assert board.is_valid_move(move, BLACK)
+                if len(move.jumps) > 1:
+                    assert board.is_valid_move(Move(move.jumps[:-1]), BLACK) == flipped.is_valid_move(Move(move.jumps[:-1]))
+
+            # Aplicar i desfer els salts del negre deixa el tauler igual
+            copy = board.copy()
+            for move in board.valid_moves(player=BLACK)[:3]:
+                copy.apply_move(move, BLACK)
+                assert copy == board.play(move, BLACK)
+                copy.undo_move(move)
+                assert copy == board and copy.key() == board.key()
+
+
+def test_dice_cup_skip_and_rolls():
+    """Prova si DiceCup.skip i DiceCup.rolls donen exactament la mateixa seqüència que 'roll'"""
+    for seed in (0, 1, 123456, 2**32 - 1, -5, 2**64 + 3):
+        cup = DiceCup(seed)
+        expected = [cup.roll() for _ in range(500)]
+
+        bulk = DiceCup(seed)
+        rolls = bulk.rolls(300)
+        assert rolls.shape == (300, 2) and rolls.dtype.itemsize == 1
+        assert [Dice(int(die1), int(die2)) for die1, die2 in rolls] == expected[:300]
+        assert bulk.rolls(0).shape == (0, 2)
+        assert [bulk.roll() for _ in range(200)] == expected[300:] # Continua on ho ha deixat
+
+        for n in (0, 1, 37, 499):
+            skipped = DiceCup(seed)
+            skipped.skip(n)
+            assert skipped.roll() == expected[n]
+
+    # Saltar és additiu, també per salts enormes
+    first, second = DiceCup(7), DiceCup(7)
+    first.skip(10**15)
+    first.skip(3 * 10**14)
+    second.skip(13 * 10**14)
+    assert first.rolls(5).tolist() == second.rolls(5).tolist()
+
+    with pytest.raises(ValueError):
+        first.skip(-1)
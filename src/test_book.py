@@ -0,0 +1,48 @@
+import pytest
+from board import Board, Dice, Move, Jump
+from book import BOOK_FORMAT, OpeningBook, build
+
+
+def first_move(board: Board) -> Move:
+    """Escull sempre el primer moviment vàlid (per generar llibres ràpidament)."""
+    return board.valid_moves()[0]
+
+
+def test_build_and_lookup():
+    """Prova si book.build cobreix les primeres jugades i si OpeningBook.lookup compta els encerts"""
+    book = build(first_move, 2, 1, 1, 1)
+    assert len(book) > 21
+    board = Board(Dice(1, 3))
+    assert book.lookup(board) == first_move(board)
+    assert book.lookup(Board(Dice(3, 1))) == first_move(board) # L'ordre dels daus no importa
+
+    # Resposta del negre, des del seu punt de vista, després de la jugada del llibre
+    reply = board.play(first_move(board)).next(Dice(4, 6)).flip()
+    assert book.lookup(reply) == first_move(reply)
+    assert book.lookup(reply.play(first_move(reply))) is None
+    info = book.info()
+    assert (info.hits, info.misses, info.entries, info.version) == (3, 1, len(book), 1)
+
+
+def test_save_and_load(tmp_path):
+    """Prova si OpeningBook.save i OpeningBook.load conserven totes les jugades i rebutgen altres versions"""
+    book = OpeningBook(7, 1, 3, 4)
+    book.add(Board(Dice(2, 2)), Move([Jump(0, 2)] * 4))
+    book.add(Board(Dice(6, 5)), Move([Jump(0, 6), Jump(6, 5)]))
+    book.add(Board(Dice(6, 5), turn=2), Move([]))
+    path = tmp_path / "book.bin"
+    book.save(str(path))
+    assert path.stat().st_size == 16 + 3 * 13
+
+    loaded = OpeningBook.load(str(path), 7)
+    assert (loaded.version, loaded.plies, loaded.depth, loaded.width, len(loaded)) == (7, 1, 3, 4, 3)
+    assert loaded.lookup(Board(Dice(2, 2))) == Move([Jump(0, 2)] * 4)
+    assert loaded.lookup(Board(Dice(5, 6))) == Move([Jump(0, 6), Jump(6, 5)])
+    assert loaded.lookup(Board(Dice(6, 5), turn=2)) == Move([])
+
+    # Un llibre d'una altra versió de l'avaluació o un fitxer que no és un llibre no es carreguen
+    with pytest.raises(ValueError):
+        OpeningBook.load(str(path), 8)
+    path.write_bytes(b"BGBK" + bytes([BOOK_FORMAT + 1]) + path.read_bytes()[5:])
+    with pytest.raises(ValueError):
+        OpeningBook.load(str(path), 7)
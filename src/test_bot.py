@@ -0,0 +1,271 @@
+import pickle, random
+import pytest
+from board import BLACK, Board, Dice, DiceCup, Jump, Move, board_constructions
+import bot as bot_module
+from book import OpeningBook
+from bearoff import BearoffDatabase, generate, save
+from bot import (EVALUATOR_VERSION, ROLLS, TABLE_BYTES, TranspositionTable, _search_candidate, book_info, bot, configure_table, configure_workers,
+                 evaluate_board, evaluate_moves, layouts, load_bearoff, load_book,
+                 race_scores, successor_layouts, table_info)
+from evaluator import HEURISTIC, NeuralEvaluator, evaluate_boards, evaluate_positions
+from test_board import random_board
+
+
+def test_evaluate_boards_matches_evaluate_board():
+    """Prova si l'avaluació vectoritzada dona exactament les mateixes puntuacions que bot.evaluate_board"""
+    rng = random.Random(7)
+    for _ in range(100):
+        board = random_board(rng)
+        moves = board.valid_moves(unique=True)
+        scores = evaluate_boards(layouts([board.play(move) for move in moves]))
+        assert scores.tolist() == [evaluate_board(board, move) for move in moves]
+
+    # Tauler inicial: 15 fitxes al tauler, cap a la barra, cap salvada i cap sola
+    board = Board(Dice(1, 2))
+    assert layouts([board]).shape == (1, 28)
+    assert evaluate_boards(layouts([board])).tolist() == [15]
+
+
+def test_evaluate_moves_reuses_boards():
+    """Prova si bot.evaluate_moves amb profunditat 1 només construeix un tauler per cada moviment (més la còpia de la generació)"""
+    board = Board(Dice(2, 2))
+    successors = len(board.successors())
+    before = board_constructions()
+    evaluate_moves(board, depth=1)
+    assert board_constructions() - before <= successors + 1
+
+
+def test_rolls():
+    """Prova si les 21 tirades diferents sumen probabilitat 1"""
+    assert len(ROLLS) == 21
+    assert abs(sum(probability for _, probability in ROLLS) - 1) < 1e-12
+
+
+def test_search_matches_unpruned_expectiminimax():
+    """Prova si la cerca amb poda Star1/Star2 dona els mateixos valors que un expectiminimax sense poda"""
+    width = 3
+
+    def best(board, depth):
+        if depth == 1:
+            return float(evaluate_positions(successor_layouts(board)).max())
+        values = sorted(((float(evaluate_positions(layouts([next_board]))[0]), next_board) for _, next_board in board.successors()),
+                        key=lambda x: x[0], reverse=True)
+        return max(value(next_board, score, depth - 1) for score, next_board in values[:width])
+
+    def value(board, score, depth):
+        if depth == 0 or board.over():
+            return score
+        flipped = board.flip()
+        return -sum(probability * best(flipped.next(dice), depth) for dice, probability in ROLLS)
+
+    rng = random.Random(11)
+    for depth in (2, 3):
+        board = random_board(rng)
+        successors = {str(move): next_board for move, next_board in board.successors()}
+        evaluated = evaluate_moves(board, depth, width)
+        assert len(evaluated) == min(width, len(successors))
+        for evaluated_move in evaluated:
+            next_board = successors[str(evaluated_move.move)]
+            expected = value(next_board, float(evaluate_positions(layouts([next_board]))[0]), depth - 1)
+            assert abs(evaluated_move.score - expected) < 1e-9
+        assert str(bot(board, depth, width)) in {str(e.move) for e in evaluated if e.score == evaluated[0].score}
+        assert bot_module.last_search.depth == depth and bot_module.last_search.nodes > 0
+
+
+def test_bot_depth_one_is_greedy():
+    """Prova si amb profunditat 1 el bot escull el moviment amb millor avaluació estàtica"""
+    rng = random.Random(13)
+    for _ in range(20):
+        board = random_board(rng)
+        successors = board.successors()
+        scores = evaluate_positions(layouts([next_board for _, next_board in successors])).tolist()
+        assert bot(board, depth=1) == successors[scores.index(max(scores))][0]
+
+
+def test_bot_with_deadline():
+    """Prova si el bot amb límit de temps retorna un moviment vàlid, el de l'avaluació estàtica si no té temps, i el mateix que sense límit si en té prou"""
+    rng = random.Random(17)
+    for _ in range(5):
+        board = random_board(rng)
+        move = bot(board, deadline_ms=30)
+        assert board.is_valid_move(move)
+        assert 1 <= bot_module.last_search.depth <= bot_module.MAX_DEPTH
+        try:
+            # Sense taula de transposicions, perquè cap moviment de l'arrel es pugui resoldre sense cercar
+            configure_table(0)
+            move = bot(board, deadline_ms=0)
+            assert bot_module.last_search.depth == 1 # S'ha aturat sense completar cap iteració
+            assert move == bot(board, depth=1)
+        finally:
+            configure_table(TABLE_BYTES)
+        assert bot(board, depth=2, deadline_ms=60000) == bot(board, depth=2)
+        assert bot_module.last_search.depth == 2
+
+
+def test_transposition_table():
+    """Prova la política de substitució i les estadístiques de la taula de transposicions"""
+    table = TranspositionTable(2 * TranspositionTable.ENTRY_BYTES) # Una sola posició (dues entrades)
+    board1, board2, board3 = Board(Dice(1, 2)), Board(Dice(1, 2)).play(Move([Jump(0, 1)])), Board(Dice(1, 2)).flip()
+    assert table.get(board1, 2, 8, HEURISTIC) is None
+    table.put(board1, 2, 8, HEURISTIC, 1.5)
+    assert table.get(board1, 2, 8, HEURISTIC) == 1.5
+    assert table.get(board1, 1, 8, HEURISTIC) is None and table.get(board1, 2, 4, HEURISTIC) is None # Només a la mateixa cerca
+    assert table.get(board1, 2, 8, NeuralEvaluator.random()) is None
+    table.put(board2, 1, 8, HEURISTIC, -3.0) # Menys profunda: va a l'entrada que es substitueix sempre
+    table.put(board3, 1, 8, HEURISTIC, 2.0)
+    assert table.get(board1, 2, 8, HEURISTIC) == 1.5 and table.get(board2, 1, 8, HEURISTIC) is None and table.get(board3, 1, 8, HEURISTIC) == 2.0
+    info = table.info()
+    assert (info.hits, info.misses, info.stores, info.evictions, info.entries, info.capacity) == (3, 5, 3, 1, 2, 2)
+    assert info.hit_rate() == 3 / 8 and info.fill() == 1.0
+    assert TranspositionTable(0).get(board1, 2, 8, HEURISTIC) is None
+
+
+def test_transposition_table_keeps_moves():
+    """Prova si el bot escull els mateixos moviments, amb els mateixos valors, amb la taula i sense"""
+    rng = random.Random(19)
+    boards = [random_board(rng) for _ in range(2)]
+    try:
+        configure_table(0)
+        without = [[(str(e.move), e.score) for e in evaluate_moves(board, 3, 2)] + [str(bot(board, 3, 2))] for board in boards]
+        configure_table(TABLE_BYTES)
+        with_table = [[(str(e.move), e.score) for e in evaluate_moves(board, 3, 2)] + [str(bot(board, 3, 2))] for board in boards]
+        assert with_table == without
+        assert table_info().hits > 0
+    finally:
+        configure_table(TABLE_BYTES)
+
+
+def test_parallel_search_matches_serial():
+    """Prova si la cerca repartida entre processos dona exactament el mateix resultat que en un sol procés"""
+    rng = random.Random(29)
+    boards = [random_board(rng) for _ in range(4)]
+    serial = [([(str(e.move), e.score) for e in evaluate_moves(board)], str(bot(board))) for board in boards]
+    try:
+        configure_workers(2)
+        parallel = [([(str(e.move), e.score) for e in evaluate_moves(board)], str(bot(board))) for board in boards]
+        assert bot_module.last_search.nodes > 0
+    finally:
+        configure_workers(0)
+    assert parallel == serial
+
+
+def test_parallel_search_shares_table():
+    """Prova si les tasques dels processos, que reben cada cop una còpia de l'avaluació, aprofiten la taula de transposicions"""
+    board = random_board(random.Random(31))
+    network = NeuralEvaluator.random(hidden=4)
+    packed = board.play(board.valid_moves()[0]).pack()
+    try:
+        configure_table(TABLE_BYTES)
+        first = _search_candidate(packed, 0.0, 2, 8, pickle.loads(pickle.dumps(network)))
+        assert table_info().hits == 0
+        second = _search_candidate(packed, 0.0, 2, 8, pickle.loads(pickle.dumps(network)))
+        assert table_info().hits > 0 and second[0] == first[0] and second[1] < first[1]
+
+        # Amb altres pesos, o després de modificar-los, la clau canvia
+        assert NeuralEvaluator.random(hidden=4, seed=1).key != network.key
+        key = network.key
+        network.output_bias += 1
+        network.rekey()
+        assert network.key != key
+    finally:
+        configure_table(TABLE_BYTES)
+
+
+def test_bot_uses_opening_book(tmp_path):
+    """Prova si el bot retorna directament les jugades del llibre d'obertures, i si ignora els llibres d'una altra versió"""
+    board = Board(Dice(6, 5))
+    book_move = Move([Jump(0, 6), Jump(0, 5)])
+    book = OpeningBook(EVALUATOR_VERSION, 1, 3, 4)
+    book.add(board, book_move)
+    book.save(str(tmp_path / "book.bin"))
+    try:
+        load_book(str(tmp_path / "book.bin"))
+        assert bot(board) == book_move and bot_module.last_search.depth == 0
+        assert bot(board, book=False) != book_move
+        info = book_info()
+        assert info is not None and (info.hits, info.misses, info.entries) == (1, 0, 1)
+
+        OpeningBook(EVALUATOR_VERSION + 1, 1, 3, 4).save(str(tmp_path / "old.bin"))
+        with pytest.warns(UserWarning):
+            load_book(str(tmp_path / "old.bin"))
+        assert book_info() is None
+    finally:
+        load_book()
+
+
+def test_bot_uses_bearoff_database(tmp_path):
+    """Prova si el bot fa servir la base de dades de bear off a les posicions de bear off sense contacte"""
+    save(str(tmp_path / "bearoff.bin"), generate(4))
+    database = BearoffDatabase(str(tmp_path / "bearoff.bin"))
+    board = Board(Dice(4, 2), cells=[-3] + [0] * 17 + [1, 0, 1, 0, 1, 1])
+    try:
+        load_bearoff(str(tmp_path / "bearoff.bin"))
+        assert bot(board) == database.best_move(board) and bot_module.last_search.depth == 0
+        bot(board, bearoff=False, race=False)
+        assert bot_module.last_search.depth == 2
+        contact = Board(Dice(4, 2), cells=[-3] + [0] * 17 + [1, -1, 1, 0, 1, 1])
+        bot(contact)
+        assert bot_module.last_search.depth == 2
+    finally:
+        load_bearoff()
+
+
+def test_bot_race_mode():
+    """Prova si, sense contacte, el bot escull a una jugada la posició amb menys punts efectius"""
+    board = Board(Dice(6, 3), cells=[-2, -3, 0, 0, -5, 0, -5] + [0] * 5 + [2, 0, 0, 3, 0, 0, 4, 2, 2, 0, 2, 0])
+    assert board.is_race()
+    successors = board.successors()
+    scores = race_scores(layouts([next_board for _, next_board in successors])).tolist()
+    assert bot(board) == successors[scores.index(max(scores))][0] and bot_module.last_search.depth == 1
+
+    # Avançar fitxes redueix els punts que falten; les fitxes a les caselles baixes del home es malgasten
+    start = Board(Dice(1, 2), cells=[-15] + [0] * 17 + [15, 0, 0, 0, 0, 0])
+    assert race_scores(layouts([start])).tolist() == [-96] # 90 punts i 12 fitxes de més a la casella
+    assert race_scores(layouts([Board(Dice(1, 2), cells=[-15] + [0] * 22 + [1])])).tolist() == [-3]
+    assert race_scores(layouts([Board(Dice(1, 2), cells=[-15] + [0] * 18 + [1, 0, 0, 0, 0])])).tolist() == [-5.25]
+
+
+def test_bot_with_neural_evaluator(tmp_path):
+    """Prova si el bot pot jugar amb la xarxa neuronal, i si llavors no fa servir el llibre d'obertures"""
+    evaluator = NeuralEvaluator.random(hidden=8, seed=3)
+    board = Board(Dice(6, 5))
+    book = OpeningBook(EVALUATOR_VERSION, 1, 3, 4)
+    book.add(board, Move([Jump(0, 6), Jump(0, 5)]))
+    book.save(str(tmp_path / "book.bin"))
+    try:
+        load_book(str(tmp_path / "book.bin"))
+        move = bot(board, evaluator=evaluator)
+        assert bot_module.last_search.depth == 2 and board.is_valid_move(move)
+    finally:
+        load_book()
+
+    rng = random.Random(31)
+    for _ in range(3):
+        board = random_board(rng)
+        evaluated = evaluate_moves(board, 2, 4, evaluator)
+        assert all(-1 <= e.score <= 1 for e in evaluated)
+        assert bot(board, 2, 4, evaluator=evaluator, race=False, bearoff=False) == evaluated[0].move
+
+
+def test_bot_plays_black_without_flipping():
+    """Prova diferencial: una partida jugant el negre directament ha de ser idèntica a la que gira el tauler a cada torn"""
+    def play(flip: bool) -> list[bytes]:
+        cup = DiceCup(99)
+        board = Board(cup.roll())
+        layouts = []
+        while not board.over():
+            board = board.play(bot(board, depth=1)).next(cup.roll())
+            if board.over():
+                break
+            if flip:
+                board = board.flip()
+                board = board.play(bot(board, depth=1)).next(cup.roll()).flip()
+            else:
+                board = board.play(bot(board, depth=1, player=BLACK), BLACK).next(cup.roll())
+            layouts.append(board.layout())
+        return layouts
+
+    assert play(False) == play(True)
+
+    board = random_board(random.Random(53))
+    assert bot(board, player=BLACK) == bot(board.flip())
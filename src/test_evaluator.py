@@ -0,0 +1,42 @@
+import random
+import numpy as np
+from board import Board, Dice, layouts
+from evaluator import HEURISTIC, INPUTS, HeuristicEvaluator, NeuralEvaluator, encode, evaluate_positions, load_evaluator, mirror
+from test_board import random_board
+
+
+def test_evaluators_are_antisymmetric():
+    """Prova si les puntuacions de les dues avaluacions canvien de signe vistes pel rival, i si respecten la seva cota"""
+    rng = random.Random(37)
+    boards = [random_board(rng) for _ in range(50)]
+    positions = layouts(boards)
+    assert (mirror(positions) == layouts([board.flip() for board in boards])).all()
+    for evaluator in (HEURISTIC, NeuralEvaluator.random(hidden=16, seed=1)):
+        scores = evaluator.score(positions)
+        assert scores.shape == (50,)
+        assert np.allclose(scores, -evaluator.score(mirror(positions)))
+        assert (np.abs(scores) <= evaluator.bound).all()
+    assert (HEURISTIC.score(positions) == evaluate_positions(positions)).all()
+    assert HEURISTIC == HeuristicEvaluator()
+
+
+def test_encode():
+    """Prova la codificació de les posicions per la xarxa neuronal"""
+    encoded = encode(layouts([Board(Dice(1, 2))]))
+    assert encoded.shape == (1, INPUTS) == (1, 196)
+    units = encoded[0, :192].reshape(24, 2, 4)
+    assert units[0, 0].tolist() == [1, 1, 0, 0] # 2 fitxes blanques a la casella 0
+    assert units[5, 1].tolist() == [1, 1, 1, 1] # 5 fitxes negres a la casella 5
+    assert units[1].sum() == 0 and encoded[0, 192:].tolist() == [0, 0, 0, 0]
+
+
+def test_neural_evaluator_save_and_load(tmp_path):
+    """Prova si els pesos de la xarxa neuronal es guarden i es carreguen correctament"""
+    evaluator = NeuralEvaluator.random(hidden=8, seed=2)
+    path = str(tmp_path / "weights.npz")
+    evaluator.save(path)
+    loaded = load_evaluator(path)
+    assert isinstance(loaded, NeuralEvaluator) and loaded.hidden_weights.shape == (INPUTS, 8)
+    positions = layouts([random_board(random.Random(41)) for _ in range(10)])
+    assert np.allclose(loaded.score(positions), evaluator.score(positions), atol=1e-6)
+    assert load_evaluator("heuristic") is HEURISTIC
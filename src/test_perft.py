@@ -0,0 +1,39 @@
+import random
+from board import Board, Dice, configure_move_cache, move_cache_info, MOVE_CACHE_SIZE
+from perft import differential, perft
+from test_board import random_board
+
+
+def test_perft_opening():
+    """Prova el recompte de l'arbre d'una jugada des de la posició inicial amb els dos generadors"""
+    board = Board(Dice(1, 1))
+    reference, fast = perft(board, 1), perft(board, 1, "successors")
+    assert (reference.leaves, fast.leaves, reference.unique, fast.unique) == (2195, 447, 406, 406)
+    assert sum(reference.by_roll.values()) == reference.leaves and len(reference.by_roll) == 21
+    assert reference.positions == reference.leaves and reference.positions_per_second() > 0
+    assert perft(board, 0).leaves == 1
+
+
+def test_perft_generators_agree():
+    """Prova diferencial: els dos generadors arriben a les mateixes posicions a dues jugades"""
+    board = Board(Dice(1, 1), cells=[-1, 0, -2, 0, 0, 0] + [0] * 12 + [0, 2, 0, 1, 0, 0])
+    reference, fast = perft(board, 2), perft(board, 2, "successors")
+    assert reference.unique == fast.unique and reference.leaves >= fast.leaves
+    assert differential(board, 2) == []
+
+    rng = random.Random(25)
+    for _ in range(5):
+        assert differential(random_board(rng), 1) == []
+
+
+def test_perft_game_over():
+    """Prova si les partides acabades no s'expandeixen i si es manté la mida de la memòria cau"""
+    board = Board(Dice(1, 1), cells=[-1] + [0] * 22 + [1]) # Qualsevol tirada treu l'última fitxa blanca
+    try:
+        configure_move_cache(100)
+        assert perft(board, 1).leaves == 21 and perft(board, 2).leaves == perft(board, 2, "successors").leaves == 0
+        assert perft(board.play(board.valid_moves()[0]), 1).leaves == 0
+        assert differential(board, 3) == []
+        assert move_cache_info().maxsize == 100
+    finally:
+        configure_move_cache(MOVE_CACHE_SIZE)
@@ -0,0 +1,37 @@
+import pytest
+from position_index import PositionIndex, build_index
+from records import GameRecord, RecordWriter
+from test_records import random_game
+
+
+def test_position_at(tmp_path):
+    """Prova si cada posició de l'índex és la mateixa que reproduint la partida des del principi"""
+    records_path, index_path = str(tmp_path / "games.bin"), str(tmp_path / "games.idx")
+    records = [GameRecord.from_moves(seed, "a", "b", random_game(seed)[0]) for seed in range(3)]
+    with RecordWriter(records_path) as writer:
+        for record in records:
+            writer.write(record)
+
+    for every in (1, 5):
+        assert build_index(records_path, index_path, every) == 3
+        with PositionIndex(records_path, index_path) as index:
+            assert len(index) == 3 and index.every() == every
+            for game_id, record in enumerate(records):
+                assert index.record(game_id) == record and index.turns(game_id) == len(record.moves())
+                for turn in range(1, index.turns(game_id) + 2):
+                    board, expected = index.position_at(game_id, turn), record.replay(turn - 1)
+                    assert board == expected and board.dice() == expected.dice() and board.turn() == turn
+            with pytest.raises(IndexError):
+                index.position_at(3, 1)
+            with pytest.raises(IndexError):
+                index.position_at(0, index.turns(0) + 2)
+
+    # L'índex segueix valent si s'afegeixen partides, però no si el fitxer de partides és més curt
+    with RecordWriter(records_path) as writer:
+        writer.write(records[0])
+    with PositionIndex(records_path, index_path) as index:
+        assert len(index) == 3
+    with open(records_path, "r+b") as file:
+        file.truncate(100)
+    with pytest.raises(ValueError):
+        PositionIndex(records_path, index_path)
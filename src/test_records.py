@@ -0,0 +1,91 @@
+import pickle, random
+import pytest
+from arena import Arena, User
+from board import BLACK, WHITE, Board, DiceCup
+from records import GameRecord, RecordWriter, pack_moves, read_records, unpack_moves
+
+
+def random_game(seed: int) -> tuple[list, Board]:
+    """Juga una partida amb moviments a l'atzar i els daus de 'DiceCup(seed)', com 'arena.Game'"""
+    rng = random.Random(seed)
+    cup = DiceCup(seed)
+    board = Board(cup.roll())
+    moves, player = [], WHITE
+    while not board.over():
+        move = rng.choice(board.valid_moves(player=player))
+        moves.append(move)
+        board = board.play(move, player).next(cup.roll())
+        player = BLACK if player == WHITE else WHITE
+    return moves, board
+
+
+def test_pack_moves():
+    """Prova si els moviments es codifiquen en un byte per moviment més un per salt"""
+    moves, _ = random_game(1)
+    packed = pack_moves(moves)
+    assert len(packed) == len(moves) + sum(len(move.jumps) for move in moves)
+    assert list(unpack_moves(packed)) == moves
+
+
+def test_replay():
+    """Prova si reproduir una partida des de la llavor i els moviments dona exactament el tauler final"""
+    for seed in range(5):
+        moves, board = random_game(seed)
+        record = GameRecord.from_moves(seed, "a", "b", moves)
+        assert record.moves() == moves
+        final = record.replay()
+        assert final == board and final.dice() == board.dice() and final.turn() == board.turn()
+        assert record.replay(0) == Board(DiceCup(seed).roll())
+
+
+def test_writer_and_reader(tmp_path):
+    """Prova si les partides s'afegeixen al fitxer en diverses sessions i es tornen a llegir igual"""
+    path = str(tmp_path / "games.bin")
+    records = [GameRecord.from_moves(seed, "white", "nègre", random_game(seed)[0]) for seed in range(4)]
+    with RecordWriter(path) as writer:
+        offsets = [writer.write(record) for record in records[:3]]
+    with RecordWriter(path) as writer:
+        offsets.append(writer.write(records[3]))
+    assert offsets[0] == 5 and offsets == sorted(offsets)
+    assert list(read_records(path)) == records
+
+    # Un fitxer tallat o que no és de partides
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(data[:-1])
+    with pytest.raises(ValueError):
+        list(read_records(path))
+    with open(path, "wb") as file:
+        file.write(b"no")
+    with pytest.raises(ValueError):
+        RecordWriter(path)
+    with pytest.raises(ValueError):
+        GameRecord(-1, "a", "b", b"").pack()
+
+
+def test_arena_records(tmp_path):
+    """Prova si l'arena guarda les partides acabades i si es poden reproduir"""
+    path = str(tmp_path / "arena-games.bin")
+    arena = Arena(reg_users={}, con_users={}, current_games={}, records_path=path)
+    user1, user2 = User("Test1", "test1"), User("Test2", "test2")
+    for user in (user1, user2):
+        arena.register(user)
+        arena.login(user)
+    game = arena.start_new_game(user1, user2)
+    for player in (WHITE, BLACK, WHITE):
+        game.apply_move(game.board.valid_moves(player=player)[0], player)
+    arena.end_game(game.id, True)
+
+    [record] = read_records(path)
+    assert (record.seed, record.white, record.black) == (game.seed, "test1", "test2")
+    assert record.replay() == game.board and record.replay().dice() == game.board.dice()
+
+    # Una arena carregada d'un fitxer, sense fitxer de partides, les guarda un cop se n'hi assigna un
+    loaded = pickle.loads(pickle.dumps(Arena(reg_users={}, con_users={}, current_games={})))
+    for user in (user1, user2):
+        loaded.register(user)
+    loaded.set_records_path(path)
+    game = loaded.start_new_game(user1, user2)
+    loaded.end_game(game.id, False)
+    assert [record.seed for record in read_records(path)] == [record.seed, game.seed]
@@ -0,0 +1,45 @@
+from collections import Counter
+import pytest
+from board import Board, Dice, layouts
+from evaluator import NeuralEvaluator
+from rollout import STRATA, first_rolls, play_out, rollout
+from tournament import BotConfig
+
+
+def test_first_rolls_are_stratified():
+    """Prova si cada bloc de 36 partides fa servir totes les tirades a les dues primeres jugades, i totes les parelles en 1.296"""
+    for block in range(3):
+        rolls = [first_rolls(36 * block + i) for i in range(36)]
+        assert sorted((dice.die1, dice.die2) for dice, _ in rolls) == sorted((dice.die1, dice.die2) for dice in STRATA)
+        assert sorted((dice.die1, dice.die2) for _, dice in rolls) == sorted((dice.die1, dice.die2) for dice in STRATA)
+    pairs = Counter((STRATA.index(first), STRATA.index(second)) for first, second in map(first_rolls, range(1296)))
+    assert len(pairs) == 1296
+
+
+def test_rollout(tmp_path):
+    """Prova si el rollout és reproduïble, no depèn del nombre de processos i dona l'equitat de posicions decidides"""
+    policy = BotConfig(depth=1)
+    board = Board(Dice(1, 1))
+    result = rollout(board, 40, policy, seed=3)
+    assert -1 <= result.equity <= 1 and result.stderr > 0 and result.games == 40 and result.rollouts_per_second() > 0
+    parallel = rollout(board, 40, policy, seed=3, workers=2)
+    assert (parallel.equity, parallel.stderr) == (result.equity, result.stderr)
+
+    # Una fitxa al punt 23 contra quinze negres a la barra: el blanc guanya sempre
+    won = Board(Dice(1, 1), cells=[0] * 23 + [1], barB=15)
+    result = rollout(won, 10, policy)
+    assert (result.equity, result.stderr) == (1, 0)
+    assert rollout(won.flip(), 10, policy).equity == -1 # El blanc que tira no pot guanyar abans que el negre surti
+
+    # Truncant sense jugar cap jugada, és l'equitat de l'avaluació estàtica de la posició
+    path = str(tmp_path / "random.npz")
+    NeuralEvaluator.random(hidden=4).save(path)
+    neural = BotConfig(depth=1, evaluator=path)
+    assert play_out(board, 0, 0, neural, truncate=0) == neural.evaluation().score(layouts([board]))[0]
+    assert -1 <= rollout(board, 4, neural, truncate=2).equity <= 1
+
+    # L'heurística no dona una equitat: no es pot fer servir per truncar
+    with pytest.raises(ValueError):
+        rollout(board, 4, policy, truncate=2)
+    with pytest.raises(ValueError):
+        play_out(board, 0, 0, policy, truncate=0)
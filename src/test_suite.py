@@ -0,0 +1,49 @@
+from dataclasses import replace
+import bot as bot_module
+from board import Board, Dice, configure_move_cache, move_cache_info, MOVE_CACHE_SIZE
+from suite import CATEGORIES, classify, compare, load_baseline, load_corpus, run_suite, save_baseline, save_corpus
+
+
+def test_classify():
+    """Prova la categoria de les posicions del corpus"""
+    assert classify(Board(Dice(3, 1))) == "opening"
+    assert classify(Board(Dice(3, 1), turn=5)) == "contact"
+    assert classify(Board(Dice(4, 4), turn=5)) == "double-heavy"
+    assert classify(Board(Dice(3, 1), turn=5, barW=1, cells=[1, 0, 0, 0, 0, -5, 0, -3, 0, 0, 0, 5, -5, 0, 0, 0, 3, 0, 5, 0, 0, 0, 0, -2])) == "bar-entry"
+    assert classify(Board(Dice(3, 1), turn=5, cells=[-15] + [0] * 17 + [5, 5, 5, 0, 0, 0])) == "bear-off"
+    assert classify(Board(Dice(3, 1), turn=5, cells=[-15] + [0] * 16 + [15, 0, 0, 0, 0, 0, 0])) == "race"
+
+
+def test_corpus(tmp_path):
+    """Prova si el corpus guardat té posicions de totes les categories i es pot tornar a llegir"""
+    corpus = load_corpus()
+    assert tuple(corpus) == CATEGORIES
+    for category, boards in corpus.items():
+        assert len(boards) >= 4 and all(classify(board) == category for board in boards)
+        assert len({board.pack() for board in boards}) == len(boards) # Cap posició repetida
+    assert {board.turn() for board in corpus["opening"]} == {1, 2}
+    save_corpus(str(tmp_path / "corpus.json"), corpus)
+    assert load_corpus(str(tmp_path / "corpus.json")) == corpus
+
+
+def test_run_suite_and_compare(tmp_path):
+    """Prova si la suite mesura les operacions i si la comparació detecta les regressions"""
+    corpus = {category: boards[:1] for category, boards in load_corpus().items() if category in ("contact", "race")}
+    try:
+        configure_move_cache(100)
+        bot_module.configure_table(100 * 2 * bot_module.TranspositionTable.ENTRY_BYTES)
+        results = run_suite(corpus, ("valid_moves", "play"), rounds=1)
+        assert move_cache_info().maxsize == 100 and bot_module.table_info().capacity == 200 # Es manté la configuració
+    finally:
+        configure_move_cache(MOVE_CACHE_SIZE)
+        bot_module.configure_table(bot_module.TABLE_BYTES)
+    assert [result.key() for result in results] == ["valid_moves/contact", "valid_moves/race", "play/contact", "play/race"]
+    assert all(result.ops_per_second() > 0 and result.constructions == 1 and result.peak_bytes > 0 for result in results)
+
+    save_baseline(str(tmp_path / "baseline.json"), results)
+    baseline = load_baseline(str(tmp_path / "baseline.json"))
+    assert compare(results, baseline) == []
+    slower = replace(results[0], seconds=results[0].seconds * 2)
+    more_boards = replace(results[1], constructions=2.0)
+    regressions = compare([slower, more_boards], baseline)
+    assert len(regressions) == 2 and regressions[0].startswith("valid_moves/contact") and regressions[1].startswith("valid_moves/race")
@@ -0,0 +1,64 @@
+import io, json, math
+import pytest
+from evaluator import NeuralEvaluator
+from tournament import BotConfig, parse_config, play_game, read_seeds, run, sprt, wilson_interval
+
+
+def test_parse_config():
+    """Prova si tournament.parse_config llegeix la configuració dels bots i rebutja paràmetres desconeguts"""
+    assert parse_config("") == BotConfig()
+    assert parse_config("depth=3,width=4,evaluator=w.npz,book=0") == BotConfig(3, 4, None, "w.npz", False)
+    assert parse_config("deadline_ms=50").deadline_ms == 50
+    with pytest.raises(ValueError):
+        parse_config("depht=3")
+    with pytest.raises(ValueError):
+        parse_config("race=yes")
+
+
+def test_wilson_interval_and_sprt():
+    """Prova l'interval de Wilson i les decisions del SPRT"""
+    low, high = wilson_interval(50, 100)
+    assert math.isclose(low, 0.4038, abs_tol=1e-4) and math.isclose(high, 0.5962, abs_tol=1e-4)
+    assert wilson_interval(0, 10)[0] == 0 and wilson_interval(10, 10)[1] == 1
+    assert wilson_interval(0, 0) == (0, 1)
+    assert sprt(5, 5, 0.5, 0.6) is None
+    assert sprt(60, 20, 0.5, 0.6) == "H1"
+    assert sprt(40, 60, 0.5, 0.6) == "H0"
+
+
+def test_play_game():
+    """Prova si tournament.play_game és reproduïble i dona el guanyador i les jugades de cada bot"""
+    config = BotConfig(depth=1)
+    result = play_game(7, config, config)
+    again = play_game(7, config, config)
+    assert (again.winner, again.turns) == (result.winner, result.turns)
+    assert result.white == "A" and result.winner in ("A", "B") and result.turns > 10
+    assert set(result.ms_per_move) == {"A", "B"}
+    swapped = play_game(7, config, config, "B")
+    assert swapped.white == "B" and swapped.winner != result.winner # Els mateixos daus i el mateix bot
+
+
+def test_run(tmp_path):
+    """Prova si tournament.run no depèn del nombre de processos, escriu els resultats i s'atura amb el SPRT"""
+    a, b = BotConfig(depth=1), BotConfig(depth=1, race=False)
+    serial, parallel = io.StringIO(), io.StringIO()
+    stats = run(a, b, range(4), output=serial)
+    parallel_stats = run(a, b, range(4), workers=2, output=parallel)
+    lines = [json.loads(line) for line in serial.getvalue().splitlines()]
+    assert [line["seed"] for line in lines] == [0, 1, 2, 3]
+    assert [line["white"] for line in lines] == ["A", "B", "A", "B"]
+    assert [{key: line[key] for key in ("seed", "white", "winner", "turns")} for line in lines] == \
+           [{key: line[key] for key in ("seed", "white", "winner", "turns")} for line in map(json.loads, parallel.getvalue().splitlines())]
+    assert (stats.games, stats.wins) == (parallel_stats.games, parallel_stats.wins) == (4, sum(line["winner"] == "A" for line in lines))
+    assert stats.games_per_second() > 0 and stats.decision is None
+
+    # Una xarxa sense entrenar contra l'heurística: el SPRT decideix en poques partides
+    path = str(tmp_path / "random.npz")
+    NeuralEvaluator.random(hidden=4).save(path)
+    stats = run(BotConfig(depth=1), BotConfig(depth=1, evaluator=path), range(20), sprt_bounds=(0.05, 0.95))
+    assert stats.decision == "H1" and stats.games < 20
+
+    seeds = tmp_path / "seeds.txt"
+    seeds.write_text("5\n9\n\n12\n")
+    assert read_seeds(str(seeds)) == [5, 9, 12]
+    assert read_seeds("3-6") == [3, 4, 5, 6]
@@ -0,0 +1,68 @@
+import random
+import numpy as np
+from board import layouts
+from evaluator import NeuralEvaluator
+from test_board import random_board
+from train import gradients, self_play, td_targets, train
+
+
+def test_self_play():
+    """Prova si train.self_play juga una partida reproduïble que acaba amb la posició del guanyador"""
+    network = NeuralEvaluator.random(hidden=8, seed=3)
+    positions = self_play(network, 5)
+    assert positions.shape[1] == 28 and positions.dtype == np.int8
+    assert positions[-1, 26] == 15 # El guanyador ha salvat totes les fitxes
+    assert (positions[:, 26] <= 15).all() and (positions[:-1, 26] < 15).all()
+    assert (self_play(network, 5) == positions).all()
+
+
+def test_td_targets():
+    """Prova el retorn λ de TD(λ), que canvia de signe a cada jugada"""
+    values = np.array([0.1, -0.2, 0.3, 0.5])
+    assert td_targets(values, 1).tolist() == [-1, 1, -1, 1] # Monte Carlo: el resultat de la partida
+    assert np.allclose(td_targets(values, 0), [0.2, -0.3, -0.5, 1]) # TD(0): menys el valor de la següent
+    assert np.allclose(td_targets(values, 0.5), [-(0.5 * -0.2 + 0.5 * 0.225), -(0.5 * 0.3 + 0.5 * -0.75), -(0.5 * 0.5 + 0.5), 1])
+
+
+def test_gradients():
+    """Prova si train.gradients coincideix amb el gradient numèric de les puntuacions de la xarxa"""
+    network = NeuralEvaluator.random(hidden=4, seed=4)
+    positions = layouts([random_board(random.Random(43)) for _ in range(6)])
+    weights = np.linspace(-1, 1, 6)
+    analytic = gradients(network, positions, weights)
+
+    def total() -> float:
+        return float(weights @ network.score(positions))
+
+    epsilon = 1e-6
+    for parameter, gradient, index in ((network.hidden_weights, analytic[0], (100, 2)), (network.hidden_bias, analytic[1], (1,)),
+                                       (network.output_weights, analytic[2], (3,))):
+        parameter[index] += epsilon
+        after = total()
+        parameter[index] -= 2 * epsilon
+        before = total()
+        parameter[index] += epsilon
+        assert abs((after - before) / (2 * epsilon) - gradient[index]) < 1e-6
+    network.output_bias += epsilon
+    after = total()
+    network.output_bias -= 2 * epsilon
+    assert abs((after - total()) / (2 * epsilon) - analytic[3]) < 1e-6
+
+
+def test_train(tmp_path):
+    """Prova si train.train és determinista, no depèn del nombre de processos i guarda els punts de control"""
+    network = NeuralEvaluator.random(hidden=8, seed=5)
+    original = network.hidden_weights.copy()
+    rounds = []
+    trained, stats = train(network, 6, seed=11, publish_every=4, checkpoint=str(tmp_path / "net-{games}.npz"),
+                           checkpoint_every=4, progress=lambda stats: rounds.append(stats.games))
+    assert (network.hidden_weights == original).all()
+    assert not (trained.hidden_weights == original).all()
+    assert (stats.games, stats.rounds, rounds) == (6, 2, [4, 6])
+    assert stats.positions > 6 and stats.games_per_second() > 0 and stats.positions_per_second() > 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["net-4.npz"]
+
+    parallel, parallel_stats = train(network, 6, seed=11, workers=2, publish_every=4)
+    assert parallel_stats.positions == stats.positions
+    assert (parallel.hidden_weights == trained.hidden_weights).all()
+    assert parallel.output_bias == trained.output_bias
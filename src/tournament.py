@@ -0,0 +1,231 @@
+from __future__ import annotations
+import argparse, json, math, time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable, Iterator, TextIO
+from board import BLACK, WHITE, Board, DiceCup, Move, Player
+from bot import bot
+from evaluator import Evaluator, load_evaluator
+
+
+@dataclass(frozen=True)
+class BotConfig:
+    """Paràmetres d'un dels bots del torneig (veure 'bot.bot')."""
+    depth: int | None = None
+    width: int = 8
+    deadline_ms: float | None = None
+    evaluator: str = "heuristic" # "heuristic" o un fitxer .npz (veure 'evaluator.load_evaluator')
+    book: bool = True
+    bearoff: bool = True
+    race: bool = True
+
+    def evaluation(self) -> Evaluator:
+        """Retorna l'avaluació del bot, carregada un sol cop per procés."""
+        if self.evaluator not in _evaluators:
+            _evaluators[self.evaluator] = load_evaluator(self.evaluator)
+        return _evaluators[self.evaluator]
+
+    def move(self, board: Board, player: Player = WHITE) -> Move:
+        """Retorna la jugada del bot amb aquesta configuració pel jugador 'player' (veure 'bot.bot')."""
+        return bot(board, self.depth, self.width, self.deadline_ms, self.book, self.bearoff, self.race, self.evaluation(), player)
+
+
+_evaluators: dict[str, Evaluator] = {} # Avaluacions ja carregades pel procés (així la taula de transposicions les reconeix)
+
+
+def parse_config(text: str) -> BotConfig:
+    """
+    Llegeix la configuració d'un bot en format "clau=valor,clau=valor", per exemple
+    "depth=2,width=4,evaluator=weights.npz". Llença ValueError si alguna clau o valor no és vàlid.
+    """
+    values: dict[str, object] = {}
+    for item in filter(None, text.split(",")):
+        name, _, value = item.partition("=")
+        if name in ("depth", "width"):
+            values[name] = int(value)
+        elif name == "deadline_ms":
+            values[name] = float(value)
+        elif name in ("book", "bearoff", "race"):
+            if value not in ("0", "1"):
+                raise ValueError(f"{name} ha de ser 0 o 1")
+            values[name] = value == "1"
+        elif name == "evaluator":
+            values[name] = value
+        else:
+            raise ValueError(f"Paràmetre del bot desconegut: {name}")
+    return BotConfig(**values) # type: ignore[arg-type]
+
+
+@dataclass
+class GameResult:
+    """Resultat d'una partida del torneig: els bots es diuen "A" i "B"."""
+    seed: int # Llavor dels daus (veure 'DiceCup')
+    white: str # Bot que juga amb les blanques
+    winner: str # Bot que ha guanyat
+    turns: int # Jugades de la partida (de tots dos jugadors)
+    ms_per_move: dict[str, float] = field(default_factory=dict) # Temps mitjà per decidir cada jugada, per bot
+
+
+def play_game(seed: int, white: BotConfig, black: BotConfig, white_name: str = "A") -> GameResult:
+    """
+    Juga una partida sense mostrar res entre dos bots, amb els daus de 'DiceCup(seed)': 'white_name'
+    és el nom ("A" o "B") del bot que juga amb les blanques.
+    """
+    black_name = "B" if white_name == "A" else "A"
+    configs = {WHITE: white, BLACK: black}
+    seconds = {WHITE: 0.0, BLACK: 0.0}
+    moves = {WHITE: 0, BLACK: 0}
+    cup = DiceCup(seed)
+    board = Board(cup.roll())
+    player = WHITE
+    while True:
+        start = time.perf_counter()
+        move = configs[player].move(board, player)
+        seconds[player] += time.perf_counter() - start
+        moves[player] += 1
+        board = board.play(move, player)
+        if board.off(player) == 15:
+            break
+        board = board.next(cup.roll())
+        player = BLACK if player == WHITE else WHITE
+
+    names = {WHITE: white_name, BLACK: black_name}
+    return GameResult(seed, white_name, names[player], moves[WHITE] + moves[BLACK],
+                      {names[side]: 1000 * seconds[side] / moves[side] for side in (WHITE, BLACK) if moves[side]})
+
+
+def _play_seed(seed: int, a: BotConfig, b: BotConfig, a_white: bool) -> GameResult:
+    return play_game(seed, a, b, "A") if a_white else play_game(seed, b, a, "B")
+
+
+def wilson_interval(wins: int, games: int, z: float = 1.96) -> tuple[float, float]:
+    """Retorna l'interval de confiança de Wilson (per defecte del 95%) de la proporció de partides guanyades."""
+    if not games:
+        return 0.0, 1.0
+    p = wins / games
+    center = (p + z * z / (2 * games)) / (1 + z * z / games)
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def sprt(wins: int, losses: int, p0: float, p1: float, alpha: float = 0.05, beta: float = 0.05) -> str | None:
+    """
+    Test seqüencial de raó de versemblança (SPRT) sobre la probabilitat de guanyar de "A": retorna
+    "H0" si es pot acceptar que és 'p0', "H1" si es pot acceptar que és 'p1', o None si encara
+    calen més partides ('alpha' i 'beta' són els errors de tipus I i II).
+    """
+    llr = wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+    if llr >= math.log((1 - beta) / alpha):
+        return "H1"
+    if llr <= math.log(beta / (1 - alpha)):
+        return "H0"
+    return None
+
+
+@dataclass
+class TournamentStats:
+    """Estadístiques d'un torneig entre els bots "A" i "B"."""
+    games: int = 0 # Partides jugades
+    wins: int = 0 # Partides guanyades per "A"
+    moves: int = 0 # Jugades fetes pels dos bots
+    seconds: float = 0.0 # Temps total del torneig
+    decision: str | None = None # Resultat del SPRT, si s'ha aturat abans d'hora ("H0" o "H1")
+
+    def win_rate(self) -> float:
+        """Retorna la proporció de partides guanyades per "A"."""
+        return self.wins / self.games if self.games else 0.0
+
+    def interval(self) -> tuple[float, float]:
+        """Retorna l'interval de confiança del 95% de la proporció de partides guanyades per "A"."""
+        return wilson_interval(self.wins, self.games)
+
+    def games_per_second(self) -> float:
+        """Retorna el nombre de partides jugades per segon."""
+        return self.games / self.seconds if self.seconds else 0.0
+
+
+def _results(a: BotConfig, b: BotConfig, seeds: Iterable[int], pool: ProcessPoolExecutor | None, window: int) -> Iterator[GameResult]:
+    """Retorna els resultats de les partides per ordre de llavor, amb com a molt 'window' partides en marxa als processos."""
+    pending: deque[Future[GameResult]] = deque()
+    for index, seed in enumerate(seeds):
+        if pool is None:
+            yield _play_seed(seed, a, b, index % 2 == 0)
+            continue
+        pending.append(pool.submit(_play_seed, seed, a, b, index % 2 == 0))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run(a: BotConfig, b: BotConfig, seeds: Iterable[int], workers: int = 1, sprt_bounds: tuple[float, float] | None = None,
+        output: TextIO | None = None, progress: Callable[[TournamentStats], None] | None = None) -> TournamentStats:
+    """
+    Juga una partida entre "A" i "B" per cada llavor, alternant els colors ("A" juga amb les blanques
+    a les partides parelles), repartides entre 'workers' processos. Els resultats es processen per
+    ordre de llavor, de manera que no depenen del nombre de processos. Si es dona 'output', s'hi
+    escriu cada resultat en una línia JSON; si es dona 'sprt_bounds' (p0, p1), el torneig s'atura
+    tan bon punt el SPRT decideix (veure 'sprt'). Si es dona 'progress', es crida després de cada partida.
+    """
+    stats = TournamentStats()
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    start = time.perf_counter()
+    try:
+        # Dues partides per procés en marxa: prou per no esperar, i poques de més si el SPRT s'atura
+        for result in _results(a, b, seeds, pool, 2 * workers):
+            stats.games += 1
+            stats.wins += result.winner == "A"
+            stats.moves += result.turns
+            stats.seconds = time.perf_counter() - start
+            if output is not None:
+                output.write(json.dumps(asdict(result)) + "\n")
+            if progress is not None:
+                progress(stats)
+            if sprt_bounds is not None:
+                stats.decision = sprt(stats.wins, stats.games - stats.wins, *sprt_bounds)
+                if stats.decision is not None:
+                    break
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return stats
+
+
+def read_seeds(text: str) -> list[int]:
+    """Retorna les llavors d'un rang "inici-final" (tots dos inclosos) o, alternament, de les línies d'un fitxer."""
+    first, separator, last = text.partition("-")
+    if separator and first.isdigit() and last.isdigit():
+        return list(range(int(first), int(last) + 1))
+    with open(text) as file:
+        return [int(line) for line in file if line.strip()]
+
+
+def main() -> None:
+    """Juga un torneig entre dos bots i en mostra el resultat."""
+    parser = argparse.ArgumentParser(description="Torneig sense interfície entre dos configuracions del bot")
+    parser.add_argument("--a", default="", help="Configuració del bot A, per exemple 'depth=2,width=8,evaluator=heuristic'")
+    parser.add_argument("--b", default="", help="Configuració del bot B (el mateix format)")
+    parser.add_argument("--seeds", default="1-100", help="Rang de llavors 'inici-final' o fitxer amb una llavor per línia")
+    parser.add_argument("--workers", type=int, default=1, help="Processos que juguen les partides")
+    parser.add_argument("--output", default=None, help="Fitxer on s'escriu el resultat de cada partida (JSON Lines)")
+    parser.add_argument("--sprt", default=None, help="Hipòtesis 'p0,p1' de la probabilitat de guanyar de A per aturar abans d'hora")
+    args = parser.parse_args()
+
+    sprt_bounds = tuple(float(p) for p in args.sprt.split(",")) if args.sprt else None
+    output = open(args.output, "w") if args.output else None
+    try:
+        stats = run(parse_config(args.a), parse_config(args.b), read_seeds(args.seeds), args.workers,
+                    sprt_bounds, output) # type: ignore[arg-type]
+    finally:
+        if output is not None:
+            output.close()
+    low, high = stats.interval()
+    print(f"Partides: {stats.games} ({stats.games_per_second():.2f} partides/s, {stats.moves / stats.seconds if stats.seconds else 0.0:.1f} jugades/s)")
+    print(f"Victòries de A: {stats.wins} ({100 * stats.win_rate():.1f}%, IC 95% {100 * low:.1f}%-{100 * high:.1f}%)")
+    if stats.decision is not None:
+        print(f"SPRT: s'accepta {stats.decision} després de {stats.games} partides")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+import argparse, time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Callable
+import numpy as np
+from board import Board, DiceCup, successor_layouts
+from evaluator import NeuralEvaluator, mirror
+
+
+@dataclass
+class TrainStats:
+    """Estadístiques de l'entrenament per autojoc."""
+    games: int = 0 # Partides jugades
+    positions: int = 0 # Posicions amb què s'ha entrenat
+    rounds: int = 0 # Vegades que s'han publicat els pesos als processos
+    seconds: float = 0.0 # Temps total de l'entrenament
+    error: float = 0.0 # Error mitjà (en valor absolut) de l'última ronda
+
+    def games_per_second(self) -> float:
+        """Retorna el nombre de partides jugades per segon."""
+        return self.games / self.seconds if self.seconds else 0.0
+
+    def positions_per_second(self) -> float:
+        """Retorna el nombre de posicions entrenades per segon."""
+        return self.positions / self.seconds if self.seconds else 0.0
+
+
+def self_play(evaluator: NeuralEvaluator, seed: int) -> np.ndarray:
+    """
+    Juga una partida de la xarxa contra ella mateixa, amb els daus de 'DiceCup(seed)' i escollint
+    a cada jugada la posició amb millor puntuació. Retorna la posició després de cada jugada, vista
+    pel jugador que l'ha feta, com un array (N, 28) d'int8: l'última és la del guanyador.
+    """
+    cup = DiceCup(seed)
+    board = Board(cup.roll())
+    positions = []
+    while True:
+        layouts = successor_layouts(board)
+        choice = int(np.argmax(evaluator.score(layouts)))
+        positions.append(layouts[choice])
+        board = board.play(board.valid_moves(unique=True)[choice])
+        if board.over():
+            return np.array(positions)
+        board = board.next(cup.roll()).flip()
+
+
+def td_targets(values: np.ndarray, lam: float) -> np.ndarray:
+    """
+    Retorna l'objectiu TD(λ) de cada posició d'una partida, donada la puntuació de cadascuna (veure
+    'self_play'). Cada posició es veu pel jugador que acaba de moure i la següent pel rival, així que
+    el retorn λ canvia de signe a cada jugada: G[t] = -((1 - λ) V[t+1] + λ G[t+1]), i l'última val 1.
+    """
+    targets = np.empty(len(values))
+    target = 1.0
+    targets[-1] = target
+    for t in range(len(values) - 2, -1, -1):
+        target = -((1 - lam) * values[t + 1] + lam * target)
+        targets[t] = target
+    return targets
+
+
+def gradients(network: NeuralEvaluator, layouts: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    Retorna el gradient de la suma de les puntuacions de N posicions, cadascuna multiplicada pel seu
+    pes, respecte els pesos de la xarxa (en el mateix ordre que els paràmetres de 'NeuralEvaluator').
+    """
+    # La puntuació és p(x) - p(mirall de x): es retropropaga p amb les dues posicions i pesos oposats
+    layouts = np.concatenate((layouts, mirror(layouts)))
+    weights = np.concatenate((weights, -weights))
+    inputs, hidden, output = network.forward(layouts)
+    output_delta = weights * output * (1 - output)
+    hidden_delta = output_delta[:, None] * network.output_weights * hidden * (1 - hidden)
+    return inputs.T @ hidden_delta, hidden_delta.sum(axis=0), hidden.T @ output_delta, float(output_delta.sum())
+
+
+def td_update(network: NeuralEvaluator, positions: np.ndarray, alpha: float, lam: float) -> float:
+    """
+    Aplica a la xarxa l'actualització TD(λ) d'una partida (veure 'self_play'), amb la vista endavant
+    fora de línia: cada posició s'acosta 'alpha' vegades l'error al seu objectiu (veure 'td_targets').
+    Retorna l'error mitjà en valor absolut.
+    """
+    values = network.score(positions)
+    errors = td_targets(values, lam) - values
+    hidden_weights, hidden_bias, output_weights, output_bias = gradients(network, positions, errors)
+    network.hidden_weights += alpha * hidden_weights
+    network.hidden_bias += alpha * hidden_bias
+    network.output_weights += alpha * output_weights
+    network.output_bias += alpha * output_bias
+    network.rekey()
+    return float(np.abs(errors).mean())
+
+
+def train(network: NeuralEvaluator, games: int, seed: int = 0, workers: int = 1, publish_every: int = 32,
+          alpha: float = 0.1, lam: float = 0.7, checkpoint: str | None = None, checkpoint_every: int = 1000,
+          progress: Callable[[TrainStats], None] | None = None) -> tuple[NeuralEvaluator, TrainStats]:
+    """
+    Entrena una còpia de la xarxa amb 'games' partides d'autojoc (veure 'self_play'), la partida i
+    amb els daus de 'DiceCup(seed + i)'. Els 'workers' processos juguen les partides per rondes de
+    'publish_every', totes amb els mateixos pesos, i després s'aplica l'actualització TD(λ) de cada
+    partida per ordre (veure 'td_update') i es publiquen els nous pesos per la ronda següent. Així el
+    resultat només depèn dels paràmetres i no del nombre de processos, i es pot reproduir exactament.
+    Si es dona 'checkpoint' (un camí amb "{games}"), es guarden els pesos cada 'checkpoint_every'
+    partides. Si es dona 'progress', es crida amb les estadístiques al final de cada ronda.
+    Retorna la xarxa entrenada (la donada no es modifica) i les estadístiques.
+    """
+    network = NeuralEvaluator(network.hidden_weights.copy(), network.hidden_bias.copy(),
+                              network.output_weights.copy(), network.output_bias)
+    stats = TrainStats()
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    start = time.perf_counter()
+    try:
+        while stats.games < games:
+            seeds = range(seed + stats.games, seed + min(stats.games + publish_every, games))
+            # Totes les partides de la ronda s'acaben abans de tocar els pesos
+            if pool is not None:
+                trajectories = list(pool.map(self_play, repeat(network), seeds, chunksize=-(-len(seeds) // workers)))
+            else:
+                trajectories = [self_play(network, game_seed) for game_seed in seeds]
+            errors = [td_update(network, positions, alpha, lam) for positions in trajectories]
+
+            previous = stats.games
+            stats.games += len(seeds)
+            stats.positions += sum(len(positions) for positions in trajectories)
+            stats.rounds += 1
+            stats.error = float(np.mean(errors))
+            stats.seconds = time.perf_counter() - start
+            if checkpoint is not None and stats.games // checkpoint_every > previous // checkpoint_every:
+                network.save(checkpoint.format(games=stats.games))
+            if progress is not None:
+                progress(stats)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return network, stats
+
+
+def main() -> None:
+    """Entrena els pesos de la xarxa neuronal del bot per autojoc."""
+    parser = argparse.ArgumentParser(description="Entrena la xarxa neuronal del bot amb partides contra ella mateixa (TD(λ))")
+    parser.add_argument("--games", type=int, default=1000, help="Partides d'entrenament")
+    parser.add_argument("--workers", type=int, default=1, help="Processos que juguen les partides")
+    parser.add_argument("--publish-every", type=int, default=32, help="Partides jugades amb els mateixos pesos")
+    parser.add_argument("--alpha", type=float, default=0.1, help="Taxa d'aprenentatge")
+    parser.add_argument("--lam", type=float, default=0.7, help="Paràmetre λ de TD(λ)")
+    parser.add_argument("--seed", type=int, default=0, help="Llavor dels daus de la primera partida")
+    parser.add_argument("--hidden", type=int, default=40, help="Neurones ocultes d'una xarxa nova")
+    parser.add_argument("--weights", default=None, help="Fitxer .npz amb els pesos inicials (per defecte, pesos aleatoris)")
+    parser.add_argument("--output", default="weights.npz", help="Fitxer on es guarden els pesos entrenats")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Partides entre punts de control")
+    args = parser.parse_args()
+
+    def progress(stats: TrainStats) -> None:
+        print(f"{stats.games}/{args.games} partides, {stats.positions} posicions, error {stats.error:.4f} "
+              f"({stats.games_per_second():.1f} partides/s, {stats.positions_per_second():.0f} posicions/s)", flush=True)
+
+    network = NeuralEvaluator.load(args.weights) if args.weights else NeuralEvaluator.random(args.hidden, args.seed)
+    checkpoint = args.output.removesuffix(".npz") + "-{games}.npz"
+    network, stats = train(network, args.games, args.seed, args.workers, args.publish_every, args.alpha, args.lam,
+                           checkpoint, args.checkpoint_every, progress)
+    network.save(args.output)
+    print(f"Pesos: {args.output}, {stats.games} partides en {stats.seconds:.0f}s")
+
+
+if __name__ == "__main__":
+    main()